@@ -32,6 +32,10 @@ CREATE TABLE public.posts (
     -- Engagement Metrics
     engagement_metrics JSONB, -- {likes: int, comments: int, shares: int, reactions: {like: int, love: int, ...}}
     
+    -- Lean projections for the paginated feed (list view avoids raw_text / media)
+    raw_text_preview TEXT GENERATED ALWAYS AS (left(raw_text, 280)) STORED,
+    cover_image TEXT GENERATED ALWAYS AS (COALESCE(media->0->>'thumbnail', media->0->>'url')) STORED,
+    
     -- System Metadata
     created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now())
@@ -52,6 +56,14 @@ CREATE INDEX idx_posts_author_name ON public.posts(author_name);
 CREATE INDEX idx_posts_published_at ON public.posts(published_at DESC);
 CREATE INDEX idx_posts_topics ON public.posts USING GIN (topics); -- GIN index for fast array searching
 CREATE INDEX idx_posts_sentiment ON public.posts(sentiment);
+CREATE INDEX idx_posts_category ON public.posts(category);
+CREATE INDEX idx_posts_feed ON public.posts(published_at DESC NULLS LAST, id DESC); -- Keyset pagination for GET /posts
+
+-- Upgrading an existing 'posts' table without the clean slate above: run these on their own
+-- to add the feed projections (GET /posts selects them) and the keyset index
+ALTER TABLE public.posts ADD COLUMN IF NOT EXISTS raw_text_preview TEXT GENERATED ALWAYS AS (left(raw_text, 280)) STORED;
+ALTER TABLE public.posts ADD COLUMN IF NOT EXISTS cover_image TEXT GENERATED ALWAYS AS (COALESCE(media->0->>'thumbnail', media->0->>'url')) STORED;
+CREATE INDEX IF NOT EXISTS idx_posts_feed ON public.posts(published_at DESC NULLS LAST, id DESC);
 
 -- 2. Create the 'documents' table (For LangChain Vector Store)
 CREATE TABLE public.documents (
@@ -70,6 +82,22 @@ CREATE POLICY "Public insert access documents" ON public.documents FOR INSERT WI
 CREATE POLICY "Public update access documents" ON public.documents FOR UPDATE USING (true);
 CREATE POLICY "Public delete access documents" ON public.documents FOR DELETE USING (true);
 
+-- Each post is stored as several chunks; index the parent link for re-index/delete
+CREATE INDEX idx_documents_post_id ON public.documents ((metadata->>'post_id'));
+
+-- Image OCR / captions keyed by content hash, so reposted images are processed once
+CREATE TABLE public.media_assets (
+    content_hash TEXT PRIMARY KEY, -- SHA-256 of the image bytes
+    ocr_text TEXT,
+    description TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now())
+);
+
+ALTER TABLE public.media_assets ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Public read access media_assets" ON public.media_assets FOR SELECT USING (true);
+CREATE POLICY "Public insert access media_assets" ON public.media_assets FOR INSERT WITH CHECK (true);
+CREATE POLICY "Public update access media_assets" ON public.media_assets FOR UPDATE USING (true);
+
 -- 3. Create the vector search function (RPC)
 CREATE OR REPLACE FUNCTION match_documents (
     query_embedding VECTOR(3072),
@@ -95,6 +123,12 @@ BEGIN
 END;
 $$;
 
+-- Dimension of documents.embedding (pgvector keeps it as the column's typmod); reindex.py checks it before writing
+CREATE OR REPLACE FUNCTION documents_embedding_dimensions() RETURNS INT LANGUAGE sql STABLE AS $$
+    SELECT atttypmod FROM pg_attribute
+    WHERE attrelid = 'public.documents'::regclass AND attname = 'embedding';
+$$;
+
 -- 4. Create the 'learning_paths' table
 CREATE TABLE public.learning_paths (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -114,3 +148,248 @@ CREATE POLICY "Public delete access learning_paths" ON public.learning_paths FOR
 
 -- Create index for goal search
 CREATE INDEX idx_learning_paths_goal ON public.learning_paths(goal);
+
+-- 5. Followed pages / groups for scheduled incremental crawling
+CREATE TABLE public.crawl_sources (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    url TEXT NOT NULL UNIQUE, -- Facebook page or group URL
+    enabled BOOLEAN NOT NULL DEFAULT true,
+    interval_s INTEGER NOT NULL DEFAULT 3600,
+    results_limit INTEGER NOT NULL DEFAULT 50, -- Max posts per Apify run
+    watermark TIMESTAMP WITH TIME ZONE, -- Newest published_at seen (onlyPostsNewerThan)
+    next_run_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()),
+    last_run_at TIMESTAMP WITH TIME ZONE,
+    last_success_at TIMESTAMP WITH TIME ZONE,
+    consecutive_failures INTEGER NOT NULL DEFAULT 0, -- Drives exponential backoff
+    last_error TEXT,
+    last_stats JSONB, -- {scraped, new, refreshed, failed, watermark}
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now())
+);
+
+ALTER TABLE public.crawl_sources ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Public read access crawl_sources" ON public.crawl_sources FOR SELECT USING (true);
+CREATE POLICY "Public insert access crawl_sources" ON public.crawl_sources FOR INSERT WITH CHECK (true);
+CREATE POLICY "Public update access crawl_sources" ON public.crawl_sources FOR UPDATE USING (true);
+CREATE POLICY "Public delete access crawl_sources" ON public.crawl_sources FOR DELETE USING (true);
+
+CREATE INDEX idx_crawl_sources_due ON public.crawl_sources(next_run_at) WHERE enabled;
+
+-- Batched engagement refresh for crawled posts: one round trip, no re-extraction.
+-- updates: [{"original_post_id": "...", "engagement_metrics": {...}}, ...]
+CREATE OR REPLACE FUNCTION refresh_engagement (updates JSONB)
+RETURNS INT LANGUAGE sql AS $$
+    WITH changed AS (
+        UPDATE public.posts p
+        SET engagement_metrics = u.engagement_metrics
+        FROM jsonb_to_recordset(updates) AS u(original_post_id TEXT, engagement_metrics JSONB)
+        WHERE p.original_post_id = u.original_post_id
+        RETURNING 1
+    )
+    SELECT count(*)::INT FROM changed;
+$$;
+
+-- 6. Analytics rollups, maintained incrementally by a trigger on posts so the
+--    /analytics endpoints read a few small rows regardless of corpus size.
+CREATE TABLE public.analytics_topics (
+    topic TEXT PRIMARY KEY,
+    post_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX idx_analytics_topics_count ON public.analytics_topics(post_count DESC);
+
+CREATE TABLE public.analytics_sentiment_daily (
+    day DATE NOT NULL, -- published_at (or created_at) in UTC
+    sentiment TEXT NOT NULL,
+    post_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, sentiment)
+);
+
+CREATE TABLE public.analytics_authors (
+    author_key TEXT PRIMARY KEY, -- author_id, falling back to author_name
+    author_name TEXT,
+    author_profile_pic TEXT,
+    post_count INTEGER NOT NULL DEFAULT 0,
+    total_engagement BIGINT NOT NULL DEFAULT 0
+);
+CREATE INDEX idx_analytics_authors_posts ON public.analytics_authors(post_count DESC);
+CREATE INDEX idx_analytics_authors_engagement ON public.analytics_authors(total_engagement DESC);
+
+-- Log-scale histogram of likes + comments + shares: 4 buckets per doubling (~19% wide)
+CREATE TABLE public.analytics_engagement_histogram (
+    bucket INTEGER PRIMARY KEY,
+    post_count INTEGER NOT NULL DEFAULT 0
+);
+
+ALTER TABLE public.analytics_topics ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.analytics_sentiment_daily ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.analytics_authors ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.analytics_engagement_histogram ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Public read access analytics_topics" ON public.analytics_topics FOR SELECT USING (true);
+CREATE POLICY "Public read access analytics_sentiment_daily" ON public.analytics_sentiment_daily FOR SELECT USING (true);
+CREATE POLICY "Public read access analytics_authors" ON public.analytics_authors FOR SELECT USING (true);
+CREATE POLICY "Public read access analytics_engagement_histogram" ON public.analytics_engagement_histogram FOR SELECT USING (true);
+
+CREATE OR REPLACE FUNCTION post_engagement_score (metrics JSONB)
+RETURNS BIGINT LANGUAGE sql IMMUTABLE AS $$
+    SELECT COALESCE((metrics->>'likes')::BIGINT, 0)
+         + COALESCE((metrics->>'comments')::BIGINT, 0)
+         + COALESCE((metrics->>'shares')::BIGINT, 0);
+$$;
+
+CREATE OR REPLACE FUNCTION engagement_bucket (score BIGINT)
+RETURNS INT LANGUAGE sql IMMUTABLE AS $$
+    SELECT floor(4 * log(2, GREATEST(score, 0) + 1))::INT;
+$$;
+
+-- Adds (delta = 1) or removes (delta = -1) one post's contribution to every rollup
+CREATE OR REPLACE FUNCTION analytics_apply (p public.posts, delta INT)
+RETURNS VOID LANGUAGE plpgsql AS $$
+DECLARE
+    score BIGINT := post_engagement_score(p.engagement_metrics);
+    author TEXT := COALESCE(NULLIF(p.author_id, ''), p.author_name);
+BEGIN
+    INSERT INTO public.analytics_topics (topic, post_count)
+    SELECT DISTINCT t, delta FROM unnest(COALESCE(p.topics, '{}')) AS t WHERE t <> ''
+    ON CONFLICT (topic) DO UPDATE SET post_count = analytics_topics.post_count + excluded.post_count;
+
+    INSERT INTO public.analytics_sentiment_daily (day, sentiment, post_count)
+    VALUES (
+        (COALESCE(p.published_at, p.created_at) AT TIME ZONE 'utc')::DATE,
+        COALESCE(NULLIF(p.sentiment, ''), 'Unknown'),
+        delta
+    )
+    ON CONFLICT (day, sentiment) DO UPDATE SET post_count = analytics_sentiment_daily.post_count + excluded.post_count;
+
+    IF author IS NOT NULL THEN
+        INSERT INTO public.analytics_authors (author_key, author_name, author_profile_pic, post_count, total_engagement)
+        VALUES (author, p.author_name, p.author_profile_pic, delta, delta * score)
+        ON CONFLICT (author_key) DO UPDATE SET
+            author_name = COALESCE(excluded.author_name, analytics_authors.author_name),
+            author_profile_pic = COALESCE(excluded.author_profile_pic, analytics_authors.author_profile_pic),
+            post_count = analytics_authors.post_count + excluded.post_count,
+            total_engagement = analytics_authors.total_engagement + excluded.total_engagement;
+    END IF;
+
+    INSERT INTO public.analytics_engagement_histogram (bucket, post_count)
+    VALUES (engagement_bucket(score), delta)
+    ON CONFLICT (bucket) DO UPDATE SET post_count = analytics_engagement_histogram.post_count + excluded.post_count;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION posts_analytics_trigger ()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.topics IS NOT DISTINCT FROM NEW.topics
+       AND OLD.sentiment IS NOT DISTINCT FROM NEW.sentiment
+       AND OLD.published_at IS NOT DISTINCT FROM NEW.published_at
+       AND OLD.author_id IS NOT DISTINCT FROM NEW.author_id
+       AND OLD.author_name IS NOT DISTINCT FROM NEW.author_name
+       AND OLD.engagement_metrics IS NOT DISTINCT FROM NEW.engagement_metrics THEN
+        RETURN NULL; -- e.g. media enrichment: nothing the rollups depend on changed
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM analytics_apply(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM analytics_apply(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER posts_analytics
+AFTER INSERT OR UPDATE OR DELETE ON public.posts
+FOR EACH ROW EXECUTE FUNCTION posts_analytics_trigger();
+
+-- Recompute every rollup from scratch (backfill after creating the tables on an existing corpus)
+CREATE OR REPLACE FUNCTION analytics_rebuild ()
+RETURNS INT LANGUAGE plpgsql AS $$
+DECLARE
+    p public.posts;
+    n INT := 0;
+BEGIN
+    LOCK TABLE public.posts IN SHARE MODE; -- no writes (and no trigger deltas) while rebuilding
+    TRUNCATE public.analytics_topics, public.analytics_sentiment_daily,
+             public.analytics_authors, public.analytics_engagement_histogram;
+    FOR p IN SELECT * FROM public.posts LOOP
+        PERFORM analytics_apply(p, 1);
+        n := n + 1;
+    END LOOP;
+    RETURN n;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION analytics_top_topics (max_topics INT DEFAULT 20)
+RETURNS TABLE (topic TEXT, post_count INT) LANGUAGE sql STABLE AS $$
+    SELECT t.topic, t.post_count FROM public.analytics_topics t
+    WHERE t.post_count > 0
+    ORDER BY t.post_count DESC, t.topic
+    LIMIT max_topics;
+$$;
+
+-- bucket: 'day', 'week' or 'month'; reads at most one row per day and sentiment in range
+CREATE OR REPLACE FUNCTION analytics_sentiment_series (
+    bucket TEXT DEFAULT 'week',
+    since DATE DEFAULT NULL,
+    until DATE DEFAULT NULL
+) RETURNS TABLE (bucket_start DATE, sentiment TEXT, post_count BIGINT) LANGUAGE sql STABLE AS $$
+    SELECT date_trunc(bucket, s.day)::DATE, s.sentiment, sum(s.post_count)
+    FROM public.analytics_sentiment_daily s
+    WHERE s.post_count > 0
+      AND (since IS NULL OR s.day >= since)
+      AND (until IS NULL OR s.day <= until)
+    GROUP BY 1, 2
+    ORDER BY 1, 2;
+$$;
+
+CREATE OR REPLACE FUNCTION analytics_top_authors (max_authors INT DEFAULT 10, order_by TEXT DEFAULT 'posts')
+RETURNS TABLE (
+    author_key TEXT,
+    author_name TEXT,
+    author_profile_pic TEXT,
+    post_count INT,
+    total_engagement BIGINT
+) LANGUAGE sql STABLE AS $$
+    SELECT a.author_key, a.author_name, a.author_profile_pic, a.post_count, a.total_engagement
+    FROM public.analytics_authors a
+    WHERE a.post_count > 0
+    ORDER BY CASE WHEN order_by = 'engagement' THEN a.total_engagement ELSE a.post_count END DESC, a.author_key
+    LIMIT max_authors;
+$$;
+
+CREATE OR REPLACE FUNCTION analytics_engagement_histogram_rows ()
+RETURNS TABLE (bucket INT, post_count INT) LANGUAGE sql STABLE AS $$
+    SELECT h.bucket, h.post_count FROM public.analytics_engagement_histogram h
+    WHERE h.post_count > 0
+    ORDER BY h.bucket;
+$$;
+
+-- Drill-down for one topic, served by the GIN index on posts.topics
+CREATE OR REPLACE FUNCTION analytics_topic_breakdown (topic TEXT)
+RETURNS TABLE (sentiment TEXT, post_count BIGINT, total_engagement NUMERIC) LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(NULLIF(p.sentiment, ''), 'Unknown'), count(*), sum(post_engagement_score(p.engagement_metrics))
+    FROM public.posts p
+    WHERE p.topics @> ARRAY[topic]
+    GROUP BY 1
+    ORDER BY 2 DESC;
+$$;
+
+-- 7. Checkpointed roadmap pipeline runs (resume / regenerate single steps)
+CREATE TABLE public.roadmap_runs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    goal TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending', -- pending, running, failed, completed
+    steps JSONB NOT NULL DEFAULT '{}', -- {"step1": {status, started_at, finished_at, duration_s, output | error}, ...}
+    error TEXT,
+    learning_path_id UUID REFERENCES public.learning_paths(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now())
+);
+
+ALTER TABLE public.roadmap_runs ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Public read access roadmap_runs" ON public.roadmap_runs FOR SELECT USING (true);
+CREATE POLICY "Public insert access roadmap_runs" ON public.roadmap_runs FOR INSERT WITH CHECK (true);
+CREATE POLICY "Public update access roadmap_runs" ON public.roadmap_runs FOR UPDATE USING (true);
+CREATE POLICY "Public delete access roadmap_runs" ON public.roadmap_runs FOR DELETE USING (true);
+
+CREATE INDEX idx_roadmap_runs_status ON public.roadmap_runs(status, updated_at DESC);
@@ -8,9 +8,15 @@ This agent:
 4. Builds staged roadmap
 5. Fills each stage with resources (posts, courses)
 6. Outputs UI-ready learning path
+
+Each step's output is checkpointed under a run id (services.roadmap_runs),
+so a failed run resumes from its last completed step and single steps can
+be regenerated.
 """
 
+import asyncio
 import os
+import time
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -21,6 +27,13 @@ from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from supabase.client import Client
 import json
 
+from observability.metrics import LLM_RATE_LIMIT_RETRIES, external_call, llm_config, timed_stage
+from observability.tracing import add_event
+from services.chunking import aggregate_chunk_matches
+from services.deadlines import DeadlineExceeded, blocking, bounded, note_degraded, remaining
+from services.llm_cache import structured_chain
+from services.roadmap_runs import STEP_NAMES, RoadmapRunStore, RunFailed, utc_now
+
 
 # ============================================================================
 # STEP 1 MODELS: Understand the User
@@ -107,6 +120,17 @@ class Step5Output(BaseModel):
     enriched_stages: List[EnrichedStage]
 
 
+class StagePostMatches(BaseModel):
+    """Posts assigned to a single stage by the batched matcher."""
+    stage_id: str = Field(description="ID of the stage (e.g., 'stage_1')")
+    posts: List[PostReference] = Field(default_factory=list, description="Relevant posts for this stage")
+
+
+class BatchedPostMatches(BaseModel):
+    """Post-to-stage assignments for the whole roadmap."""
+    stages: List[StagePostMatches]
+
+
 # ============================================================================
 # STEP 6 MODELS: UI-Ready Learning Path
 # ============================================================================
@@ -138,6 +162,14 @@ class CourseRoadmapAgent:
     A 6-step pipeline agent for generating personalized learning roadmaps.
     """
 
+    # Step 5 post matching
+    STAGE_CANDIDATE_CHUNKS = 15    # Chunks fetched per stage query
+    STAGE_CANDIDATE_POSTS = 5      # Distinct posts kept per stage after aggregation
+    MAX_POSTS_PER_STAGE = 3
+    MATCH_MAX_RETRIES = 2          # Fall back to similarity instead of waiting minutes
+    MIN_MATCH_SIMILARITY = 0.55    # Absolute floor for the similarity fallback
+    RELATIVE_MATCH_RATIO = 0.9     # Per-stage threshold as a fraction of the stage's best score
+
     def __init__(
         self,
         google_api_key: str,
@@ -162,20 +194,23 @@ class CourseRoadmapAgent:
         
         # Initialize Tavily search client
         self.tavily_client = TavilyClient(api_key=tavily_api_key)
+        
+        # Per-step checkpoints, so failed runs resume instead of starting over
+        self.runs = RoadmapRunStore(supabase_client)
 
-    async def _safe_invoke(self, chain, input_data):
+    async def _safe_invoke(self, chain, input_data, max_retries: int = 10, call_site: str = "roadmap"):
         """
         Helper to invoke chains with robust handling for Gemini's Free Tier rate limits.
         Catches RESOURCE_EXHAUSTED and waits before retrying.
+        
+        `call_site` labels latency, token and retry metrics for this invocation.
         """
-        import asyncio
         import re
         
-        max_retries = 10
-        
         for attempt in range(max_retries + 1):
             try:
-                return await chain.ainvoke(input_data)
+                with external_call("gemini", call_site):
+                    return await bounded("gemini", lambda: chain.ainvoke(input_data, config=llm_config(call_site)))
             except Exception as e:
                 error_str = str(e)
                 if "RESOURCE_EXHAUSTED" in error_str:
@@ -187,7 +222,16 @@ class CourseRoadmapAgent:
                         # Add a larger buffer for safety
                         wait_time += 5.0
                         
+                        # Don't sleep past the request's deadline only to fail afterwards
+                        left = remaining()
+                        if left is not None and wait_time >= left:
+                            raise DeadlineExceeded(
+                                f"Rate limited at {call_site}; retry in {wait_time:.0f}s exceeds the {max(left, 0):.0f}s left"
+                            ) from e
+                        
                         print(f"   ⚠ Rate limit hit. Waiting {wait_time:.1f}s before retry {attempt+1}/{max_retries}...")
+                        LLM_RATE_LIMIT_RETRIES.labels(call_site).inc()
+                        add_event("rate_limit_retry", call_site=call_site, attempt=attempt + 1, wait_s=wait_time)
                         await asyncio.sleep(wait_time)
                         continue
                 
@@ -198,6 +242,7 @@ class CourseRoadmapAgent:
     # STEP 1: Understand the User
     # ========================================================================
 
+    @timed_stage("roadmap.step1_understand_user")
     async def step1_understand_user(self, user_text: str) -> Step1Output:
         """
         Extract structured learner profile from natural language goal.
@@ -222,14 +267,15 @@ Be practical and job-market aligned. If information is missing, infer reasonable
             ("human", "User Goal: {user_text}")
         ])
         
-        chain = prompt | self.llm.with_structured_output(Step1Output)
-        result = await self._safe_invoke(chain, {"user_text": user_text})
+        chain = structured_chain(prompt, self.llm, Step1Output, "roadmap.step1")
+        result = await self._safe_invoke(chain, {"user_text": user_text}, call_site="roadmap.step1")
         return result
 
     # ========================================================================
     # STEP 2: Generate Search Subqueries
     # ========================================================================
 
+    @timed_stage("roadmap.step2_generate_queries")
     async def step2_generate_queries(self, profile: LearnerProfile) -> Step2Output:
         """
         Generate 3-6 search queries for advisement corpus.
@@ -261,14 +307,15 @@ Example queries:
             ("human", "Profile: {profile}")
         ])
         
-        chain = prompt | self.llm.with_structured_output(Step2Output)
-        result = await self._safe_invoke(chain, {"profile": profile.model_dump_json()})
+        chain = structured_chain(prompt, self.llm, Step2Output, "roadmap.step2")
+        result = await self._safe_invoke(chain, {"profile": profile.model_dump_json()}, call_site="roadmap.step2")
         return result
 
     # ========================================================================
     # STEP 3: Clean Advisement Corpus
     # ========================================================================
 
+    @timed_stage("roadmap.step3_clean_advisement")
     async def step3_clean_advisement(self, queries: List[str]) -> Step3Output:
         """
         Execute Tavily searches and clean the results.
@@ -276,25 +323,31 @@ Example queries:
         Input: {"queries": [...]}
         Output: {"advisement_corpus": [...]}
         """
-        # Execute all queries with Tavily
-        all_results = []
-        for query in queries:
+        # Execute all queries with Tavily, concurrently; a slow or failed query only costs its results
+        async def search(query: str) -> Dict[str, Any]:
             try:
-                response = self.tavily_client.search(
-                    query=query,
-                    search_depth="advanced",
-                    max_results=5
-                )
-                # Extract only the content field
-                for item in response.get('results', []):
-                    if item.get('content'):
-                        all_results.append({
-                            'url': item.get('url', ''),
-                            'title': item.get('title', ''),
-                            'content': item.get('content', '')
-                        })
+                with external_call("tavily", "search"):
+                    return await blocking(
+                        "tavily",
+                        lambda: self.tavily_client.search(query=query, search_depth="advanced", max_results=5),
+                        share=0.3,
+                        hedge=True
+                    )
             except Exception as e:
                 print(f"⚠ Tavily search failed for '{query}': {e}")
+                note_degraded("advisement_search")
+                return {}
+        
+        all_results = []
+        for response in await asyncio.gather(*(search(query) for query in queries)):
+            # Extract only the content field
+            for item in response.get('results', []):
+                if item.get('content'):
+                    all_results.append({
+                        'url': item.get('url', ''),
+                        'title': item.get('title', ''),
+                        'content': item.get('content', '')
+                    })
         
         # Now use Gemini to clean and normalize
         prompt = ChatPromptTemplate.from_messages([
@@ -312,14 +365,15 @@ Rules:
             ("human", "Raw search results:\n{results}")
         ])
         
-        chain = prompt | self.llm.with_structured_output(Step3Output)
-        result = await self._safe_invoke(chain, {"results": json.dumps(all_results, indent=2)})
+        chain = structured_chain(prompt, self.llm, Step3Output, "roadmap.step3")
+        result = await self._safe_invoke(chain, {"results": json.dumps(all_results, indent=2)}, call_site="roadmap.step3")
         return result
 
     # ========================================================================
     # STEP 4: Build Staged Roadmap
     # ========================================================================
 
+    @timed_stage("roadmap.step4_build_roadmap")
     async def step4_build_roadmap(
         self, 
         profile: LearnerProfile, 
@@ -362,112 +416,239 @@ Advisement Corpus:
 Build the roadmap now.""")
         ])
         
-        chain = prompt | self.llm.with_structured_output(Step4Output)
+        chain = structured_chain(prompt, self.llm, Step4Output, "roadmap.step4")
         result = await self._safe_invoke(chain, {
             "profile": profile.model_dump_json(),
             "advisement": json.dumps(advisement_corpus)
-        })
+        }, call_site="roadmap.step4")
         return result
 
     # ========================================================================
     # STEP 5: Fill Each Stage with Resources
     # ========================================================================
 
-    async def step5_fill_resources(
-        self, 
+    async def _gather_stage_candidates(
+        self,
+        stages: List[RoadmapStage]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Run a vector search per stage (concurrently) and collect candidate posts.
+        
+        All stage queries are embedded in one `embed_documents` call.
+        
+        Returns {stage_id: [{"id", "content", "url", "similarity"}, ...]},
+        with each post listed at most once per stage.
+        """
+        if not (self.embeddings and self.supabase_client):
+            return {stage.id: [] for stage in stages}
+        
+        # Create search queries from stage focus and skills, and embed them together
+        search_queries = [f"{stage.title}: {', '.join(stage.focus + stage.skills)}" for stage in stages]
+        try:
+            query_embeddings = await bounded(
+                "embeddings", lambda: self.embeddings.aembed_documents(search_queries), share=0.2
+            )
+        except Exception as e:
+            print(f"⚠ Embedding stage queries failed: {e}")
+            note_degraded("post_candidates")
+            return {stage.id: [] for stage in stages}
+        
+        async def search(stage: RoadmapStage, query_embedding: List[float]) -> List[Dict[str, Any]]:
+            candidates = []
+            try:
+                # Search vector store
+                with external_call("supabase", "match_documents"):
+                    rpc_response = await blocking(
+                        "supabase_rpc",
+                        self.supabase_client.rpc(
+                            'match_documents',
+                            {
+                                'query_embedding': query_embedding,
+                                'match_count': self.STAGE_CANDIDATE_CHUNKS
+                            }
+                        ).execute,
+                        share=0.2,
+                        hedge=True
+                    )
+                
+                # Aggregate chunk hits to posts; keep each post's best chunk as its snippet
+                for entry in aggregate_chunk_matches(rpc_response.data)[:self.STAGE_CANDIDATE_POSTS]:
+                    candidates.append({
+                        'id': entry['post_id'],
+                        'content': (entry['chunks'][0].get('content') or '')[:200],
+                        'url': entry['metadata'].get('url', ''),
+                        'similarity': entry['score']
+                    })
+                        
+            except Exception as e:
+                print(f"⚠ Vector search failed for stage '{stage.id}': {e}")
+                note_degraded("post_candidates")
+            return candidates
+        
+        # One vector search per stage, all stages at once
+        results = await asyncio.gather(*(search(stage, vector) for stage, vector in zip(stages, query_embeddings)))
+        return {stage.id: candidates for stage, candidates in zip(stages, results)}
+
+    async def _match_posts_batched(
+        self,
         stages: List[RoadmapStage],
-        courses: Optional[List[Dict]] = None
-    ) -> Step5Output:
+        stage_candidates: Dict[str, List[Dict[str, Any]]]
+    ) -> Dict[str, List[PostReference]]:
         """
-        Match Facebook posts and courses to each stage.
+        Assign candidate posts to stages with a single structured LLM call.
         
-        Input: {"stages": [...], "courses": [...]}
-        Output: {"enriched_stages": [...]}
+        Candidates are deduplicated across stages so each post snippet is sent
+        once; the model only sees which post IDs are eligible for which stage.
+        Falls back to similarity thresholds if the call fails (e.g. the rate
+        limit budget is exhausted).
         """
-        enriched = []
+        # Dedupe posts across all stages
+        posts: Dict[str, Dict[str, Any]] = {}
+        for candidates in stage_candidates.values():
+            for candidate in candidates:
+                if candidate['id'] not in posts:
+                    posts[candidate['id']] = {
+                        'id': candidate['id'],
+                        'content': candidate['content'],
+                        'url': candidate['url']
+                    }
         
-        for stage in stages:
-            # Search for relevant posts using vector store
-            relevant_posts = []
-            if self.embeddings and self.supabase_client:
-                try:
-                    # Create search query from stage focus and skills
-                    search_query = f"{stage.title}: {', '.join(stage.focus + stage.skills)}"
-                    
-                    # Generate embedding
-                    query_embedding = self.embeddings.embed_query(search_query)
-                    
-                    # Search vector store
-                    rpc_response = self.supabase_client.rpc(
-                        'match_documents',
-                        {
-                            'query_embedding': query_embedding,
-                            'match_count': 5
-                        }
-                    ).execute()
-                    
-                    # Get unique posts
-                    seen_ids = set()
-                    for item in rpc_response.data:
-                        post_id = item.get('metadata', {}).get('post_id')
-                        if post_id and post_id not in seen_ids:
-                            seen_ids.add(post_id)
-                            relevant_posts.append({
-                                'id': post_id,
-                                'content': item.get('content', '')[:200],
-                                'url': item.get('metadata', {}).get('url', '')
-                            })
-                            
-                except Exception as e:
-                    print(f"⚠ Vector search failed for stage '{stage.id}': {e}")
+        if not posts:
+            return {stage.id: [] for stage in stages}
+        
+        stage_payload = [
+            {
+                'id': stage.id,
+                'title': stage.title,
+                'focus': stage.focus,
+                'skills': stage.skills,
+                'candidate_post_ids': [c['id'] for c in stage_candidates.get(stage.id, [])]
+            }
+            for stage in stages
+        ]
+        
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are a curriculum matcher.
             
-            # Now use Gemini to rank and explain relevance
-            post_refs = []
-            if relevant_posts:
-                prompt = ChatPromptTemplate.from_messages([
-                    ("system", """You are a curriculum matcher.
-                    
-Your task: Match posts to this learning stage and explain why they're relevant.
+Your task: Assign posts to the stages of a learning roadmap and explain why they're relevant.
 
-For each post, provide:
-- id (the post ID)
-- reason (1 sentence explaining relevance)
+For each stage, return:
+- stage_id (the stage ID)
+- posts: a list of {{id, reason}} where reason is 1 sentence explaining relevance
 
-Only include posts that are TRULY relevant. Max 3 posts per stage.
+Rules:
+- Only assign a post to a stage if its ID is in that stage's candidate_post_ids
+- Only include posts that are TRULY relevant
+- Max {max_posts} posts per stage
+- A stage may have no posts
 """),
-                    ("human", """Stage: {stage}
+            ("human", """Stages: {stages}
 
 Posts: {posts}
 
 Match them now.""")
-                ])
-                
-                class PostMatches(BaseModel):
-                    matches: List[PostReference]
-                
-                chain = prompt | self.llm.with_structured_output(PostMatches)
-                try:
-                    matches = await self._safe_invoke(chain, {
-                        "stage": stage.model_dump_json(),
-                        "posts": json.dumps(relevant_posts)
-                    })
-                    post_refs = matches.matches
-                except Exception as e:
-                    print(f"⚠ Post matching failed: {e}")
+        ])
+        
+        chain = structured_chain(prompt, self.llm, BatchedPostMatches, "roadmap.step5_match")
+        try:
+            result = await self._safe_invoke(chain, {
+                "max_posts": self.MAX_POSTS_PER_STAGE,
+                "stages": json.dumps(stage_payload),
+                "posts": json.dumps(list(posts.values()))
+            }, max_retries=self.MATCH_MAX_RETRIES, call_site="roadmap.step5_match")
+        except Exception as e:
+            print(f"⚠ Batched post matching failed, using similarity fallback: {e}")
+            note_degraded("post_matching")
+            return self._match_posts_by_similarity(stages, stage_candidates)
+        
+        # Keep only eligible, unique post IDs per stage
+        llm_matches = {m.stage_id: m.posts for m in result.stages}
+        matched: Dict[str, List[PostReference]] = {}
+        for stage in stages:
+            eligible = {c['id'] for c in stage_candidates.get(stage.id, [])}
+            refs = []
+            for ref in llm_matches.get(stage.id, []):
+                if ref.id in eligible and ref.id not in {r.id for r in refs}:
+                    refs.append(ref)
+            matched[stage.id] = refs[:self.MAX_POSTS_PER_STAGE]
+        
+        return matched
+
+    def _match_posts_by_similarity(
+        self,
+        stages: List[RoadmapStage],
+        stage_candidates: Dict[str, List[Dict[str, Any]]]
+    ) -> Dict[str, List[PostReference]]:
+        """
+        LLM-free matcher based on `match_documents` similarity scores.
+        
+        Each stage gets its own threshold: the larger of MIN_MATCH_SIMILARITY
+        and a fraction of the stage's best score, so weak tails are dropped
+        without penalising stages whose queries score lower overall.
+        """
+        matched: Dict[str, List[PostReference]] = {}
+        for stage in stages:
+            candidates = sorted(
+                stage_candidates.get(stage.id, []),
+                key=lambda c: c['similarity'],
+                reverse=True
+            )
+            if not candidates:
+                matched[stage.id] = []
+                continue
             
-            # Course matching using Tavily search
+            threshold = max(
+                self.MIN_MATCH_SIMILARITY,
+                candidates[0]['similarity'] * self.RELATIVE_MATCH_RATIO
+            )
+            matched[stage.id] = [
+                PostReference(
+                    id=c['id'],
+                    reason=f"Closely related to {stage.title} (similarity {c['similarity']:.2f})"
+                )
+                for c in candidates
+                if c['similarity'] >= threshold
+            ][:self.MAX_POSTS_PER_STAGE]
+        
+        return matched
+
+    @timed_stage("roadmap.step5_fill_resources")
+    async def step5_fill_resources(
+        self, 
+        stages: List[RoadmapStage],
+        courses: Optional[List[Dict]] = None
+    ) -> Step5Output:
+        """
+        Match Facebook posts and courses to each stage.
+        
+        Posts for all stages are matched in one batched LLM call.
+        
+        Input: {"stages": [...], "courses": [...]}
+        Output: {"enriched_stages": [...]}
+        """
+        stage_candidates = await self._gather_stage_candidates(stages)
+        post_matches = await self._match_posts_batched(stages, stage_candidates)
+        
+        async def find_courses(stage: RoadmapStage) -> List[CourseReference]:
+            # Course matching using Tavily search; optional, so the stage just goes without on failure
             course_refs = []
             try:
                 # Generate a specific query for courses
                 course_query = f"best online course for {stage.title} {stage.skills[0] if stage.skills else ''}"
                 
                 print(f"   🔍 Searching courses for: {stage.title}...")
-                search_result = self.tavily_client.search(
-                    query=course_query, 
-                    topic="general", 
-                    max_results=2,
-                    include_domains=["udemy.com", "coursera.org", "edx.org", "pluralsight.com", "udacity.com", "freecodecamp.org"]
-                )
+                with external_call("tavily", "course_search"):
+                    search_result = await blocking(
+                        "tavily",
+                        lambda: self.tavily_client.search(
+                            query=course_query, 
+                            topic="general", 
+                            max_results=2,
+                            include_domains=["udemy.com", "coursera.org", "edx.org", "pluralsight.com", "udacity.com", "freecodecamp.org"]
+                        ),
+                        share=0.3,
+                        hedge=True
+                    )
                 
                 for result in search_result.get("results", []):
                     course_refs.append(CourseReference(
@@ -478,12 +659,18 @@ Match them now.""")
                     ))
             except Exception as e:
                 print(f"⚠ Course search failed for stage '{stage.id}': {e}")
-            
-            enriched.append(EnrichedStage(
+                note_degraded("courses")
+            return course_refs
+        
+        courses_by_stage = await asyncio.gather(*(find_courses(stage) for stage in stages))
+        enriched = [
+            EnrichedStage(
                 id=stage.id,
-                posts=post_refs,
+                posts=post_matches.get(stage.id, []),
                 courses=course_refs
-            ))
+            )
+            for stage, course_refs in zip(stages, courses_by_stage)
+        ]
         
         return Step5Output(enriched_stages=enriched)
 
@@ -491,6 +678,7 @@ Match them now.""")
     # STEP 6: UI-Ready Learning Path
     # ========================================================================
 
+    @timed_stage("roadmap.step6_ui_ready")
     async def step6_ui_ready(
         self,
         goal: str,
@@ -514,9 +702,10 @@ Match them now.""")
             
             if all_post_ids:
                 try:
-                    response = self.supabase_client.table("posts").select("*").in_(
-                        "original_post_id", all_post_ids
-                    ).execute()
+                    with external_call("supabase", "select_posts"):
+                        response = self.supabase_client.table("posts").select("*").in_(
+                            "original_post_id", all_post_ids
+                        ).execute()
                     
                     for post in response.data:
                         post_data_map[post['original_post_id']] = post
@@ -566,63 +755,196 @@ Match them now.""")
     # MAIN PIPELINE
     # ========================================================================
 
-    async def create_roadmap(self, user_goal: str) -> Dict[str, Any]:
+    async def create_roadmap(self, user_goal: str, run_id: Optional[str] = None) -> Dict[str, Any]:
         """
-        Execute the full 6-step pipeline.
+        Execute the full 6-step pipeline, checkpointing each step under a run id.
         
-        Returns the final UI-ready roadmap.
+        Pass `run_id` of a run created with `self.runs.create(goal)` to know the
+        id up front. Returns the final UI-ready roadmap; on failure raises
+        RunFailed, and the run can be continued with `resume_roadmap`.
         """
-        print("🧠 CourseRoadmapAgent: Starting pipeline...")
-        
-        # Step 1: Understand User
-        print("📋 Step 1: Understanding user profile...")
-        step1 = await self.step1_understand_user(user_goal)
-        print("Profile ", "-" * 30, "\n")
-        print(step1.profile)
-
-        # print(f"   Profile: {step1.profile.background}, {step1.profile.time_constraints}")
-        
-        # Step 2: Generate Queries
-        print("🔍 Step 2: Generating search queries...")
-        step2 = await self.step2_generate_queries(step1.profile)
-        # print(f"   Generated {len(step2.queries)} queries")
-        print("Queries ", "-" * 30, "\n")
-        print(step2.queries)
-        
-        # Step 3: Clean Advisement
-        print("📚 Step 3: Fetching and cleaning advisement corpus...")
-        step3 = await self.step3_clean_advisement(step2.queries)
-        print("Advisement Units ", "-" * 30, "\n")
-        print(step3.advisement_corpus)
-        # print(f"   Cleaned {len(step3.advisement_corpus)} advisement units")
-        
-        # Step 4: Build Roadmap
-        print("🗺️  Step 4: Building staged roadmap...")
-        step4 = await self.step4_build_roadmap(step1.profile, step3.advisement_corpus)
-        print("Stages ", "-" * 30, "\n")
-        print(step4.stages)
-        
-        # Step 5: Fill Resources
-        print("📦 Step 5: Matching resources to stages...")
-        step5 = await self.step5_fill_resources(step4.stages)
-        print(f"   Matched resources to {len(step5.enriched_stages)} stages")
-        
-        # Step 6: UI-Ready Output
-        print("🎨 Step 6: Formatting UI-ready output...")
-        step6 = await self.step6_ui_ready(user_goal, step4.stages, step5.enriched_stages)
-        print(f"   ✓ Roadmap complete with {len(step6.nodes)} nodes")
-        
-        # New Step: Save to Supabase
-        if self.supabase_client:
-            print("💾 Saving roadmap to Supabase...")
-            try:
-                roadmap_data = step6.model_dump()
-                self.supabase_client.table("learning_paths").insert({
-                    "goal": user_goal,
-                    "roadmap_data": roadmap_data
-                }).execute()
-                print("   ✓ Roadmap saved to 'learning_paths' table")
-            except Exception as e:
-                print(f"   ⚠ Failed to save roadmap to Supabase: {e}")
-
-        return step6.model_dump()
+        if run_id:
+            run = await asyncio.to_thread(self.runs.get, run_id)
+        else:
+            run = await asyncio.to_thread(self.runs.create, user_goal)
+        return await self._execute_run(run)
+
+    async def resume_roadmap(self, run_id: str) -> Dict[str, Any]:
+        """Continue a failed or interrupted run from its last completed step."""
+        run = await asyncio.to_thread(self.runs.get, run_id)
+        if run["status"] == "completed":
+            return run["steps"]["step6"]["output"]
+        return await self._execute_run(run)
+
+    async def regenerate_step(self, run_id: str, step: str, stage_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Recompute one step and everything after it, reusing earlier checkpoints.
+        
+        With `stage_id` (step 5 only), re-fill the resources of that single
+        stage and keep the other stages' matches.
+        """
+        if step not in STEP_NAMES:
+            raise ValueError(f"Unknown step '{step}' (expected one of {', '.join(STEP_NAMES)})")
+        if stage_id is not None and step != "step5":
+            raise ValueError("stage_id can only be regenerated for step5")
+        run = await asyncio.to_thread(self.runs.get, run_id)
+        if stage_id is not None:
+            for name in ("step4", "step5"):
+                if (run["steps"].get(name) or {}).get("status") != "completed":
+                    raise ValueError(f"Run {run_id} has no completed {name} to regenerate a stage from")
+            if not any(stage["id"] == stage_id for stage in run["steps"]["step4"]["output"]["stages"]):
+                raise ValueError(f"Unknown stage '{stage_id}'")
+            return await self._execute_run(run, refill_stage=stage_id)
+        for name in STEP_NAMES[STEP_NAMES.index(step):]:
+            run["steps"].pop(name, None)
+        return await self._execute_run(run)
+
+    async def _checkpointed(self, run: Dict[str, Any], name: str, model, make):
+        """Return the step's checkpoint if it completed before, else run it and record output + timings."""
+        checkpoint = run["steps"].get(name) or {}
+        if checkpoint.get("status") == "completed":
+            print(f"   ↩ Reusing {name} checkpoint")
+            return model.model_validate(checkpoint["output"])
+        
+        started_at, started = utc_now(), time.perf_counter()
+        run["steps"][name] = {"status": "running", "started_at": started_at}
+        await asyncio.to_thread(self.runs.save, run)
+        try:
+            output = await make()
+        except Exception as e:
+            run["steps"][name] = {
+                "status": "failed",
+                "started_at": started_at,
+                "finished_at": utc_now(),
+                "duration_s": round(time.perf_counter() - started, 3),
+                "error": str(e)
+            }
+            raise
+        run["steps"][name] = {
+            "status": "completed",
+            "started_at": started_at,
+            "finished_at": utc_now(),
+            "duration_s": round(time.perf_counter() - started, 3),
+            "output": output.model_dump(mode="json")
+        }
+        await asyncio.to_thread(self.runs.save, run)
+        return output
+
+    async def _refill_stage(self, run: Dict[str, Any], stage_id: str) -> None:
+        """Re-run step 5 for one stage and splice the result into the step 5 checkpoint."""
+        step4 = Step4Output.model_validate(run["steps"]["step4"]["output"])
+        step5 = Step5Output.model_validate(run["steps"]["step5"]["output"])
+        stage = next(s for s in step4.stages if s.id == stage_id)
+        
+        print(f"📦 Step 5: Re-matching resources for {stage_id}...")
+        started_at, started = utc_now(), time.perf_counter()
+        refilled = (await self.step5_fill_resources([stage])).enriched_stages[0]
+        step5.enriched_stages = [refilled if e.id == stage_id else e for e in step5.enriched_stages]
+        run["steps"]["step5"] = {
+            "status": "completed",
+            "started_at": started_at,
+            "finished_at": utc_now(),
+            "duration_s": round(time.perf_counter() - started, 3),
+            "regenerated_stage": stage_id,
+            "output": step5.model_dump(mode="json")
+        }
+        run["steps"].pop("step6", None)
+
+    async def _execute_run(self, run: Dict[str, Any], refill_stage: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run every step that has no completed checkpoint, under the run's lease.
+        
+        Store and lease calls go through worker threads one at a time and
+        without a timeout: checkpoint writes must land in order, and a slow
+        write should not fail a run whose steps succeeded.
+        """
+        user_goal = run["goal"]
+        await asyncio.to_thread(self.runs.acquire, run["id"])
+        step = None
+        try:
+            await asyncio.to_thread(self.runs.save, run, status="running", error=None)
+            print(f"🧠 CourseRoadmapAgent: Starting pipeline (run {run['id']})...")
+            
+            if refill_stage is not None:
+                step = "step5"
+                await self._refill_stage(run, refill_stage)
+            
+            # Step 1: Understand User
+            print("📋 Step 1: Understanding user profile...")
+            step = "step1"
+            step1 = await self._checkpointed(run, step, Step1Output, lambda: self.step1_understand_user(user_goal))
+            print("Profile ", "-" * 30, "\n")
+            print(step1.profile)
+            
+            # Step 2: Generate Queries
+            print("🔍 Step 2: Generating search queries...")
+            step = "step2"
+            step2 = await self._checkpointed(run, step, Step2Output, lambda: self.step2_generate_queries(step1.profile))
+            print("Queries ", "-" * 30, "\n")
+            print(step2.queries)
+            
+            # Step 3: Clean Advisement
+            print("📚 Step 3: Fetching and cleaning advisement corpus...")
+            step = "step3"
+            step3 = await self._checkpointed(run, step, Step3Output, lambda: self.step3_clean_advisement(step2.queries))
+            print("Advisement Units ", "-" * 30, "\n")
+            print(step3.advisement_corpus)
+            
+            # Step 4: Build Roadmap
+            print("🗺️  Step 4: Building staged roadmap...")
+            step = "step4"
+            step4 = await self._checkpointed(
+                run, step, Step4Output,
+                lambda: self.step4_build_roadmap(step1.profile, step3.advisement_corpus)
+            )
+            print("Stages ", "-" * 30, "\n")
+            print(step4.stages)
+            
+            # Step 5: Fill Resources
+            print("📦 Step 5: Matching resources to stages...")
+            step = "step5"
+            step5 = await self._checkpointed(run, step, Step5Output, lambda: self.step5_fill_resources(step4.stages))
+            print(f"   Matched resources to {len(step5.enriched_stages)} stages")
+            
+            # Step 6: UI-Ready Output
+            print("🎨 Step 6: Formatting UI-ready output...")
+            step = "step6"
+            step6 = await self._checkpointed(
+                run, step, Step6Output,
+                lambda: self.step6_ui_ready(user_goal, step4.stages, step5.enriched_stages)
+            )
+            print(f"   ✓ Roadmap complete with {len(step6.nodes)} nodes")
+            
+            roadmap_data = step6.model_dump(mode="json")
+            await asyncio.to_thread(self._save_learning_path, run, roadmap_data)
+            await asyncio.to_thread(self.runs.save, run, status="completed")
+            return roadmap_data
+        except Exception as e:
+            print(f"   ⚠ Roadmap run {run['id']} failed at {step}: {e}")
+            await asyncio.to_thread(self.runs.save, run, status="failed", error=str(e))
+            raise RunFailed(run["id"], step, e) from e
+        finally:
+            await asyncio.to_thread(self.runs.release, run["id"])
+
+    def _save_learning_path(self, run: Dict[str, Any], roadmap_data: Dict[str, Any]) -> None:
+        """Store the finished roadmap; a regenerated run updates its existing row."""
+        if not self.supabase_client:
+            return
+        print("💾 Saving roadmap to Supabase...")
+        try:
+            if run.get("learning_path_id"):
+                with external_call("supabase", "update_learning_path"):
+                    self.supabase_client.table("learning_paths").update({
+                        "roadmap_data": roadmap_data
+                    }).eq("id", run["learning_path_id"]).execute()
+            else:
+                with external_call("supabase", "insert_learning_path"):
+                    response = self.supabase_client.table("learning_paths").insert({
+                        "goal": run["goal"],
+                        "roadmap_data": roadmap_data
+                    }).execute()
+                if response.data:
+                    run["learning_path_id"] = response.data[0].get("id")
+            print("   ✓ Roadmap saved to 'learning_paths' table")
+        except Exception as e:
+            print(f"   ⚠ Failed to save roadmap to Supabase: {e}")
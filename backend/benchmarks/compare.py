@@ -0,0 +1,70 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Usage (from backend/):
+    python -m benchmarks.compare baseline.json current.json --threshold 10
+
+Exits with status 1 if any (scenario, concurrency) pair regressed by more
+than `threshold` percent in p95 latency or throughput.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+def _index(report: Dict) -> Dict[Tuple[str, int], Dict]:
+    return {(r["scenario"], r["concurrency"]): r for r in report.get("results", [])}
+
+
+def _change(old: float, new: float) -> float:
+    return ((new - old) / old * 100) if old else 0.0
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Print a comparison table and return descriptions of regressions."""
+    old_runs, new_runs = _index(baseline), _index(current)
+    regressions = []
+
+    print(f"{'scenario':<18}{'conc':>5}{'p95 old':>11}{'p95 new':>11}{'Δp95':>8}{'rps old':>10}{'rps new':>10}{'Δrps':>8}")
+    for key in sorted(old_runs.keys() & new_runs.keys()):
+        old, new = old_runs[key], new_runs[key]
+        p95_old, p95_new = old["latency_ms"]["p95"], new["latency_ms"]["p95"]
+        rps_old, rps_new = old["throughput_rps"], new["throughput_rps"]
+        d_p95, d_rps = _change(p95_old, p95_new), _change(rps_old, rps_new)
+        print(f"{key[0]:<18}{key[1]:>5}{p95_old:>11.1f}{p95_new:>11.1f}{d_p95:>7.1f}%{rps_old:>10.2f}{rps_new:>10.2f}{d_rps:>7.1f}%")
+
+        if d_p95 > threshold:
+            regressions.append(f"{key[0]} x{key[1]}: p95 +{d_p95:.1f}%")
+        if -d_rps > threshold:
+            regressions.append(f"{key[0]} x{key[1]}: throughput {d_rps:.1f}%")
+        if new["errors"] > old["errors"]:
+            regressions.append(f"{key[0]} x{key[1]}: errors {old['errors']} -> {new['errors']}")
+
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare PostChat benchmark results")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print("\n❌ Regressions:")
+        for line in regressions:
+            print(f"   - {line}")
+        sys.exit(1)
+    print("\n✓ No regressions above threshold")
+
+
+if __name__ == "__main__":
+    main()
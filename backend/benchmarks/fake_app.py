@@ -0,0 +1,41 @@
+"""
+`main.app` wired to the benchmark fakes, importable by a real ASGI server.
+
+Used by benchmarks/workers.py to load-test multi-process deployments:
+
+    BENCH_ARGS="--seed-posts 100" uvicorn benchmarks.fake_app:app --workers 4
+
+Every worker process builds its own fakes from BENCH_ARGS (same flags as
+benchmarks.run) and seeds an identical in-memory corpus on startup, so any
+worker can serve any request.
+"""
+
+import os
+import shlex
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Image downloads would hit the network; read by main.py at import time
+os.environ.setdefault("MEDIA_ENRICHMENT_BACKEND", "none")
+
+from benchmarks.run import FakeEnvironment, parse_args, patched_backend, seed_corpus  # noqa: E402
+
+args = parse_args(shlex.split(os.getenv("BENCH_ARGS", "")))
+env = FakeEnvironment(args)
+
+# Kept patched for the life of the worker process
+_backend = patched_backend(env)
+app = _backend.__enter__()
+
+
+async def _seed() -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://seed", timeout=None) as client:
+        await seed_corpus(client, env, args.seed_posts, args.seed)
+    print(f"🌱 Worker {os.getpid()} seeded {args.seed_posts} posts")
+
+
+app.router.on_startup.append(_seed)
@@ -0,0 +1,839 @@
+"""
+Local stand-ins for the external services used by the backend.
+
+Each fake mimics the client surface the backend actually touches and the way
+it behaves on the event loop: SDKs that are synchronous in production
+(Apify, Tavily, Supabase, embeddings) block with `time.sleep`, while the chat
+model sleeps asynchronously. Outputs are deterministic for a given seed so
+runs are comparable.
+
+- FakeApifyClient         actor(...).call() / dataset(...).iterate_items(); post URLs
+                          return that post, page/group URLs a growing feed
+- FakeChatModel           drop-in for ChatGoogleGenerativeAI (+ with_structured_output)
+- FakeEmbeddings          hash-based unit vectors (embed_query / embed_documents)
+- FakeTavilyClient        search(...)
+- InMemorySupabase        table()/from_() query builder + match_documents RPC
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+
+TOPIC_WORDS = [
+    "python", "backend", "fastapi", "react", "career", "interview", "docker",
+    "kubernetes", "sql", "machine learning", "llm", "system design", "startup",
+    "frontend", "devops", "data engineering", "testing", "security",
+]
+
+
+# ============================================================================
+# LATENCY
+# ============================================================================
+
+class Latency:
+    """Deterministic latency sampler: mean seconds with +/- jitter fraction."""
+
+    def __init__(self, mean: float = 0.0, jitter: float = 0.2, seed: int = 0):
+        self.mean = mean
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        if self.mean <= 0:
+            return 0.0
+        with self._lock:
+            spread = self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.mean * (1 + spread))
+
+    def block(self) -> None:
+        delay = self.sample()
+        if delay:
+            time.sleep(delay)
+
+    async def wait(self) -> None:
+        delay = self.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16)
+
+
+def _pick(seed: int, options: List[str], k: int) -> List[str]:
+    rng = random.Random(seed)
+    return rng.sample(options, k)
+
+
+# ============================================================================
+# APIFY
+# ============================================================================
+
+def make_raw_post(index: int, seed: int = 0) -> Dict[str, Any]:
+    """A raw Apify facebook-posts-scraper item with realistic fields."""
+    rng = random.Random(seed * 100003 + index)
+    topics = rng.sample(TOPIC_WORDS, 3)
+    paragraphs = [
+        f"Thoughts on {topic}: " + " ".join(rng.choice(TOPIC_WORDS) for _ in range(rng.randint(30, 120)))
+        for topic in topics
+    ]
+    post_id = f"{1000000000 + index}"
+    return {
+        "postId": post_id,
+        "url": f"https://www.facebook.com/groups/bench/posts/{post_id}",
+        "time": f"2025-0{1 + index % 9}-1{index % 10}T08:00:00.000Z",
+        "user": {"id": f"user{index % 50}", "name": f"Author {index % 50}", "profilePic": "https://example.com/p.jpg"},
+        "text": "\n\n".join(paragraphs),
+        "likes": rng.randint(0, 5000),
+        "comments": rng.randint(0, 500),
+        "shares": rng.randint(0, 200),
+        "topReactionsCount": rng.randint(0, 5000),
+        "media": [
+            {"__typename": "Photo", "photo_image": {"uri": f"https://example.com/img/{post_id}_{i}.jpg"}}
+            for i in range(rng.randint(0, 3))
+        ],
+    }
+
+
+def post_id_from_url(url: str) -> str:
+    match = re.search(r"(\d{6,})", url)
+    return match.group(1) if match else str(_digest(url) % 10**10)
+
+
+class _FakeActor:
+    def __init__(self, client: "FakeApifyClient"):
+        self._client = client
+
+    def call(self, run_input: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        self._client.latency.block()
+        items = []
+        for start in run_input.get("startUrls", []):
+            if not re.search(r"\d{6,}", start["url"]):
+                items.extend(self._client.page_feed(start["url"], run_input))
+                continue
+            post_id = post_id_from_url(start["url"])
+            item = make_raw_post(int(post_id) % 10**6, seed=self._client.seed)
+            item["postId"] = post_id
+            item["url"] = start["url"]
+            items.append(item)
+        dataset_id = uuid.uuid4().hex
+        self._client.datasets[dataset_id] = items
+        self._client.runs += 1
+        return {"id": uuid.uuid4().hex, "status": "SUCCEEDED", "defaultDatasetId": dataset_id}
+
+
+class _FakeDataset:
+    def __init__(self, items: List[Dict[str, Any]]):
+        self._items = items
+
+    def iterate_items(self) -> Iterator[Dict[str, Any]]:
+        return iter(list(self._items))
+
+
+class FakeApifyClient:
+    """Shared fake; use `factory()` to patch `ApifyClient(api_key)` call sites."""
+
+    def __init__(
+        self,
+        latency: Optional[Latency] = None,
+        seed: int = 0,
+        page_initial_posts: int = 20,
+        page_posts_per_run: int = 3,
+    ):
+        self.latency = latency or Latency()
+        self.seed = seed
+        self.datasets: Dict[str, List[Dict[str, Any]]] = {}
+        self.runs = 0
+        self.page_initial_posts = page_initial_posts
+        self.page_posts_per_run = page_posts_per_run
+        self._page_runs: Dict[str, int] = {}
+        self._epoch = datetime.now(timezone.utc) - timedelta(days=30)
+        self._lock = threading.Lock()
+
+    def page_feed(self, url: str, run_input: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        A page that gains `page_posts_per_run` posts (one hour apart) per run,
+        newest first, honouring `resultsLimit` and `onlyPostsNewerThan`.
+        Engagement grows between runs.
+        """
+        with self._lock:
+            runs = self._page_runs[url] = self._page_runs.get(url, 0) + 1
+        base = _digest(url) % 10**6
+        newer_than = run_input.get("onlyPostsNewerThan")
+        if newer_than:
+            newer_than = datetime.fromisoformat(newer_than.replace("Z", "+00:00"))
+            newer_than = newer_than if newer_than.tzinfo else newer_than.replace(tzinfo=timezone.utc)
+
+        items = []
+        for i in reversed(range(self.page_initial_posts + runs * self.page_posts_per_run)):
+            published = self._epoch + timedelta(hours=i)
+            if newer_than and published <= newer_than:
+                break
+            item = make_raw_post(base + i, seed=self.seed)
+            item["postId"] = str(9_000_000_000 + base * 1000 + i)
+            item["url"] = f"{url.rstrip('/')}/posts/{item['postId']}"
+            item["time"] = published.isoformat().replace("+00:00", "Z")
+            item["likes"] += runs * 10
+            items.append(item)
+            if len(items) >= run_input.get("resultsLimit", 50):
+                break
+        return items
+
+    def actor(self, actor_id: str) -> _FakeActor:
+        return _FakeActor(self)
+
+    def dataset(self, dataset_id: str) -> _FakeDataset:
+        return _FakeDataset(self.datasets.get(dataset_id, []))
+
+    def factory(self) -> Callable[..., "FakeApifyClient"]:
+        return lambda *args, **kwargs: self
+
+
+# ============================================================================
+# CHAT MODEL
+# ============================================================================
+
+def _prompt_text(prompt_value: Any) -> str:
+    if hasattr(prompt_value, "to_messages"):
+        return "\n".join(str(m.content) for m in prompt_value.to_messages())
+    return str(prompt_value)
+
+
+def _between(text: str, start: str, end: Optional[str] = None) -> str:
+    head = text.split(start, 1)[-1]
+    return head.split(end, 1)[0] if end else head
+
+
+def _fake_processed_post(schema: Type[BaseModel], text: str, seed: int) -> BaseModel:
+    raw = json.loads(_between(text, "Raw Data: "))
+    topics = _pick(_digest(raw.get("postId", "")) + seed, TOPIC_WORDS, 4)
+    body = raw.get("text") or ""
+    return schema(
+        original_post_id=str(raw.get("postId")),
+        url=raw.get("url", ""),
+        published_at=raw.get("time"),
+        author_name=(raw.get("user") or {}).get("name", "Unknown"),
+        author_id=(raw.get("user") or {}).get("id"),
+        author_profile_pic=(raw.get("user") or {}).get("profilePic"),
+        raw_text=body,
+        summary=body[:160],
+        sentiment=["Positive", "Neutral", "Negative", "Mixed"][_digest(body) % 4],
+        topics=topics,
+        category=["News", "Tech", "Personal", "Other"][_digest(body) % 4],
+        media=[
+            {"type": "photo", "url": m.get("photo_image", {}).get("uri", "")}
+            for m in raw.get("media", [])
+        ],
+        engagement_metrics={
+            "likes": raw.get("likes", 0),
+            "comments": raw.get("comments", 0),
+            "shares": raw.get("shares", 0),
+        },
+    )
+
+
+def _fake_stage_matches(schema: Type[BaseModel], text: str, seed: int) -> BaseModel:
+    stages = json.loads(_between(text, "Stages: ", "\n\nPosts:"))
+    assignments = []
+    for stage in stages:
+        picked = stage.get("candidate_post_ids", [])[:3]
+        assignments.append({
+            "stage_id": stage["id"],
+            "posts": [{"id": pid, "reason": f"Relevant to {stage['title']}"} for pid in picked],
+        })
+    return schema(stages=assignments)
+
+
+def _fake_generic(schema: Type[BaseModel], text: str, seed: int) -> BaseModel:
+    """Fill any schema with deterministic placeholder values."""
+    base = _digest(text) + seed
+
+    def value_for(annotation: Any, name: str, depth: int) -> Any:
+        origin = getattr(annotation, "__origin__", None)
+        args = getattr(annotation, "__args__", ())
+        if origin is list or origin is List:
+            return [value_for(args[0] if args else str, f"{name}_{i}", depth + 1) for i in range(3)]
+        if origin is dict or origin is Dict:
+            return {}
+        if origin is not None and type(None) in args:
+            return value_for(next(a for a in args if a is not type(None)), name, depth)
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return build(annotation, depth + 1)
+        if annotation is int:
+            return base % 100
+        if annotation is float:
+            return (base % 100) / 100
+        if annotation is bool:
+            return bool(base % 2)
+        return f"{name} {TOPIC_WORDS[(base + depth + len(name)) % len(TOPIC_WORDS)]}"
+
+    def build(model: Type[BaseModel], depth: int) -> BaseModel:
+        values = {}
+        for name, field in model.model_fields.items():
+            if name == "id":
+                values[name] = f"stage_{depth}" if model.__name__ == "RoadmapStage" else f"{name}_{base % 1000}"
+                continue
+            values[name] = value_for(field.annotation, name, depth)
+        return model(**values)
+
+    result = build(schema, 0)
+    # Roadmap stages need unique ids to be matched later
+    if hasattr(result, "stages") and result.stages and hasattr(result.stages[0], "id"):
+        for i, stage in enumerate(result.stages):
+            stage.id = f"stage_{i + 1}"
+    return result
+
+
+STRUCTURED_FACTORIES: Dict[str, Callable[[Type[BaseModel], str, int], BaseModel]] = {
+    "ProcessedPost": _fake_processed_post,
+    "BatchedPostMatches": _fake_stage_matches,
+}
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model with configurable latency.
+
+    Accepts ChatGoogleGenerativeAI constructor arguments so it can replace it
+    in place; `with_structured_output` returns schema instances derived from
+    the prompt (e.g. ProcessedPost fields come from the raw Apify item).
+    """
+
+    model: str = "fake-gemini"
+    google_api_key: Optional[str] = None
+    temperature: float = 0.0
+    max_retries: int = 0
+    latency_s: float = 0.0
+    jitter: float = 0.2
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        reply = f"Based on your saved posts: {prompt[-200:]}"
+        message = AIMessage(
+            content=reply,
+            usage_metadata={
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(reply) // 4,
+                "total_tokens": (len(prompt) + len(reply)) // 4,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        Latency(self.latency_s, self.jitter, seed=_digest(str(messages))).block()
+        return self._respond(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await Latency(self.latency_s, self.jitter, seed=_digest(str(messages))).wait()
+        return self._respond(messages)
+
+    def with_structured_output(self, schema: Type[BaseModel], **kwargs: Any):
+        factory = STRUCTURED_FACTORIES.get(schema.__name__, _fake_generic)
+
+        def build(prompt_value: Any) -> BaseModel:
+            return factory(schema, _prompt_text(prompt_value), self.seed)
+
+        async def abuild(prompt_value: Any) -> BaseModel:
+            text = _prompt_text(prompt_value)
+            await Latency(self.latency_s, self.jitter, seed=_digest(text)).wait()
+            return factory(schema, text, self.seed)
+
+        return RunnableLambda(build, afunc=abuild, name=f"fake_structured_{schema.__name__}")
+
+
+# ============================================================================
+# EMBEDDINGS
+# ============================================================================
+
+class FakeEmbeddings(Embeddings):
+    """
+    Bag-of-words hashed into a fixed-size unit vector.
+
+    Texts sharing words get high cosine similarity, so semantic search and
+    stage matching return plausible neighbours.
+    """
+
+    def __init__(self, dimensions: int = 256, latency: Optional[Latency] = None):
+        self.dimensions = dimensions
+        self.latency = latency or Latency()
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        vec = [0.0] * self.dimensions
+        for word in re.findall(r"\w+", text.lower()):
+            vec[_digest(word) % self.dimensions] += 1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.latency.block()
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        self.latency.block()
+        return self._vector(text)
+
+
+# ============================================================================
+# TAVILY
+# ============================================================================
+
+class FakeTavilyClient:
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency()
+        self.calls = 0
+
+    def search(self, query: str, max_results: int = 5, **kwargs: Any) -> Dict[str, Any]:
+        self.calls += 1
+        self.latency.block()
+        base = _digest(query)
+        return {
+            "query": query,
+            "results": [
+                {
+                    "url": f"https://example.com/{base % 10**6}/{i}",
+                    "title": f"{query[:40]} — result {i + 1}",
+                    "content": f"Advice for {query}: focus on {', '.join(_pick(base + i, TOPIC_WORDS, 3))}.",
+                    "score": 1.0 - i * 0.1,
+                }
+                for i in range(max_results)
+            ],
+        }
+
+
+# ============================================================================
+# SUPABASE
+# ============================================================================
+
+class FakeResponse:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _ilike(pattern: str) -> "re.Pattern[str]":
+    regex = "^" + re.escape(pattern).replace("%", ".*").replace("_", ".") + "$"
+    return re.compile(regex, re.IGNORECASE | re.DOTALL)
+
+
+def _get(row: Dict[str, Any], column: str) -> Any:
+    """Read a column, following postgrest JSON paths like metadata->>post_id."""
+    if "->" not in column:
+        return row.get(column)
+    parts = column.replace("->>", "->").split("->")
+    value: Any = row.get(parts[0])
+    for part in parts[1:]:
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _split_top_level(expr: str) -> List[str]:
+    """Split a PostgREST logic tree on commas outside parentheses and quotes."""
+    parts, depth, quoted, current = [], 0, False, ""
+    for ch in expr:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        current += ch
+    parts.append(current)
+    return [p for p in parts if p]
+
+
+_COMPARATORS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+}
+
+
+def _parse_condition(expr: str) -> Callable[[Dict[str, Any]], bool]:
+    for combinator, reducer in (("and(", all), ("or(", any)):
+        if expr.startswith(combinator) and expr.endswith(")"):
+            conditions = [_parse_condition(e) for e in _split_top_level(expr[len(combinator):-1])]
+            return lambda row: reducer(cond(row) for cond in conditions)
+    column, op, value = expr.split(".", 2)
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = value[1:-1].replace('\\"', '"')
+    if op == "ilike":
+        pattern = _ilike(value)
+        return lambda row: _get(row, column) is not None and bool(pattern.match(str(_get(row, column))))
+    if op == "is":
+        return lambda row: _get(row, column) is None if value == "null" else str(_get(row, column)).lower() == value
+    if op in _COMPARATORS:
+        compare = _COMPARATORS[op]
+        return lambda row: _get(row, column) is not None and compare(str(_get(row, column)), value)
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+class _Query:
+    """Chainable subset of the postgrest query builder."""
+
+    def __init__(self, db: "InMemorySupabase", table: str):
+        self._db = db
+        self._table = table
+        self._action = "select"
+        self._columns: Optional[List[str]] = None
+        self._filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._payload: Any = None
+        self._on_conflict: Optional[str] = None
+        self._count: Optional[str] = None
+        self._negate_next = False
+
+    # --- actions ---
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "_Query":
+        self._action = "select"
+        self._columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        self._count = count
+        return self
+
+    def insert(self, payload: Any, **kwargs: Any) -> "_Query":
+        self._action, self._payload = "insert", payload
+        return self
+
+    def upsert(self, payload: Any, on_conflict: Optional[str] = None, **kwargs: Any) -> "_Query":
+        self._action, self._payload, self._on_conflict = "upsert", payload, on_conflict
+        return self
+
+    def update(self, payload: Dict[str, Any], **kwargs: Any) -> "_Query":
+        self._action, self._payload = "update", payload
+        return self
+
+    def delete(self, **kwargs: Any) -> "_Query":
+        self._action = "delete"
+        return self
+
+    # --- filters ---
+    def _filter(self, predicate: Callable[[Dict[str, Any]], bool]) -> None:
+        if self._negate_next:
+            self._negate_next = False
+            self._filters.append(lambda row: not predicate(row))
+        else:
+            self._filters.append(predicate)
+
+    @property
+    def not_(self) -> "_Query":
+        self._negate_next = True
+        return self
+
+    def eq(self, column: str, value: Any) -> "_Query":
+        self._filter(lambda row: _get(row, column) == value)
+        return self
+
+    def neq(self, column: str, value: Any) -> "_Query":
+        self._filter(lambda row: _get(row, column) != value)
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "_Query":
+        allowed = set(values)
+        self._filter(lambda row: _get(row, column) in allowed)
+        return self
+
+    def gt(self, column: str, value: Any) -> "_Query":
+        self._filter(lambda row: _get(row, column) is not None and _get(row, column) > value)
+        return self
+
+    def gte(self, column: str, value: Any) -> "_Query":
+        self._filter(lambda row: _get(row, column) is not None and _get(row, column) >= value)
+        return self
+
+    def lt(self, column: str, value: Any) -> "_Query":
+        self._filter(lambda row: _get(row, column) is not None and _get(row, column) < value)
+        return self
+
+    def lte(self, column: str, value: Any) -> "_Query":
+        self._filter(lambda row: _get(row, column) is not None and _get(row, column) <= value)
+        return self
+
+    def contains(self, column: str, values: Any) -> "_Query":
+        if isinstance(values, dict):
+            self._filter(lambda row: all((_get(row, column) or {}).get(k) == v for k, v in values.items()))
+        else:
+            self._filter(lambda row: set(values) <= set(_get(row, column) or []))
+        return self
+
+    def is_(self, column: str, value: Any) -> "_Query":
+        self._filter(_parse_condition(f"{column}.is.{value}"))
+        return self
+
+    def or_(self, filters: str, **kwargs: Any) -> "_Query":
+        conditions = [_parse_condition(expr) for expr in _split_top_level(filters)]
+        self._filter(lambda row: any(cond(row) for cond in conditions))
+        return self
+
+    # --- modifiers ---
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None, **kwargs: Any) -> "_Query":
+        # Postgres default: NULLS LAST for ASC, NULLS FIRST for DESC
+        self._order.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, size: int, **kwargs: Any) -> "_Query":
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int, **kwargs: Any) -> "_Query":
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def execute(self) -> FakeResponse:
+        self._db.latency.block()
+        with self._db.lock:
+            return getattr(self, f"_execute_{self._action}")()
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(f(row) for f in self._filters)
+
+    def _execute_select(self) -> FakeResponse:
+        rows = [r for r in self._db.tables.setdefault(self._table, []) if self._matches(r)]
+        for column, desc, nullsfirst in reversed(self._order):
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r.get(column), reverse=desc)
+            rows = missing + present if nullsfirst else present + missing
+        total = len(rows)
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        if self._columns is not None:
+            rows = [{c: r.get(c) for c in self._columns} for r in rows]
+        return FakeResponse([dict(r) for r in rows], total if self._count else None)
+
+    def _records(self) -> List[Dict[str, Any]]:
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        return [json.loads(json.dumps(r, default=str)) for r in payload]
+
+    def _execute_insert(self) -> FakeResponse:
+        rows = self._db.tables.setdefault(self._table, [])
+        inserted = []
+        for record in self._records():
+            record.setdefault("id", str(uuid.uuid4()))
+            record.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime()))
+            rows.append(record)
+            inserted.append(dict(record))
+        return FakeResponse(inserted)
+
+    def _execute_upsert(self) -> FakeResponse:
+        rows = self._db.tables.setdefault(self._table, [])
+        key = self._on_conflict or "id"
+        index = {r.get(key): r for r in rows}
+        written = []
+        for record in self._records():
+            existing = index.get(record.get(key))
+            if existing is not None:
+                existing.update(record)
+                written.append(dict(existing))
+            else:
+                record.setdefault("id", str(uuid.uuid4()))
+                record.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime()))
+                rows.append(record)
+                index[record.get(key)] = record
+                written.append(dict(record))
+        return FakeResponse(written)
+
+    def _execute_update(self) -> FakeResponse:
+        updated = []
+        for row in self._db.tables.setdefault(self._table, []):
+            if self._matches(row):
+                row.update(json.loads(json.dumps(self._payload, default=str)))
+                updated.append(dict(row))
+        return FakeResponse(updated)
+
+    def _execute_delete(self) -> FakeResponse:
+        rows = self._db.tables.setdefault(self._table, [])
+        kept, deleted = [], []
+        for row in rows:
+            (deleted if self._matches(row) else kept).append(row)
+        self._db.tables[self._table] = kept
+        return FakeResponse(deleted)
+
+
+class _RpcCall:
+    def __init__(self, db: "InMemorySupabase", name: str, params: Dict[str, Any]):
+        self._db = db
+        self._name = name
+        self._params = params
+
+    def execute(self) -> FakeResponse:
+        handler = self._db.rpcs.get(self._name)
+        if handler is None:
+            raise ValueError(f"Unknown RPC: {self._name}")
+        self._db.latency.block()
+        with self._db.lock:
+            return FakeResponse(handler(self._db, self._params))
+
+
+def _match_documents(db: "InMemorySupabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    query = params["query_embedding"]
+    wanted = params.get("filter") or {}
+    scored = []
+    for row in db.tables.get("documents", []):
+        metadata = row.get("metadata") or {}
+        if any(metadata.get(k) != v for k, v in wanted.items()):
+            continue
+        embedding = row.get("embedding") or []
+        similarity = sum(a * b for a, b in zip(query, embedding))
+        scored.append({"id": row["id"], "content": row.get("content"), "metadata": metadata, "similarity": similarity})
+    scored.sort(key=lambda r: r["similarity"], reverse=True)
+    return scored[:params.get("match_count", 10)]
+
+
+def _refresh_engagement(db: "InMemorySupabase", params: Dict[str, Any]) -> int:
+    by_id = {u["original_post_id"]: u["engagement_metrics"] for u in params.get("updates", [])}
+    changed = 0
+    for row in db.tables.get("posts", []):
+        if row.get("original_post_id") in by_id:
+            row["engagement_metrics"] = by_id[row["original_post_id"]]
+            changed += 1
+    return changed
+
+
+# Analytics RPCs: computed from `posts` on every call instead of from trigger-maintained rollups
+
+def _author_key(row: Dict[str, Any]) -> Optional[str]:
+    return row.get("author_id") or row.get("author_name")
+
+
+def _score(row: Dict[str, Any]) -> int:
+    metrics = row.get("engagement_metrics") or {}
+    return sum(int(metrics.get(k) or 0) for k in ("likes", "comments", "shares"))
+
+
+def _analytics_top_topics(db: "InMemorySupabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    counts: Dict[str, int] = {}
+    for row in db.tables.get("posts", []):
+        for topic in set(row.get("topics") or []):
+            if topic:
+                counts[topic] = counts.get(topic, 0) + 1
+    ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+    return [{"topic": t, "post_count": n} for t, n in ranked[:params.get("max_topics", 20)]]
+
+
+def _analytics_sentiment_series(db: "InMemorySupabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    counts: Dict[tuple, int] = {}
+    for row in db.tables.get("posts", []):
+        stamp = row.get("published_at") or row.get("created_at")
+        if not stamp:
+            continue
+        day = datetime.fromisoformat(str(stamp).replace("Z", "+00:00")).astimezone(timezone.utc).date()
+        if (params.get("since") and day.isoformat() < params["since"]) or (params.get("until") and day.isoformat() > params["until"]):
+            continue
+        if params.get("bucket") == "week":
+            day = day - timedelta(days=day.weekday())
+        elif params.get("bucket") == "month":
+            day = day.replace(day=1)
+        key = (day.isoformat(), row.get("sentiment") or "Unknown")
+        counts[key] = counts.get(key, 0) + 1
+    return [{"bucket_start": d, "sentiment": s, "post_count": n} for (d, s), n in sorted(counts.items())]
+
+
+def _analytics_top_authors(db: "InMemorySupabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    authors: Dict[str, Dict[str, Any]] = {}
+    for row in db.tables.get("posts", []):
+        key = _author_key(row)
+        if not key:
+            continue
+        entry = authors.setdefault(key, {
+            "author_key": key, "author_name": row.get("author_name"),
+            "author_profile_pic": row.get("author_profile_pic"), "post_count": 0, "total_engagement": 0,
+        })
+        entry["post_count"] += 1
+        entry["total_engagement"] += _score(row)
+    field = "total_engagement" if params.get("order_by") == "engagement" else "post_count"
+    ranked = sorted(authors.values(), key=lambda a: (-a[field], a["author_key"]))
+    return ranked[:params.get("max_authors", 10)]
+
+
+def _analytics_engagement_histogram_rows(db: "InMemorySupabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    counts: Dict[int, int] = {}
+    for row in db.tables.get("posts", []):
+        bucket = math.floor(4 * math.log2(_score(row) + 1))
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return [{"bucket": b, "post_count": n} for b, n in sorted(counts.items())]
+
+
+def _analytics_topic_breakdown(db: "InMemorySupabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    by_sentiment: Dict[str, List[int]] = {}
+    for row in db.tables.get("posts", []):
+        if params["topic"] in (row.get("topics") or []):
+            by_sentiment.setdefault(row.get("sentiment") or "Unknown", []).append(_score(row))
+    rows = [{"sentiment": s, "post_count": len(v), "total_engagement": sum(v)} for s, v in by_sentiment.items()]
+    return sorted(rows, key=lambda r: -r["post_count"])
+
+
+class InMemorySupabase:
+    """
+    In-memory replacement for `supabase.Client` covering the calls the
+    backend makes, including the `match_documents` RPC (exact cosine scan),
+    `refresh_engagement` and the analytics RPCs.
+    Register extra RPCs in `rpcs` as the schema grows.
+    """
+
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency()
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.rpcs: Dict[str, Callable[["InMemorySupabase", Dict[str, Any]], Any]] = {
+            "match_documents": _match_documents,
+            "refresh_engagement": _refresh_engagement,
+            "analytics_top_topics": _analytics_top_topics,
+            "analytics_sentiment_series": _analytics_sentiment_series,
+            "analytics_top_authors": _analytics_top_authors,
+            "analytics_engagement_histogram_rows": _analytics_engagement_histogram_rows,
+            "analytics_topic_breakdown": _analytics_topic_breakdown,
+        }
+        self.lock = threading.RLock()
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _RpcCall:
+        return _RpcCall(self, name, params or {})
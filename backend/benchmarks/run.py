@@ -0,0 +1,358 @@
+"""
+Offline benchmark / load test for the PostChat backend.
+
+Runs the real FastAPI app (`main.app`) and CourseRoadmapAgent in-process over
+ASGI, with every external dependency replaced by the fakes in
+benchmarks/fakes.py, and reports throughput and latency percentiles per
+scenario and concurrency level.
+
+Usage (from backend/):
+    python -m benchmarks.run
+    python -m benchmarks.run --scenarios ingest,chat --concurrency 1,8,32 --requests 100
+    python -m benchmarks.run --llm-latency 0.8 --output results/baseline.json
+
+Compare two result files with `python -m benchmarks.compare old.json new.json`.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import (  # noqa: E402
+    TOPIC_WORDS,
+    FakeApifyClient,
+    FakeChatModel,
+    FakeEmbeddings,
+    FakeTavilyClient,
+    InMemorySupabase,
+    Latency,
+    make_raw_post,
+)
+
+SCENARIOS = ["ingest", "ingest_captured", "search_keyword", "search_semantic", "chat", "roadmap"]
+
+GOALS = [
+    "I'm an IT student with basic Python, I want a backend junior job in 6 months",
+    "Career switcher from marketing, want to become a data analyst, 2 hours per day",
+    "Frontend dev who knows React, wants to move into ML engineering within a year",
+    "Self-taught programmer aiming for a DevOps role, can study full time for 4 months",
+]
+
+
+# ============================================================================
+# ENVIRONMENT
+# ============================================================================
+
+class FakeEnvironment:
+    """All fakes wired into the backend for one benchmark session."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.llm_latency = args.llm_latency
+        self.apify = FakeApifyClient(Latency(args.apify_latency, seed=1), seed=args.seed)
+        self.embeddings = FakeEmbeddings(args.embedding_dim, Latency(args.embed_latency, seed=2))
+        self.tavily = FakeTavilyClient(Latency(args.tavily_latency, seed=3))
+        self.db = InMemorySupabase(Latency(args.db_latency, seed=4))
+        self.seed = args.seed
+
+    def chat_model(self, **kwargs: Any) -> FakeChatModel:
+        kwargs.setdefault("latency_s", self.llm_latency)
+        kwargs.setdefault("seed", self.seed)
+        return FakeChatModel(**kwargs)
+
+    @contextmanager
+    def zero_latency(self):
+        """Temporarily disable all fake latency (used for seeding)."""
+        latencies = [self.apify.latency, self.embeddings.latency, self.tavily.latency, self.db.latency]
+        saved = [l.mean for l in latencies] + [self.llm_latency]
+        for l in latencies:
+            l.mean = 0.0
+        self.llm_latency = 0.0
+        try:
+            yield
+        finally:
+            for l, mean in zip(latencies, saved):
+                l.mean = mean
+            self.llm_latency = saved[-1]
+
+
+@contextmanager
+def patched_backend(env: FakeEnvironment):
+    """Import main.py and swap its clients for the fakes, restoring afterwards."""
+    import main
+    from agents.course_roadmap_agent import CourseRoadmapAgent
+    from langchain_community.vectorstores import SupabaseVectorStore
+    from services.embedding_batcher import BatchedEmbeddings
+
+    # Batched like production, so embedding round trips are measured as deployed
+    embeddings = BatchedEmbeddings(
+        env.embeddings, window_s=main.EMBED_BATCH_WINDOW_MS / 1000, max_size=main.EMBED_BATCH_MAX
+    )
+    try:
+        embeddings.bind(asyncio.get_running_loop())
+    except RuntimeError:
+        pass  # no loop yet (fake_app): main's startup hook binds it
+    vector_store = SupabaseVectorStore(
+        embedding=embeddings,
+        client=env.db,
+        table_name="documents",
+        query_name="match_documents",
+    )
+    agent = CourseRoadmapAgent(
+        google_api_key="bench",
+        tavily_api_key="bench",
+        supabase_client=env.db,
+        vector_store=vector_store,
+        embeddings=embeddings,
+    )
+    agent.llm = _LazyChatModel(env)
+    agent.tavily_client = env.tavily
+
+    overrides = {
+        "GOOGLE_API_KEY": "bench",
+        "APIFY_API_KEY": "bench",
+        "ApifyClient": env.apify.factory(),
+        "ChatGoogleGenerativeAI": env.chat_model,
+        "supabase_client": env.db,
+        "embeddings": embeddings,
+        "vector_store": vector_store,
+        "roadmap_agent": agent,
+    }
+    saved = {name: getattr(main, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(main, name, value)
+    try:
+        yield main.app
+    finally:
+        for name, value in saved.items():
+            setattr(main, name, value)
+
+
+class _LazyChatModel:
+    """Proxy so the agent's long-lived LLM picks up latency changes (e.g. seeding)."""
+
+    def __init__(self, env: FakeEnvironment):
+        self._env = env
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._env.chat_model(), name)
+
+
+# ============================================================================
+# SCENARIOS
+# ============================================================================
+
+def build_request(scenario: str, index: int, rng: random.Random, args: argparse.Namespace) -> Dict[str, Any]:
+    """Return {"path": ..., "json": ...} for one request of `scenario`."""
+    if scenario == "ingest":
+        post_id = 2_000_000_000 + args.seed * 1_000_000 + index
+        return {"path": "/get_post_info", "json": {"url": f"https://www.facebook.com/groups/bench/posts/{post_id}"}}
+    if scenario == "ingest_captured":
+        # What the extension reads from the page; no Apify run
+        raw = make_raw_post(index, seed=args.seed + 1)
+        return {"path": "/ingest_captured_post", "json": {
+            "url": raw["url"],
+            "text": raw["text"],
+            "author_name": raw["user"]["name"],
+            "author_id": raw["user"]["id"],
+            "published_at": raw["time"],
+            "likes": raw["likes"],
+            "comments": raw["comments"],
+            "shares": raw["shares"],
+            "media": [{"type": "photo", "url": m["photo_image"]["uri"]} for m in raw["media"]],
+        }}
+    if scenario == "search_keyword":
+        return {"path": "/search_posts_v2", "json": {"query": rng.choice(TOPIC_WORDS), "limit": 10}}
+    if scenario == "search_semantic":
+        query = " ".join(rng.sample(TOPIC_WORDS, 3))
+        return {"path": "/search_posts_v2", "json": {"query": query, "limit": 10, "advanced_mode": True}}
+    if scenario == "chat":
+        return {"path": "/chat", "json": {"message": f"What did people say about {rng.choice(TOPIC_WORDS)}?"}}
+    if scenario == "roadmap":
+        return {"path": "/roadmap", "json": {"goal": rng.choice(GOALS)}}
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    make_request: Callable[[int], Dict[str, Any]],
+    total: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """
+    Issue `total` requests with `concurrency` workers; return latency stats.
+    
+    Requests shed by admission control (429/503 + Retry-After) are counted as
+    `shed`, not errors, and left out of latency and throughput.
+    """
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors: List[str] = []
+    shed = 0
+
+    async def worker() -> None:
+        nonlocal shed
+        while True:
+            index = next(counter)
+            if index >= total:
+                return
+            req = make_request(index)
+            start = time.perf_counter()
+            try:
+                response = await client.post(req["path"], json=req["json"])
+                if response.status_code in (429, 503) and "retry-after" in response.headers:
+                    shed += 1
+                    continue
+                body = response.json()
+                ok = response.status_code == 200 and body.get("success", True)
+                if not ok:
+                    errors.append(str(body.get("error") or response.status_code))
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "shed": shed,
+        "error_samples": sorted(set(errors))[:5],
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round((total - shed) / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+            "p50": round(percentile(ordered, 50), 2),
+            "p95": round(percentile(ordered, 95), 2),
+            "p99": round(percentile(ordered, 99), 2),
+            "max": round(ordered[-1], 2) if ordered else 0.0,
+        },
+    }
+
+
+async def seed_corpus(client: httpx.AsyncClient, env: FakeEnvironment, count: int, seed: int) -> None:
+    """Ingest `count` posts through /get_post_info with latency disabled."""
+    with env.zero_latency():
+        for i in range(count):
+            post_id = 1_000_000_000 + seed * 1_000_000 + i
+            await client.post("/get_post_info", json={"url": f"https://www.facebook.com/groups/bench/posts/{post_id}"})
+
+
+async def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    env = FakeEnvironment(args)
+    results = []
+
+    with patched_backend(env) as app:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            print(f"🌱 Seeding {args.seed_posts} posts...")
+            await seed_corpus(client, env, args.seed_posts, args.seed)
+
+            for scenario in args.scenarios:
+                for concurrency in args.concurrency:
+                    rng = random.Random(f"{args.seed}-{scenario}-{concurrency}")
+                    offset = len(results) * (args.requests + args.warmup)
+
+                    def make_request(i: int, offset: int = offset) -> Dict[str, Any]:
+                        return build_request(scenario, offset + i, rng, args)
+
+                    total = args.roadmap_requests if scenario == "roadmap" else args.requests
+                    if args.warmup:
+                        await run_load(client, lambda i: make_request(total + i), args.warmup, 1)
+
+                    print(f"🏁 {scenario} x{concurrency} ({total} requests)...")
+                    stats = await run_load(client, make_request, total, concurrency)
+                    stats.update({"scenario": scenario, "concurrency": concurrency})
+                    results.append(stats)
+                    lat = stats["latency_ms"]
+                    print(
+                        f"   {stats['throughput_rps']:.2f} req/s  p50 {lat['p50']:.1f}ms  "
+                        f"p95 {lat['p95']:.1f}ms  p99 {lat['p99']:.1f}ms  errors {stats['errors']}  shed {stats['shed']}"
+                    )
+
+    return {"meta": run_metadata(args), "results": results}
+
+
+def run_metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        revision = None
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+    }
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def _csv(cast: Callable[[str], Any]) -> Callable[[str], List[Any]]:
+    return lambda value: [cast(v.strip()) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline PostChat backend benchmarks")
+    parser.add_argument("--scenarios", type=_csv(str), default=SCENARIOS, help=f"Comma list of {SCENARIOS}")
+    parser.add_argument("--concurrency", type=_csv(int), default=[1, 8], help="Comma list of concurrency levels")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per scenario and concurrency level")
+    parser.add_argument("--roadmap-requests", type=int, default=8, help="Requests for the (slow) roadmap scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured warmup requests per run")
+    parser.add_argument("--seed-posts", type=int, default=200, help="Posts ingested before measuring")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Mean fake LLM latency (s)")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Mean fake embedding latency (s)")
+    parser.add_argument("--apify-latency", type=float, default=0.5, help="Mean fake Apify run latency (s)")
+    parser.add_argument("--tavily-latency", type=float, default=0.2, help="Mean fake Tavily latency (s)")
+    parser.add_argument("--db-latency", type=float, default=0.01, help="Mean fake Supabase latency (s)")
+    parser.add_argument("--embedding-dim", type=int, default=256)
+    parser.add_argument("--output", default="bench_results.json", help="Where to write JSON results")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run_benchmarks(args))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
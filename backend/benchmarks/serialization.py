@@ -0,0 +1,200 @@
+"""
+Micro-benchmark for response serialization and compression.
+
+Builds realistic payloads (a page of full posts, a search result set and a
+six-stage roadmap with embedded posts) and times:
+- the old paths: FastAPI's `jsonable_encoder` + stdlib `json.dumps`, and the
+  per-post `json.loads(json.dumps(...))` sanitizing done at ingestion
+- the new paths: orjson via services.serialization, `model_dump(mode="json")`
+- gzip / brotli compression ratio and cost on the encoded bodies
+
+Usage (from backend/):
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --posts 100 --iterations 200 --output serialization.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from agents.course_roadmap_agent import Step6Output, UINode  # noqa: E402
+from benchmarks.fakes import make_raw_post  # noqa: E402
+from main import ProcessedPost  # noqa: E402
+from services import serialization  # noqa: E402
+
+
+# ============================================================================
+# PAYLOADS
+# ============================================================================
+
+def make_post(index: int) -> ProcessedPost:
+    raw = make_raw_post(index)
+    return ProcessedPost(
+        original_post_id=raw["postId"],
+        url=raw["url"],
+        published_at=raw["time"],
+        author_name=raw["user"]["name"],
+        author_id=raw["user"]["id"],
+        author_profile_pic=raw["user"]["profilePic"],
+        raw_text=raw["text"],
+        summary=raw["text"][:200],
+        sentiment="Positive",
+        topics=raw["text"].split()[2:6],
+        category="Tech",
+        media=[
+            {"type": "photo", "url": m["photo_image"]["uri"], "ocr_text": "slide text " * 20, "description": "A slide."}
+            for m in raw["media"]
+        ],
+        external_links=[{"url": "https://example.com/article", "title": "Article", "domain": "example.com"}],
+        engagement_metrics={
+            "likes": raw["likes"], "comments": raw["comments"], "shares": raw["shares"],
+            "reactions": {"like": raw["likes"], "love": raw["likes"] // 3},
+        },
+    )
+
+
+def make_roadmap(posts: List[ProcessedPost], stages: int = 6, posts_per_stage: int = 3) -> Step6Output:
+    nodes = []
+    for i in range(stages):
+        stage_posts = [
+            {**post.model_dump(mode="json"), "reason": "Covers the core skills of this stage"}
+            for post in posts[i * posts_per_stage:(i + 1) * posts_per_stage]
+        ]
+        nodes.append(UINode(
+            id=f"stage_{i + 1}",
+            title=f"Stage {i + 1}",
+            description="Build fundamentals, then ship a portfolio project. " * 4,
+            skills=["python", "sql", "docker", "testing"],
+            projects=["REST API with auth", "Dashboard over a public dataset"],
+            posts=stage_posts,
+            courses=[{"id": f"c{i}", "title": "Course", "url": "https://example.com/course", "reason": "Hands-on"}],
+        ))
+    return Step6Output(goal="Backend junior job in 6 months", nodes=nodes)
+
+
+# ============================================================================
+# TIMING
+# ============================================================================
+
+def measure(fn: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    for _ in range(min(5, iterations)):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(samples[len(samples) // 2], 4),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 4),
+    }
+
+
+def stdlib_body(content: Any) -> bytes:
+    """What FastAPI does by default for a dict return value."""
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    posts = [make_post(i) for i in range(args.posts)]
+    post_rows = [post.model_dump(mode="json") for post in posts]
+    roadmap = make_roadmap(posts)
+
+    payloads = {
+        "feed_page": {"success": True, "data": post_rows[:args.page_size], "next_cursor": "eyJwIjpudWxsfQ"},
+        "search_results": {"success": True, "data": post_rows},
+        "roadmap": {"success": True, "data": roadmap.model_dump(mode="json")},
+    }
+
+    report: Dict[str, Any] = {"encode": {}, "sanitize": {}, "compress": {}}
+    for name, payload in payloads.items():
+        baseline = measure(lambda: stdlib_body(payload), args.iterations)
+        fast = measure(lambda: serialization.dumps(payload), args.iterations)
+        report["encode"][name] = {
+            "bytes": len(serialization.dumps(payload)),
+            "stdlib": baseline,
+            "orjson": fast,
+            "speedup": round(baseline["mean_ms"] / max(fast["mean_ms"], 1e-9), 2),
+        }
+
+    def sanitize_roundtrip():
+        for post in posts:
+            d = post.model_dump()
+            for key in ("media", "external_links", "engagement_metrics"):
+                json.loads(json.dumps(d[key], default=str))
+
+    def sanitize_direct():
+        for post in posts:
+            post.model_dump(mode="json")
+
+    baseline = measure(sanitize_roundtrip, args.iterations)
+    fast = measure(sanitize_direct, args.iterations)
+    report["sanitize"] = {
+        "posts": len(posts),
+        "json_roundtrip": baseline,
+        "model_dump_json_mode": fast,
+        "speedup": round(baseline["mean_ms"] / max(fast["mean_ms"], 1e-9), 2),
+    }
+
+    encodings = ["gzip"] + (["br"] if serialization.brotli is not None else [])
+    for name, payload in payloads.items():
+        body = serialization.dumps(payload)
+        report["compress"][name] = {}
+        for encoding in encodings:
+            compressed = serialization.compress(body, encoding)
+            report["compress"][name][encoding] = {
+                "bytes": len(compressed),
+                "ratio": round(len(body) / len(compressed), 2),
+                **measure(lambda: serialization.compress(body, encoding), max(10, args.iterations // 5)),
+            }
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{'payload':<16} {'bytes':>9} {'stdlib ms':>10} {'orjson ms':>10} {'speedup':>8}")
+    for name, row in report["encode"].items():
+        print(f"{name:<16} {row['bytes']:>9} {row['stdlib']['mean_ms']:>10.3f} {row['orjson']['mean_ms']:>10.3f} {row['speedup']:>7.1f}x")
+
+    s = report["sanitize"]
+    print(
+        f"\nsanitize {s['posts']} posts: json round trip {s['json_roundtrip']['mean_ms']:.3f} ms, "
+        f"model_dump(mode='json') {s['model_dump_json_mode']['mean_ms']:.3f} ms ({s['speedup']:.1f}x)"
+    )
+
+    print(f"\n{'payload':<16} {'encoding':<8} {'bytes':>9} {'ratio':>6} {'ms':>8}")
+    for name, by_encoding in report["compress"].items():
+        for encoding, row in by_encoding.items():
+            print(f"{name:<16} {encoding:<8} {row['bytes']:>9} {row['ratio']:>6.1f} {row['mean_ms']:>8.3f}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serialization / compression micro-benchmark")
+    parser.add_argument("--posts", type=int, default=50, help="Posts in the search payload")
+    parser.add_argument("--page-size", type=int, default=20, help="Posts in the feed page payload")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    report = run(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
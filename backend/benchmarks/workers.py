@@ -0,0 +1,161 @@
+"""
+Load test of throughput versus worker process count.
+
+Starts a real server (uvicorn --workers, or gunicorn with gunicorn.conf.py)
+on `benchmarks.fake_app:app` for each worker count, drives one scenario over
+HTTP and reports throughput and latency, plus the speedup over the first
+worker count. Shared state uses a throwaway SQLite file per run.
+
+Usage (from backend/):
+    python -m benchmarks.workers --workers 1,2,4 --scenario search_semantic --concurrency 32
+    python -m benchmarks.workers --server gunicorn --bench-args "--seed-posts 50 --db-latency 0.02"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import SCENARIOS, _csv, build_request, run_load, run_metadata  # noqa: E402
+from benchmarks.run import parse_args as parse_bench_args  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server: str, workers: int, port: int) -> List[str]:
+    if server == "gunicorn":
+        return [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+            "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+            "benchmarks.fake_app:app",
+        ]
+    return [
+        sys.executable, "-m", "uvicorn", "benchmarks.fake_app:app",
+        "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+    ]
+
+
+async def wait_ready(base_url: str, timeout_s: float) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"Server at {base_url} not ready after {timeout_s}s")
+
+
+async def measure_workers(args: argparse.Namespace, bench_args: argparse.Namespace, workers: int) -> Dict[str, Any]:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    state_dir = tempfile.mkdtemp(prefix="postchat-loadtest-")
+    env = dict(
+        os.environ,
+        BENCH_ARGS=args.bench_args,
+        WEB_CONCURRENCY=str(workers),
+        STATE_BACKEND="sqlite",
+        STATE_PATH=os.path.join(state_dir, "state.sqlite3"),
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(state_dir, "metrics"),
+    )
+    os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"])
+
+    process = subprocess.Popen(
+        server_command(args.server, workers, port),
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    try:
+        await wait_ready(base_url, args.startup_timeout)
+        # Give the remaining workers time to finish seeding
+        await asyncio.sleep(args.settle)
+
+        rng = random.Random(f"{bench_args.seed}-{args.scenario}-{workers}")
+        async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+            if args.warmup:
+                await run_load(client, lambda i: build_request(args.scenario, i, rng, bench_args), args.warmup, workers)
+            stats = await run_load(
+                client,
+                lambda i: build_request(args.scenario, args.warmup + i, rng, bench_args),
+                args.requests,
+                args.concurrency,
+            )
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    stats.update({"workers": workers, "scenario": args.scenario, "concurrency": args.concurrency})
+    return stats
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    bench_args = parse_bench_args(shlex.split(args.bench_args))
+    results = []
+    for workers in args.workers:
+        print(f"🏁 {args.scenario} with {workers} worker(s), concurrency {args.concurrency}...")
+        stats = await measure_workers(args, bench_args, workers)
+        stats["speedup"] = round(stats["throughput_rps"] / results[0]["throughput_rps"], 2) if results else 1.0
+        results.append(stats)
+        lat = stats["latency_ms"]
+        print(
+            f"   {stats['throughput_rps']:.2f} req/s ({stats['speedup']:.2f}x)  p50 {lat['p50']:.1f}ms  "
+            f"p95 {lat['p95']:.1f}ms  errors {stats['errors']}"
+        )
+    meta = run_metadata(args)
+    meta["cpu_count"] = os.cpu_count()
+    return {"meta": meta, "results": results}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Throughput vs worker count load test")
+    parser.add_argument("--workers", type=_csv(int), default=[1, 2, 4], help="Comma list of worker counts")
+    parser.add_argument("--server", choices=["uvicorn", "gunicorn"], default="uvicorn")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="search_semantic")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=8)
+    parser.add_argument("--bench-args", default="--seed-posts 100", help="Fake latency/seed flags, as for benchmarks.run")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait after the first worker is ready")
+    parser.add_argument("--verbose", action="store_true", help="Show server stderr")
+    parser.add_argument("--output", default="bench_workers.json")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
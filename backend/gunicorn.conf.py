@@ -0,0 +1,47 @@
+"""
+Gunicorn configuration for multi-worker deployments.
+
+    cd backend
+    gunicorn -c gunicorn.conf.py main:app
+    WEB_CONCURRENCY=8 BIND=0.0.0.0:8000 gunicorn -c gunicorn.conf.py main:app
+
+Each worker is a uvicorn event loop in its own process. Cross-process state
+(rate-limit buckets, media job status) defaults to a shared SQLite file;
+set STATE_BACKEND=redis and STATE_REDIS_URL when workers span hosts.
+Prometheus samples from all workers are aggregated through
+PROMETHEUS_MULTIPROC_DIR.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Roadmap generation runs several LLM calls in sequence
+timeout = int(os.getenv("WORKER_TIMEOUT", 300))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth of long-lived LLM clients
+max_requests = int(os.getenv("MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+
+# Workers read these at import time (the app is not preloaded)
+os.environ.setdefault("STATE_BACKEND", "sqlite")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "postchat-metrics"))
+
+
+def on_starting(server):
+    # Stale sample files from a previous run would be aggregated into /metrics
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
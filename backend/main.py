@@ -2,14 +2,19 @@
 FastAPI backend for extracting and managing Facebook posts using Apify + Gemini.
 """
 
-from fastapi import FastAPI, HTTPException
+import time
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from apify_client import ApifyClient
 from typing import Optional, List, Dict, Any
 import os
+import re
 import json
-from datetime import datetime
+import asyncio
+from urllib.parse import urlsplit, urlunsplit
+from datetime import date, datetime
 from dotenv import load_dotenv
 
 # LangChain / Gemini
@@ -22,13 +27,33 @@ from langchain_community.vectorstores import SupabaseVectorStore
 # Agents
 from agents.course_roadmap_agent import CourseRoadmapAgent
 
+# Services
+from services import analytics
+from services.admission import AdmissionRejected, pool_from_env
+from services.batching import MicroBatcher
+from services.chunking import aggregate_chunk_matches, build_post_chunks, index_posts_chunks, media_text, select_context_chunks
+from services.crawler import SourceCrawler
+from services.feed import PROJECTIONS, InvalidCursor, apply_filters, fetch_feed_page
+from services.llm_cache import get_llm_cache, structured_chain
+from services.media_enrichment import MediaEnrichmentWorker, create_backend, is_media_url_allowed
+from services.roadmap_runs import RunFailed, RunInProgress, RunNotFound, step_view
+from services.deadlines import DeadlineExceeded, blocking, bounded, deadline, degraded, detached, note_degraded, timeout_for
+from services.embedding_batcher import BatchedEmbeddings
+from services.search_cache import bump_corpus_version, corpus_version, corpus_version_async, get_search_cache
+from services.serialization import CompressionMiddleware, FastJSONResponse, json_response
+from services.single_flight import SingleFlight, normalize_text
+
+# Observability
+from observability.metrics import INGESTED_POSTS, REQUEST_LATENCY, external_call, llm_config, render_latest, stage_timer
+from observability.tracing import start_trace
+
 # Supabase
 from supabase.client import Client, create_client
 
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(__file__), "../.env"))
 
-app = FastAPI(title="Facebook Post AI Extractor")
+app = FastAPI(title="Facebook Post AI Extractor", default_response_class=FastJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -37,8 +62,59 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Trace-Id"],
 )
 
+# gzip / brotli for JSON bodies above the threshold (feeds, search results, roadmaps)
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", 1024)))
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record per-endpoint latency, labelled by route template to bound cardinality."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        REQUEST_LATENCY.labels(request.method, endpoint, str(status)).observe(time.perf_counter() - start)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Open a root span per request and report sub-call timings via Server-Timing."""
+    with start_trace(
+        f"{request.method} {request.url.path}",
+        traceparent=request.headers.get("traceparent"),
+        http_method=request.method,
+        http_path=request.url.path,
+    ) as trace:
+        response = await call_next(request)
+        response.headers["X-Trace-Id"] = trace.trace_id
+        response.headers["Timing-Allow-Origin"] = "*"
+        server_timing = trace.server_timing()
+        if server_timing:
+            response.headers["Server-Timing"] = server_timing
+        return response
+
+@app.middleware("http")
+async def enforce_deadlines(request: Request, call_next):
+    """
+    Give each request its latency budget; external calls inside split what is left.
+    Clients may ask for a tighter one with `X-Request-Timeout` (seconds).
+    """
+    budget = next((s for prefix, s in REQUEST_BUDGETS.items() if request.url.path.startswith(prefix)), None)
+    try:
+        requested = float(request.headers.get("x-request-timeout", "inf"))
+    except ValueError:
+        requested = float("inf")
+    if requested < (budget or float("inf")):
+        budget = requested
+    with deadline(budget):
+        return await call_next(request)
+
 # --- Configuration ---
 SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("VITE_SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY") or os.getenv("VITE_SUPABASE_ANON_KEY")
@@ -46,11 +122,60 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
 APIFY_API_KEY = os.getenv("APIFY_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
+# Media enrichment (OCR / captions of post images, runs in the background)
+MEDIA_ENRICHMENT_BACKEND = os.getenv("MEDIA_ENRICHMENT_BACKEND", "gemini")
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", 2))
+MEDIA_FETCH_CONCURRENCY = int(os.getenv("MEDIA_FETCH_CONCURRENCY", 4))
+
+# Micro-batching of concurrent /get_post_info calls into one Apify run (0 disables)
+INGEST_BATCH_WINDOW_MS = float(os.getenv("INGEST_BATCH_WINDOW_MS", 250))
+INGEST_BATCH_MAX = int(os.getenv("INGEST_BATCH_MAX", 10))
+
+# Embedding model for queries and ingestion; reindex.py reads the same variables,
+# so both stay compatible with the stored `documents.embedding` vectors
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL") or "models/gemini-embedding-001"
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS") or 0) or None   # None = model default
+
+# Concurrent embedding requests (queries, stage queries, ingested chunks) share one call per window
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", 10))
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", 100))   # Gemini's per-request limit
+
+# Scheduled crawling of followed pages / groups (crawl_sources table)
+CRAWLER_ENABLED = os.getenv("CRAWLER_ENABLED", "").lower() in ("1", "true", "yes")
+CRAWL_TICK_S = float(os.getenv("CRAWL_TICK_S", 60))
+CRAWL_MAX_SOURCES = int(os.getenv("CRAWL_MAX_SOURCES", 2))            # sources crawled at once
+CRAWL_INGEST_CONCURRENCY = int(os.getenv("CRAWL_INGEST_CONCURRENCY", 2))  # new posts extracted at once per source
+CRAWL_REFRESH_WINDOW_S = float(os.getenv("CRAWL_REFRESH_WINDOW_S", 3 * 24 * 3600))
+
+# Overall latency budget per endpoint (seconds); sub-calls get what is left
+REQUEST_BUDGETS = {
+    "/get_post_info": float(os.getenv("GET_POST_INFO_BUDGET_S", 180)),
+    "/ingest_captured_post": float(os.getenv("INGEST_CAPTURED_BUDGET_S", 90)),
+    "/search_posts_v2": float(os.getenv("SEARCH_BUDGET_S", 10)),
+    "/chat": float(os.getenv("CHAT_BUDGET_S", 45)),
+    "/roadmap": float(os.getenv("ROADMAP_BUDGET_S", 300)),
+}
+
+# Admission control: per-worker concurrency limit and wait queue per endpoint group,
+# so a burst of roadmaps can't starve chat or search (override: ADMISSION_<POOL>="<concurrent>,<queue>")
+ADMISSION_POOLS = {
+    "roadmap": pool_from_env("roadmap", 2, 4),
+    "ingest": pool_from_env("ingest", INGEST_BATCH_MAX, 3 * INGEST_BATCH_MAX),
+    "chat": pool_from_env("chat", 8, 16),
+    "search": pool_from_env("search", 32, 64),
+}
+
+# Retrieval (chunk-level)
+SEARCH_CHUNKS_PER_POST = 4   # match_count = limit * this, aggregated back to posts
+CHAT_CANDIDATE_CHUNKS = 12   # chunks fetched for chat before selection
+CHAT_CONTEXT_CHUNKS = 5      # chunks actually injected into the chat prompt
+SEMANTIC_SEARCH_SHARE = 0.8  # of the search budget; the rest is left for the keyword fallback
+
 if not all([SUPABASE_URL, SUPABASE_KEY, GOOGLE_API_KEY]):
     print("⚠ Warning: Missing critical environment variables (SUPABASE_*, GOOGLE_API_KEY)")
 
 supabase_client: Optional[Client] = None
-embeddings: Optional[GoogleGenerativeAIEmbeddings] = None
+embeddings: Optional[BatchedEmbeddings] = None
 vector_store: Optional[SupabaseVectorStore] = None
 
 if SUPABASE_URL and SUPABASE_KEY:
@@ -63,10 +188,16 @@ if SUPABASE_URL and SUPABASE_KEY:
 # Initialize embeddings and vector store for advanced search
 if SUPABASE_URL and SUPABASE_KEY and GOOGLE_API_KEY:
     try:
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/gemini-embedding-001",
-            google_api_key=GOOGLE_API_KEY,
-            task_type="RETRIEVAL_DOCUMENT"
+        # One task_type for queries and documents, so both can share a batch
+        embeddings = BatchedEmbeddings(
+            GoogleGenerativeAIEmbeddings(
+                model=EMBEDDING_MODEL,
+                google_api_key=GOOGLE_API_KEY,
+                task_type="RETRIEVAL_DOCUMENT",
+                output_dimensionality=EMBEDDING_DIMENSIONS
+            ),
+            window_s=EMBED_BATCH_WINDOW_MS / 1000,
+            max_size=EMBED_BATCH_MAX
         )
         vector_store = SupabaseVectorStore(
             embedding=embeddings,
@@ -93,6 +224,9 @@ if GOOGLE_API_KEY and TAVILY_API_KEY:
     except Exception as e:
         print(f"⚠ Warning: CourseRoadmapAgent not initialized: {e}")
 
+media_worker: Optional[MediaEnrichmentWorker] = None
+crawler: Optional[SourceCrawler] = None
+
 # --- Pydantic Models for AI Extraction ---
 
 class MediaItem(BaseModel):
@@ -143,15 +277,86 @@ class PostRequest(BaseModel):
     url: str
     apify_key: Optional[str] = None
 
+class CapturedMedia(BaseModel):
+    type: str = "photo"
+    url: str
+    thumbnail: Optional[str] = None
+
+class CapturedPost(BaseModel):
+    """Post fields read from the Facebook DOM by the browser extension."""
+    url: str
+    post_id: Optional[str] = None
+    text: Optional[str] = None
+    author_name: Optional[str] = None
+    author_id: Optional[str] = None
+    author_profile_pic: Optional[str] = None
+    published_at: Optional[str] = None
+    likes: Optional[int] = None
+    comments: Optional[int] = None
+    shares: Optional[int] = None
+    reactions: Dict[str, int] = Field(default_factory=dict)
+    media: List[CapturedMedia] = Field(default_factory=list)
+    links: List[str] = Field(default_factory=list)
+    apify_key: Optional[str] = None
+
+    @field_validator("media")
+    @classmethod
+    def drop_foreign_media(cls, media: List[CapturedMedia]) -> List[CapturedMedia]:
+        """The media worker downloads these URLs server-side: keep Facebook CDN images only."""
+        kept = [m for m in media if is_media_url_allowed(m.url)]
+        for item in kept:
+            if not is_media_url_allowed(item.thumbnail):
+                item.thumbnail = None
+        return kept
+
+    def resolved_post_id(self) -> Optional[str]:
+        return self.post_id or post_id_from_url(self.url)
+
+    def missing_fields(self) -> List[str]:
+        """Fields without which extraction would be guesswork (Apify fallback)."""
+        missing = []
+        if not self.resolved_post_id():
+            missing.append("post_id")
+        if not self.author_name:
+            missing.append("author_name")
+        if not (self.text or self.media):
+            missing.append("text")
+        return missing
+
+    def to_raw_post(self) -> Dict[str, Any]:
+        """Shape the capture like an Apify item so the extraction prompt sees familiar keys."""
+        user = {"id": self.author_id, "name": self.author_name, "profilePic": self.author_profile_pic}
+        raw = {
+            "postId": self.resolved_post_id(),
+            "url": self.url,
+            "time": self.published_at,
+            "user": {k: v for k, v in user.items() if v is not None},
+            "text": self.text,
+            "likes": self.likes,
+            "comments": self.comments,
+            "shares": self.shares,
+            "reactions": self.reactions,
+            "media": [m.model_dump(exclude_none=True) for m in self.media],
+            "links": self.links,
+            "source": "browser_extension",
+        }
+        # Unknown counts are omitted rather than sent as null, as in Apify items
+        return {k: v for k, v in raw.items() if v is not None}
+
 class PostResponse(BaseModel):
     success: bool
     data: Optional[Dict] = None
     error: Optional[str] = None
+    source: Optional[str] = Field(None, description="'extension' or 'apify'")
 
 class SearchRequest(BaseModel):
     query: str
     limit: int = 10
     advanced_mode: bool = False
+    view: str = Field("full", description="Projection: 'list' (lean card fields) or 'full'")
+    topics: List[str] = Field(default_factory=list, description="Only posts tagged with all of these topics")
+    category: Optional[str] = None
+    sentiment: Optional[str] = None
 
 class ChatMessage(BaseModel):
     role: str
@@ -164,20 +369,41 @@ class ChatRequest(BaseModel):
 class RoadmapRequest(BaseModel):
     goal: str = Field(description="User's learning goal in natural language")
 
+class SourceRequest(BaseModel):
+    url: str = Field(description="Facebook page or group URL to follow")
+    interval_s: int = Field(3600, ge=60, description="Seconds between crawls")
+    results_limit: int = Field(50, ge=1, le=500, description="Max posts per crawl")
+    enabled: bool = True
+
 # --- Helper Functions ---
 
+# /posts/<id>, /permalink/<id>, /videos/<id>, ?story_fbid=<id>, ?fbid=<id>
+POST_ID_PATTERN = re.compile(r"(?:/(?:posts|permalink|videos|photos)/|[?&](?:story_fbid|fbid)=)([A-Za-z0-9]+)")
+
+def post_id_from_url(url: str) -> Optional[str]:
+    match = POST_ID_PATTERN.search(url or "")
+    return match.group(1) if match else None
+
+def normalize_post_url(url: str) -> str:
+    """Canonical form for matching: lowercase host, no fragment, tracking params or trailing slash."""
+    parts = urlsplit((url or "").strip())
+    query = "&".join(
+        p for p in parts.query.split("&")
+        if p and p.split("=")[0] in ("story_fbid", "fbid", "id", "v")
+    )
+    return urlunsplit((parts.scheme.lower() or "https", parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
 def get_gemini_extractor():
-    """Initializes the Gemini model with structured output configuration."""
+    """Initializes the Gemini model used for structured extraction."""
     if not GOOGLE_API_KEY:
         raise HTTPException(500, "Server Error: GOOGLE_API_KEY/GEMINI_API_KEY not set")
         
-    llm = ChatGoogleGenerativeAI(
+    return ChatGoogleGenerativeAI(
         model="gemini-2.5-flash-lite", # Fast and capable for extraction
         google_api_key=GOOGLE_API_KEY,
         temperature=0.1, # Low temperature for factual extraction
         max_retries=2
     )
-    return llm.with_structured_output(ProcessedPost)
 
 async def process_post_with_ai(raw_data: Dict) -> ProcessedPost:
     """Uses Gemini to parse raw Apify JSON into our unified schema."""
@@ -201,12 +427,105 @@ async def process_post_with_ai(raw_data: Dict) -> ProcessedPost:
         ("human", "Raw Data: {raw_data}")
     ])
     
-    chain = prompt | extractor
+    # Memoized on re-ingest of an identical raw item when LLM_CACHE_ENABLED is set
+    chain = structured_chain(prompt, extractor, ProcessedPost, "extract_post")
     
     # Convert raw data to string for the prompt, handling large payloads
     data_str = json.dumps(raw_data, default=str)[:30000] # Truncate if absolutely massive to fit context
     
-    return await chain.ainvoke({"raw_data": data_str})
+    with external_call("gemini", "extract_post"):
+        return await bounded("gemini", lambda: chain.ainvoke({"raw_data": data_str}, config=llm_config("extract_post")))
+
+def admission(pool_name: str):
+    """Route dependency that holds a slot of `pool_name` for the whole request, or sheds it."""
+    pool = ADMISSION_POOLS[pool_name]
+    
+    async def admit():
+        try:
+            async with pool.admit():
+                yield
+        except AdmissionRejected as e:
+            print(f"🚦 Shed {pool_name} request ({e.reason})")
+            raise HTTPException(e.status_code, str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    return Depends(admit)
+
+# --- Lifecycle ---
+
+@app.on_event("startup")
+async def start_media_worker():
+    """Start the background media enrichment pool if a backend is configured."""
+    global media_worker
+    if not (supabase_client and MEDIA_ENRICHMENT_BACKEND.lower() not in ("", "none", "off")):
+        return
+    try:
+        backend = create_backend(
+            MEDIA_ENRICHMENT_BACKEND,
+            llm_factory=lambda: ChatGoogleGenerativeAI(
+                model="gemini-2.5-flash-lite",
+                google_api_key=GOOGLE_API_KEY,
+                temperature=0.0,
+                max_retries=2
+            ) if GOOGLE_API_KEY else None
+        )
+        media_worker = MediaEnrichmentWorker(
+            supabase_client,
+            vector_store,
+            backend,
+            workers=MEDIA_WORKERS,
+            fetch_concurrency=MEDIA_FETCH_CONCURRENCY
+        )
+        media_worker.start()
+        print(f"✓ Media enrichment workers started ({MEDIA_ENRICHMENT_BACKEND} x{MEDIA_WORKERS})")
+    except Exception as e:
+        media_worker = None
+        print(f"⚠ Warning: Media enrichment not started: {e}")
+
+@app.on_event("shutdown")
+async def stop_media_worker():
+    if media_worker:
+        await media_worker.stop()
+
+@app.on_event("startup")
+async def start_crawler():
+    """Create the source crawler; its schedule only runs when CRAWLER_ENABLED is set."""
+    global crawler
+    if not supabase_client:
+        return
+    crawler = SourceCrawler(
+        supabase_client,
+        apify_client_factory=lambda: ApifyClient(APIFY_API_KEY),
+        ingest=ingest_raw_post,
+        tick_s=CRAWL_TICK_S,
+        max_sources=CRAWL_MAX_SOURCES,
+        ingest_concurrency=CRAWL_INGEST_CONCURRENCY,
+        refresh_window_s=CRAWL_REFRESH_WINDOW_S
+    )
+    if CRAWLER_ENABLED and APIFY_API_KEY:
+        crawler.start()
+        print(f"✓ Source crawler scheduled (every ~{CRAWL_TICK_S:.0f}s, {CRAWL_MAX_SOURCES} sources at once)")
+
+@app.on_event("shutdown")
+async def stop_crawler():
+    if crawler:
+        await crawler.stop()
+
+@app.on_event("shutdown")
+async def drain_ingest_batcher():
+    # Requests already waiting on a batch still get their answer
+    await ingest_batcher.drain(timeout=60)
+
+@app.on_event("startup")
+async def bind_embedding_batcher():
+    """Let sync indexing calls in worker threads batch with async embedding requests."""
+    if embeddings:
+        embeddings.bind(asyncio.get_running_loop())
+
+@app.on_event("shutdown")
+async def drain_embedding_batcher():
+    # After ingestion has drained, since its batches still embed
+    if embeddings:
+        await embeddings.batcher.drain(timeout=30)
 
 # --- Endpoints ---
 
@@ -214,159 +533,611 @@ async def process_post_with_ai(raw_data: Dict) -> ProcessedPost:
 def root():
     return {"status": "ok", "service": "Facebook AI Extractor"}
 
-@app.post("/get_post_info", response_model=PostResponse)
-async def get_post_info(request: PostRequest):
-    try:
-        # 1. Scrape with Apify
-        api_key = request.apify_key or APIFY_API_KEY
-        if not api_key:
-            raise HTTPException(400, "Apify API Key missing")
-            
-        client = ApifyClient(api_key)
-        print(f"🕷️ Scraper starting for: {request.url}")
-        
+@app.get("/llm_cache/stats")
+def llm_cache_stats():
+    """Hit rates per call site for the LLM response cache."""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/admission/stats")
+def admission_stats():
+    """Slots in use, queue depth and shed requests per admission pool (this worker)."""
+    return {name: pool.stats() for name, pool in ADMISSION_POOLS.items()}
+
+@app.get("/search_cache/stats")
+def search_cache_stats():
+    """Size of this worker's search result cache and the current corpus version."""
+    cache = get_search_cache()
+    return {"enabled": cache.enabled, "corpus_version": corpus_version(), **cache.stats()}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+def scrape_posts_with_apify(urls: List[str], api_key: str) -> Dict[str, Optional[Dict]]:
+    """One Apify actor run for several post URLs; maps each URL to its raw item (or None)."""
+    client = ApifyClient(api_key)
+    unique_urls = list(dict.fromkeys(urls))
+    print(f"🕷️ Scraper starting for {len(unique_urls)} URL(s): {', '.join(unique_urls)}")
+    
+    with stage_timer("ingest.scrape"), external_call("apify", "facebook_posts_scraper"):
+        # The actor is aborted server-side once the request's budget for it is spent
         run = client.actor("apify/facebook-posts-scraper").call(
-            run_input={"startUrls": [{"url": request.url}], "resultsLimit": 1}
+            run_input={"startUrls": [{"url": url} for url in unique_urls], "resultsLimit": 1},
+            timeout_secs=max(1, int(timeout_for("apify")))
         )
         
         dataset_id = run["defaultDatasetId"]
         items = list(client.dataset(dataset_id).iterate_items())
-        
-        if not items:
-            return PostResponse(success=False, error="Apify returned no data.")
-            
-        raw_post = items[0]
-        print("✓ Scrape complete. Processing with AI...")
-        
-        # 2. Process with Gemini
+    
+    # Items echo their input URL (or at least the post id), which ties them back to callers
+    by_key: Dict[str, Dict] = {}
+    for item in items:
+        for url in (item.get("inputUrl"), item.get("facebookUrl"), item.get("url")):
+            if url:
+                by_key.setdefault(normalize_post_url(url), item)
+        if item.get("postId"):
+            by_key.setdefault(f"id:{item['postId']}", item)
+    
+    matched = {
+        url: by_key.get(normalize_post_url(url)) or by_key.get(f"id:{post_id_from_url(url)}")
+        for url in unique_urls
+    }
+    if len(unique_urls) == 1 and items and matched[unique_urls[0]] is None:
+        matched[unique_urls[0]] = items[0]
+    return matched
+
+def scrape_post_with_apify(url: str, api_key: str) -> Optional[Dict]:
+    """Run the Apify Facebook posts scraper for one URL; returns the raw item or None."""
+    return scrape_posts_with_apify([url], api_key)[url]
+
+async def extract_post(raw_post: Dict) -> ProcessedPost:
+    """Structured extraction of one raw post with Gemini."""
+    with stage_timer("ingest.extract"):
         processed_post: ProcessedPost = await process_post_with_ai(raw_post)
-        print(f"✓ AI Processing complete: {processed_post.summary}")
+    if raw_post.get("postId"):
+        # The id is known exactly; never let the model rewrite it
+        processed_post.original_post_id = str(raw_post["postId"])
+    print(f"✓ AI Processing complete: {processed_post.summary}")
+    return processed_post
+
+def post_db_record(processed_post: ProcessedPost) -> Dict[str, Any]:
+    """Row for the `posts` table; one JSON-safe dump (valid JSONB for the nested fields)."""
+    post_dict = processed_post.model_dump(mode="json")
+    return {
+        "original_post_id": post_dict["original_post_id"],
+        "platform": post_dict["platform"],
+        "url": post_dict["url"],
+        "published_at": post_dict["published_at"],
+        "author_name": post_dict["author_name"],
+        "author_id": post_dict["author_id"],
+        "author_profile_pic": post_dict["author_profile_pic"],
+        "raw_text": post_dict["raw_text"],
+        "summary": post_dict["summary"],
+        "sentiment": post_dict["sentiment"],
+        "topics": post_dict["topics"],
+        "category": post_dict["category"],
+        "media": post_dict["media"],
+        "external_links": post_dict["external_links"],
+        "engagement_metrics": post_dict["engagement_metrics"]
+    }
+
+def carry_over_media_annotations(posts: List[ProcessedPost]) -> None:
+    """
+    Copy OCR text / descriptions already stored for these posts onto their freshly
+    scraped media, so a re-ingest neither drops them from `posts` nor from the chunks.
+    Items match by URL, or by position when the media list has the same shape.
+    """
+    posts_with_media = [post for post in posts if post.media]
+    if not posts_with_media:
+        return
+    with external_call("supabase", "select_post_media"):
+        rows = supabase_client.table("posts").select("original_post_id,media").in_(
+            "original_post_id", [post.original_post_id for post in posts_with_media]
+        ).execute().data
+    stored_by_post = {row["original_post_id"]: row.get("media") or [] for row in rows}
+    for post in posts_with_media:
+        stored = stored_by_post.get(post.original_post_id) or []
+        by_url = {item.get("url"): item for item in stored if item.get("url")}
+        same_shape = [item.get("type") for item in stored] == [item.type for item in post.media]
+        for i, item in enumerate(post.media):
+            if item.ocr_text or item.description:
+                continue
+            old = by_url.get(item.url) or (stored[i] if same_shape else None)
+            if old:
+                item.ocr_text = old.get("ocr_text")
+                item.description = old.get("description")
+
+def store_processed_posts(processed_posts: List[ProcessedPost]) -> List[str]:
+    """
+    Save posts and their chunks with bulk writes: one `posts` upsert and one
+    embed + delete + insert pass on `documents` for the whole batch.
+    
+    Runs in a worker thread; returns the ids of stored posts whose images still
+    need enrichment, for the caller to hand to `enqueue_media_enrichment` on the loop.
+    """
+    if not supabase_client or not processed_posts:
+        return []
+    # A batch may contain the same post twice; Postgres rejects duplicate keys in one upsert
+    by_id = {post.original_post_id: post for post in processed_posts}
+    posts = list(by_id.values())
+    
+    try:
+        # A refresh of an already enriched post keeps its image text (re-enrichment would redo OCR)
+        try:
+            carry_over_media_annotations(posts)
+        except Exception as e:
+            print(f"⚠ Could not load stored media annotations: {e}")
         
-        # 3. Save to Supabase
-        if supabase_client:
-            # Convert Pydantic model to dict for insertion
-            post_dict = processed_post.model_dump()
-            
-            # Rename fields to match DB columns if necessary (though our schema matches the model)
-            # Pydantic 'metrics' -> DB 'engagement_metrics' is already handled by model definition
-            
-            # Ensure complex types are JSON serializable
-            db_record = {
-                "original_post_id": post_dict["original_post_id"],
-                "platform": post_dict["platform"],
-                "url": post_dict["url"],
-                "published_at": post_dict["published_at"],
-                "author_name": post_dict["author_name"],
-                "author_id": post_dict["author_id"],
-                "author_profile_pic": post_dict["author_profile_pic"],
-                "raw_text": post_dict["raw_text"],
-                "summary": post_dict["summary"],
-                "sentiment": post_dict["sentiment"],
-                "topics": post_dict["topics"],
-                "category": post_dict["category"],
-                "media": json.loads(json.dumps(post_dict["media"], default=str)), # Ensure valid JSONB
-                "external_links": json.loads(json.dumps(post_dict["external_links"], default=str)),
-                "engagement_metrics": json.loads(json.dumps(post_dict["engagement_metrics"], default=str))
-            }
-            
+        with stage_timer("ingest.upsert"), external_call("supabase", "upsert_post"):
+            supabase_client.table("posts").upsert(
+                [post_db_record(post) for post in posts], on_conflict="original_post_id"
+            ).execute()
+        print(f"✓ Saved {len(posts)} post(s) to Supabase 'posts' table")
+        
+        # Save to Vector Store for Advanced Search
+        if vector_store:
+            print("... Generating embeddings and saving to vector store")
             try:
-                # Upsert command
-                supabase_client.table("posts").upsert(
-                    db_record, on_conflict="original_post_id"
-                ).execute()
-                print("✓ Saved to Supabase 'posts' table")
+                # Split into token-bounded chunks linked back to each post
+                with stage_timer("ingest.chunk"):
+                    docs_by_post = {
+                        post.original_post_id: build_post_chunks(
+                            post.original_post_id,
+                            post.summary,
+                            post.raw_text,
+                            metadata={
+                                "author": post.author_name,
+                                "published_at": post.published_at,
+                                "url": post.url,
+                                "topics": post.topics
+                            },
+                            media_text=media_text([item.model_dump() for item in post.media])
+                        )
+                        for post in posts
+                    }
                 
-                # 4. Save to Vector Store for Advanced Search
-                if vector_store:
-                    print("... Generating embedding and saving to vector store")
-                    try:
-                        # Combine summary and text for rich search context
-                        doc_content = f"Summary: {processed_post.summary}\n\nContent: {processed_post.raw_text}"
-                        
-                        metadata = {
-                            "post_id": processed_post.original_post_id,
-                            "author": processed_post.author_name,
-                            "published_at": processed_post.published_at,
-                            "url": processed_post.url,
-                            "topics": processed_post.topics
-                        }
-                        
-                        doc = Document(page_content=doc_content, metadata=metadata)
-                        
-                        # Use add_documents which handles embedding generation via the initialized 'embeddings' model
-                        vector_store.add_documents([doc])
-                        print("✓ Saved to vector store (documents table)")
-                    except Exception as e:
-                        print(f"⚠ Vector Store Error: {e}")
+                # Embed every chunk of the batch (through the shared embedding batcher), then swap them in
+                with stage_timer("ingest.embed"), external_call("supabase", "add_documents"):
+                    chunk_count = index_posts_chunks(supabase_client, vector_store, docs_by_post)
+                print(f"✓ Saved {chunk_count} chunks to vector store (documents table)")
             except Exception as e:
-                print(f"❌ Supabase Save Error: {e}")
-                
-        return PostResponse(success=True, data=processed_post.model_dump())
+                print(f"⚠ Vector Store Error: {e}")
+        
+        # Cached search results computed before this write are now stale
+        bump_corpus_version()
+        
+        # OCR / captioning happens in the background, then re-embeds each post
+        return [
+            post.original_post_id for post in posts
+            if any(not (item.ocr_text or item.description) for item in post.media)
+        ]
+    except Exception as e:
+        print(f"❌ Supabase Save Error: {e}")
+        return []
+
+def enqueue_media_enrichment(post_ids: List[str]) -> None:
+    """Queue posts for the media worker; on the event loop only (its asyncio.Queue isn't thread-safe)."""
+    if media_worker:
+        for post_id in post_ids:
+            media_worker.enqueue(post_id)
+
+async def ingest_raw_post(raw_post: Dict) -> ProcessedPost:
+    """Extract, store and index one raw post (Apify item or extension capture)."""
+    processed_post = await extract_post(raw_post)
+    # In a worker thread, so its chunk embedding can join the embedding batcher on the loop
+    enqueue_media_enrichment(await asyncio.to_thread(store_processed_posts, [processed_post]))
+    return processed_post
+
+async def ingest_url_batch(urls: List[str], api_key: str) -> List[Any]:
+    """
+    Micro-batch handler for /get_post_info: one Apify run for all URLs,
+    concurrent extraction, then bulk writes. Returns a ProcessedPost or an
+    exception per URL.
+    """
+    raw_by_url = await blocking("apify", scrape_posts_with_apify, urls, api_key)
+    print(f"✓ Scrape complete ({sum(1 for raw in raw_by_url.values() if raw)}/{len(raw_by_url)} found). Processing with AI...")
+    
+    async def extract(url: str) -> ProcessedPost:
+        raw_post = raw_by_url.get(url)
+        if not raw_post:
+            raise ValueError("Apify returned no data.")
+        INGESTED_POSTS.labels("apify").inc()
+        return await extract_post(raw_post)
+    
+    unique_urls = list(raw_by_url)
+    extracted = await asyncio.gather(*(extract(url) for url in unique_urls), return_exceptions=True)
+    by_url = dict(zip(unique_urls, extracted))
+    
+    stored = [p for p in extracted if isinstance(p, ProcessedPost)]
+    enqueue_media_enrichment(await asyncio.to_thread(store_processed_posts, stored))
+    return [by_url[url] for url in urls]
+
+# Coalesces concurrent /get_post_info calls (per Apify key) into one actor run
+ingest_batcher = MicroBatcher(
+    "get_post_info",
+    ingest_url_batch,
+    window_s=INGEST_BATCH_WINDOW_MS / 1000,
+    max_size=INGEST_BATCH_MAX
+)
+
+async def ingest_url(url: str, api_key: str) -> ProcessedPost:
+    """Scrape one post URL with Apify, then extract, save and index it."""
+    if INGEST_BATCH_WINDOW_MS > 0:
+        # Scrape, extract, save and index together with concurrent requests
+        return await ingest_batcher.submit(url, key=api_key)
+    
+    raw_post = await blocking("apify", scrape_post_with_apify, url, api_key)
+    if not raw_post:
+        raise ValueError("Apify returned no data.")
+    print("✓ Scrape complete. Processing with AI...")
+    INGESTED_POSTS.labels("apify").inc()
+    return await ingest_raw_post(raw_post)
+
+# Identical requests already in flight share one piece of work
+ingest_flight = SingleFlight("get_post_info")
+search_flight = SingleFlight("search_posts_v2")
+chat_retrieval_flight = SingleFlight("chat_retrieval")
+roadmap_flight = SingleFlight("roadmap")
+
+@app.post("/get_post_info", response_model=PostResponse, dependencies=[admission("ingest")])
+async def get_post_info(request: PostRequest):
+    try:
+        api_key = request.apify_key or APIFY_API_KEY
+        if not api_key:
+            raise HTTPException(400, "Apify API Key missing")
+        
+        # A double-submitted URL (even with different tracking params) is ingested once
+        processed_post = await ingest_flight.do(
+            (api_key, normalize_post_url(request.url)),
+            lambda: ingest_url(request.url, api_key)
+        )
+        return PostResponse(success=True, data=processed_post.model_dump(mode="json"), source="apify")
 
     except Exception as e:
         print(f"❌ Error: {e}")
         return PostResponse(success=False, error=str(e))
 
-@app.post("/search_posts_v2")
-async def search_posts_v2(request: SearchRequest):
-    """Search endpoint supporting both keyword and semantic search."""
+@app.post("/ingest_captured_post", response_model=PostResponse, dependencies=[admission("ingest")])
+async def ingest_captured_post(request: CapturedPost):
+    """
+    Ingest post data captured by the browser extension from the open page.
+    
+    Skips the Apify actor run entirely; Apify is only used as a fallback when
+    the capture lacks the post id, author or content.
+    """
+    try:
+        missing = request.missing_fields()
+        if not missing:
+            raw_post = request.to_raw_post()
+            source = "extension"
+        else:
+            api_key = request.apify_key or APIFY_API_KEY
+            if not api_key:
+                return PostResponse(success=False, error=f"Capture is missing {', '.join(missing)} and no Apify key is available")
+            print(f"⚠ Capture missing {', '.join(missing)}, falling back to Apify")
+            raw_post = await blocking("apify", scrape_post_with_apify, request.url, api_key)
+            if not raw_post:
+                return PostResponse(success=False, error="Apify returned no data.")
+            source = "apify"
+        INGESTED_POSTS.labels(source).inc()
+        
+        processed_post = await ingest_raw_post(raw_post)
+        return PostResponse(success=True, data=processed_post.model_dump(mode="json"), source=source)
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return PostResponse(success=False, error=str(e))
+
+@app.get("/posts")
+async def list_posts(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    view: str = "list",
+    topic: List[str] = Query(default=[]),
+    category: Optional[str] = None,
+    sentiment: Optional[str] = None
+):
+    """
+    Cursor-paginated post feed, newest first.
+    
+    Pass the returned `next_cursor` back as `cursor` to load the next page.
+    """
     if not supabase_client:
         raise HTTPException(503, "Database not connected")
-        
+    if view not in PROJECTIONS:
+        raise HTTPException(400, f"Unknown view '{view}'")
+    
     try:
-        if request.advanced_mode:
-            # ADVANCED MODE: Semantic search using embeddings
-            if not embeddings or not supabase_client:
-                return {"success": False, "error": "Advanced search not available"}
-            
-            print(f"🔍 Advanced search (semantic) for: {request.query}")
-            
-            # Generate embedding for the query
-            query_embedding = embeddings.embed_query(request.query)
-            
-            # Call Supabase match_documents RPC
-            rpc_response = supabase_client.rpc(
+        with stage_timer("feed.page"), external_call("supabase", "feed_page"):
+            page = await blocking(
+                "supabase_rpc", fetch_feed_page, supabase_client, limit, cursor, view, topic, category, sentiment
+            )
+        return json_response({"success": True, **page})
+    except InvalidCursor as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        print(f"❌ Feed error: {e}")
+        return {"success": False, "error": str(e)}
+
+@app.get("/posts/{post_id}")
+async def get_post(post_id: str):
+    """Full detail view of a single post (by original_post_id)."""
+    if not supabase_client:
+        raise HTTPException(503, "Database not connected")
+    
+    with external_call("supabase", "select_post"):
+        query = supabase_client.table("posts").select(PROJECTIONS["full"]).eq("original_post_id", post_id).limit(1)
+        response = await blocking("supabase_rpc", query.execute)
+    if not response.data:
+        raise HTTPException(404, "Post not found")
+    return json_response({"success": True, "data": response.data[0]})
+
+@app.post("/posts/{post_id}/enrich_media")
+async def enrich_post_media(post_id: str):
+    """Queue a stored post for media OCR / captioning."""
+    if not media_worker:
+        raise HTTPException(503, "Media enrichment not available")
+    return {"success": media_worker.enqueue(post_id), "post_id": post_id}
+
+@app.get("/posts/{post_id}/enrich_media")
+async def enrich_post_media_status(post_id: str):
+    """Status of the media enrichment job for a post (shared across workers)."""
+    if not media_worker:
+        raise HTTPException(503, "Media enrichment not available")
+    job = media_worker.job_status(post_id)
+    if job is None:
+        raise HTTPException(404, "No enrichment job for this post")
+    return {"success": True, "post_id": post_id, **job}
+
+@app.get("/sources")
+async def list_sources():
+    """Followed pages / groups with their watermark and last crawl outcome."""
+    if not supabase_client:
+        raise HTTPException(503, "Database not connected")
+    query = supabase_client.table("crawl_sources").select("*").order("created_at")
+    response = await blocking("supabase_rpc", query.execute)
+    return {"success": True, "data": response.data}
+
+@app.post("/sources")
+async def follow_source(request: SourceRequest):
+    """Follow a page / group (or update its schedule); it is crawled on the next tick."""
+    if not supabase_client:
+        raise HTTPException(503, "Database not connected")
+    query = supabase_client.table("crawl_sources").upsert(request.model_dump(), on_conflict="url")
+    response = await blocking("supabase_rpc", query.execute)
+    return {"success": True, "data": response.data[0] if response.data else None}
+
+@app.delete("/sources/{source_id}")
+async def unfollow_source(source_id: str):
+    if not supabase_client:
+        raise HTTPException(503, "Database not connected")
+    query = supabase_client.table("crawl_sources").delete().eq("id", source_id)
+    await blocking("supabase_rpc", query.execute)
+    return {"success": True}
+
+@app.post("/sources/{source_id}/crawl")
+async def crawl_source_now(source_id: str):
+    """Crawl one source immediately, outside its schedule."""
+    if not crawler:
+        raise HTTPException(503, "Crawler not available")
+    query = supabase_client.table("crawl_sources").select("*").eq("id", source_id).limit(1)
+    response = await blocking("supabase_rpc", query.execute)
+    if not response.data:
+        raise HTTPException(404, "Source not found")
+    # Never under the request deadline: a crawl cut short would count as a failure and back the source off
+    with detached():
+        result = await crawler.run_source(response.data[0])
+    if result is None:
+        return {"success": False, "error": "A crawl of this source is already running"}
+    return {"success": result["success"], "data": result}
+
+def keyword_search(request: SearchRequest, columns: str) -> List[Dict[str, Any]]:
+    print(f"🔍 Keyword search for: {request.query}")
+    with stage_timer("search.keyword"), external_call("supabase", "keyword_search"):
+        query = supabase_client.table("posts").select(columns).or_(
+            f"raw_text.ilike.%{request.query}%,summary.ilike.%{request.query}%"
+        )
+        query = apply_filters(query, request.topics, request.category, request.sentiment)
+        response = query.limit(request.limit).execute()
+    return response.data
+
+async def semantic_search(request: SearchRequest, columns: str) -> List[Dict[str, Any]]:
+    print(f"🔍 Advanced search (semantic) for: {request.query}")
+    
+    # Generate embedding for the query (batched with concurrent searches, chats and roadmaps)
+    with stage_timer("search.embed"):
+        query_embedding = await bounded("embeddings", lambda: embeddings.aembed_query(request.query))
+    
+    # Call Supabase match_documents RPC
+    with stage_timer("search.match"), external_call("supabase", "match_documents"):
+        rpc_response = await blocking(
+            "supabase_rpc",
+            supabase_client.rpc(
                 'match_documents',
                 {
                     'query_embedding': query_embedding,
-                    'match_count': request.limit * 3
+                    'match_count': request.limit * SEARCH_CHUNKS_PER_POST
                 }
-            ).execute()
-            
-            # Deduplicate by post_id and get full posts
-            seen_post_ids = set()
-            results = []
-            
-            for item in rpc_response.data:
-                post_id = item.get('metadata', {}).get('post_id')
-                if post_id and post_id not in seen_post_ids:
-                    seen_post_ids.add(post_id)
-                    
-                    # Get full post from posts table
-                    try:
-                        full_post = supabase_client.table("posts").select("*").eq("original_post_id", post_id).limit(1).execute()
-                        if full_post.data and len(full_post.data) > 0:
-                            results.append(full_post.data[0])
-                    except Exception as e:
-                        print(f"Warning: Could not fetch full post for {post_id}: {e}")
-                    
-                    if len(results) >= request.limit:
-                        break
-            
-            return {"success": True, "data": results}
-        else:
-            # NORMAL MODE: Keyword search
-            print(f"🔍 Keyword search for: {request.query}")
-            response = supabase_client.table("posts").select("*").or_(
-                f"raw_text.ilike.%{request.query}%,summary.ilike.%{request.query}%"
-            ).limit(request.limit).execute()
-            
-            return {"success": True, "data": response.data}
+            ).execute,
+            hedge=True
+        )
+    
+    # Score at chunk level, rank posts by their best chunk
+    ranked = aggregate_chunk_matches(rpc_response.data)[:request.limit]
+    post_ids = [entry["post_id"] for entry in ranked]
+    
+    # Get full posts from posts table in one round trip
+    results = []
+    if post_ids:
+        try:
+            with external_call("supabase", "select_posts"):
+                query = supabase_client.table("posts").select(columns).in_("original_post_id", post_ids)
+                query = apply_filters(query, request.topics, request.category, request.sentiment)
+                full_posts = await blocking("supabase_rpc", query.execute)
+            by_id = {post["original_post_id"]: post for post in full_posts.data}
+            results = [by_id[post_id] for post_id in post_ids if post_id in by_id]
+        except Exception as e:
+            print(f"Warning: Could not fetch full posts: {e}")
+    return results
+
+async def run_search(request: SearchRequest, columns: str) -> Dict[str, Any]:
+    """Keyword or semantic search; semantic search falls back to keywords when it fails or runs out of time."""
+    if not request.advanced_mode:
+        # NORMAL MODE: Keyword search
+        return {"success": True, "data": await asyncio.to_thread(keyword_search, request, columns)}
+    
+    # ADVANCED MODE: Semantic search using embeddings
+    if not embeddings or not supabase_client:
+        return {"success": False, "error": "Advanced search not available"}
+    try:
+        return {"success": True, "data": await semantic_search(request, columns)}
+    except Exception as e:
+        print(f"⚠ Semantic search failed, falling back to keywords: {e}")
+        return await keyword_fallback(request, columns)
+
+async def keyword_fallback(request: SearchRequest, columns: str) -> Dict[str, Any]:
+    note_degraded("semantic_search")
+    return {
+        "success": True,
+        "data": await asyncio.to_thread(keyword_search, request, columns),
+        "degraded": ["semantic_search"]
+    }
+
+@app.get("/analytics/topics")
+async def analytics_topics(limit: int = 20):
+    """Most common topics with their post counts."""
+    if not supabase_client:
+        raise HTTPException(503, "Database not connected")
+    with stage_timer("analytics.topics"), external_call("supabase", "analytics_top_topics"):
+        topics = await blocking("supabase_rpc", analytics.top_topics, supabase_client, max(1, min(limit, 200)))
+    return json_response({"success": True, "data": topics})
+
+@app.get("/analytics/topics/{topic}")
+async def analytics_topic(topic: str):
+    """Sentiment split and average engagement of the posts tagged with one topic."""
+    if not supabase_client:
+        raise HTTPException(503, "Database not connected")
+    with stage_timer("analytics.topic"), external_call("supabase", "analytics_topic_breakdown"):
+        breakdown = await blocking("supabase_rpc", analytics.topic_breakdown, supabase_client, topic)
+    return json_response({"success": True, "data": breakdown})
+
+@app.get("/analytics/sentiment")
+async def analytics_sentiment(
+    bucket: str = "week",
+    since: Optional[date] = None,
+    until: Optional[date] = None
+):
+    """Sentiment distribution per day / week / month (by published date)."""
+    if not supabase_client:
+        raise HTTPException(503, "Database not connected")
+    try:
+        with stage_timer("analytics.sentiment"), external_call("supabase", "analytics_sentiment_series"):
+            series = await blocking("supabase_rpc", analytics.sentiment_series, supabase_client, bucket, since, until)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return json_response({"success": True, "data": series})
+
+@app.get("/analytics/authors")
+async def analytics_authors(limit: int = 10, order_by: str = "posts"):
+    """Top authors by number of posts or by total engagement."""
+    if not supabase_client:
+        raise HTTPException(503, "Database not connected")
+    try:
+        with stage_timer("analytics.authors"), external_call("supabase", "analytics_top_authors"):
+            authors = await blocking(
+                "supabase_rpc", analytics.top_authors, supabase_client, max(1, min(limit, 100)), order_by
+            )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return json_response({"success": True, "data": authors})
+
+@app.get("/analytics/engagement")
+async def analytics_engagement(percentile: List[float] = Query(default=list(analytics.DEFAULT_PERCENTILES))):
+    """Engagement (likes + comments + shares) percentiles and histogram."""
+    if not supabase_client:
+        raise HTTPException(503, "Database not connected")
+    if any(not 0 <= p <= 100 for p in percentile):
+        raise HTTPException(400, "percentile must be between 0 and 100")
+    with stage_timer("analytics.engagement"), external_call("supabase", "analytics_engagement_histogram"):
+        summary = await blocking("supabase_rpc", analytics.engagement_summary, supabase_client, percentile)
+    return json_response({"success": True, "data": summary})
+
+@app.post("/search_posts_v2", dependencies=[admission("search")])
+async def search_posts_v2(request: SearchRequest):
+    """Search endpoint supporting both keyword and semantic search."""
+    if not supabase_client:
+        raise HTTPException(503, "Database not connected")
+    if request.view not in PROJECTIONS:
+        raise HTTPException(400, f"Unknown view '{request.view}'")
+    columns = PROJECTIONS[request.view]
+        
+    try:
+        cache = get_search_cache()
+        key = cache.make_key(
+            request.query, request.advanced_mode, request.limit,
+            request.topics, request.category, request.sentiment, request.view
+        )
+        version = await corpus_version_async() if cache.enabled else None
+        if version is not None:
+            cached = cache.get(key, version)
+            if cached is not None:
+                return json_response(cached)
+        
+        # Concurrent identical searches (same query, mode, filters, view) share one run
+        try:
+            result = await search_flight.do(
+                (version, key),
+                lambda: run_search(request, columns),
+                share=SEMANTIC_SEARCH_SHARE if request.advanced_mode else 1.0
+            )
+        except DeadlineExceeded:
+            if not request.advanced_mode:
+                raise
+            print("⚠ Semantic search ran out of time, falling back to keywords")
+            result = await keyword_fallback(request, columns)
+        if version is not None and result.get("success") and not result.get("degraded"):
+            cache.set(key, version, result)
+        return json_response(result)
     except Exception as e:
         print(f"❌ Search error: {e}")
         return {"success": False, "error": str(e)}
 
-@app.post("/chat")
+async def retrieve_chat_context(message: str) -> List[Document]:
+    """Best-matching chunks for a chat message; callers wait for at most half their request budget."""
+    # Perform manual semantic search to avoid library compatibility issues
+    with stage_timer("chat.retrieve"):
+        query_embedding = await bounded("embeddings", lambda: embeddings.aembed_query(message), share=0.25)
+        with external_call("supabase", "match_documents"):
+            rpc_response = await blocking(
+                "supabase_rpc",
+                supabase_client.rpc(
+                    'match_documents',
+                    {
+                        'query_embedding': query_embedding,
+                        'match_count': CHAT_CANDIDATE_CHUNKS
+                    }
+                ).execute,
+                share=0.25,
+                hedge=True
+            )
+    
+    # Only the best-matching chunks go into the prompt
+    context_docs = []
+    for item in select_context_chunks(rpc_response.data, max_chunks=CHAT_CONTEXT_CHUNKS):
+        metadata = dict(item.get('metadata') or {})
+        metadata['similarity'] = item.get('similarity')
+        context_docs.append(Document(
+            page_content=item.get('content', ''),
+            metadata=metadata
+        ))
+    return context_docs
+
+@app.post("/chat", dependencies=[admission("chat")])
 async def chat(request: ChatRequest):
     """Chat endpoint with RAG using the vector store."""
     try:
@@ -377,23 +1148,15 @@ async def chat(request: ChatRequest):
         context_docs = []
         if embeddings and supabase_client:
             try:
-                # Perform manual semantic search to avoid library compatibility issues
-                query_embedding = embeddings.embed_query(request.message)
-                rpc_response = supabase_client.rpc(
-                    'match_documents',
-                    {
-                        'query_embedding': query_embedding,
-                        'match_count': 3
-                    }
-                ).execute()
-                
-                for item in rpc_response.data:
-                    context_docs.append(Document(
-                        page_content=item.get('content', ''),
-                        metadata=item.get('metadata', {})
-                    ))
+                context_docs = await chat_retrieval_flight.do(
+                    request.message.strip(),
+                    lambda: retrieve_chat_context(request.message),
+                    share=0.5
+                )
             except Exception as e:
+                # Answer without saved-post context rather than not at all
                 print(f"⚠ Search for context failed: {e}")
+                note_degraded("chat_context")
 
         # 2. Build the prompt
         context_text = "\n\n".join([f"Source {i+1}:\n{doc.page_content}" for i, doc in enumerate(context_docs)])
@@ -427,7 +1190,8 @@ async def chat(request: ChatRequest):
         messages.append(("human", request.message))
 
         # 5. Get response
-        response = await llm.ainvoke(messages)
+        with stage_timer("chat.generate"), external_call("gemini", "chat"):
+            response = await bounded("gemini", lambda: llm.ainvoke(messages, config=llm_config("chat")))
         print(response)
         
         # 6. Format sources for the frontend
@@ -436,20 +1200,23 @@ async def chat(request: ChatRequest):
             sources.append({
                 "content": doc.page_content[:200] + "...",
                 "metadata": doc.metadata,
-                "similarity_score": 0.9 # placeholder for simplified similarity
+                "similarity_score": doc.metadata.get("similarity")
             })
 
-        return {
+        result = {
             "success": True, 
             "response": response.content,
             "sources": sources
         }
+        if degraded():
+            result["degraded"] = degraded()
+        return result
 
     except Exception as e:
         print(f"❌ Chat error: {e}")
         return {"success": False, "error": str(e)}
 
-@app.post("/roadmap")
+@app.post("/roadmap", dependencies=[admission("roadmap")])
 async def generate_roadmap(request: RoadmapRequest):
     """
     Generate a personalized learning roadmap using the CourseRoadmapAgent.
@@ -461,6 +1228,9 @@ async def generate_roadmap(request: RoadmapRequest):
     4. Build staged roadmap
     5. Fill each stage with resources (posts from vector store)
     6. Output UI-ready learning path
+    
+    Every step is checkpointed under the returned `run_id`; a failed run can
+    be continued with POST /roadmap/runs/{run_id}/resume.
     """
     try:
         if not roadmap_agent:
@@ -468,20 +1238,83 @@ async def generate_roadmap(request: RoadmapRequest):
         
         print(f"🧠 Generating roadmap for goal: {request.goal}")
         
-        # Execute the full 6-step pipeline
-        roadmap = await roadmap_agent.create_roadmap(request.goal)
+        async def start_run():
+            run = await asyncio.to_thread(roadmap_agent.runs.create, request.goal)
+            return run["id"], await roadmap_agent.create_roadmap(request.goal, run_id=run["id"])
         
-        return {
-            "success": True,
-            "data": roadmap
-        }
+        # Execute the full 6-step pipeline (once for concurrent requests with the same goal)
+        run_id, roadmap = await roadmap_flight.do(normalize_text(request.goal), start_run)
+        
+        result = {"success": True, "run_id": run_id, "data": roadmap}
+        if degraded():
+            result["degraded"] = degraded()
+        return json_response(result)
     
+    except RunFailed as e:
+        print(f"❌ Roadmap generation error: {e}")
+        return {"success": False, "error": str(e), "run_id": e.run_id, "failed_step": e.step}
     except Exception as e:
         print(f"❌ Roadmap generation error: {e}")
         import traceback
         traceback.print_exc()
         return {"success": False, "error": str(e)}
 
+@app.get("/roadmap/runs/{run_id}")
+async def get_roadmap_run(run_id: str, include_outputs: bool = False):
+    """Status, timings and (optionally) checkpointed outputs of every step of a roadmap run."""
+    if not roadmap_agent:
+        raise HTTPException(503, "CourseRoadmapAgent not available (check API keys)")
+    try:
+        run = await blocking("supabase_rpc", roadmap_agent.runs.get, run_id)
+    except RunNotFound:
+        raise HTTPException(404, "Roadmap run not found")
+    return json_response({"success": True, "data": step_view(run, include_outputs=include_outputs)})
+
+async def continue_roadmap_run(run_id: str, flight_key, action):
+    """Shared error mapping for resume / regenerate."""
+    if not roadmap_agent:
+        raise HTTPException(503, "CourseRoadmapAgent not available (check API keys)")
+    try:
+        roadmap = await roadmap_flight.do(flight_key, action)
+        result = {"success": True, "run_id": run_id, "data": roadmap}
+        if degraded():
+            result["degraded"] = degraded()
+        return json_response(result)
+    except RunNotFound:
+        raise HTTPException(404, "Roadmap run not found")
+    except RunInProgress as e:
+        raise HTTPException(409, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except RunFailed as e:
+        print(f"❌ Roadmap run error: {e}")
+        return {"success": False, "error": str(e), "run_id": e.run_id, "failed_step": e.step}
+
+@app.post("/roadmap/runs/{run_id}/resume", dependencies=[admission("roadmap")])
+async def resume_roadmap_run(run_id: str):
+    """Continue a failed run from its last completed step."""
+    return await continue_roadmap_run(run_id, ("resume", run_id), lambda: roadmap_agent.resume_roadmap(run_id))
+
+@app.post("/roadmap/runs/{run_id}/steps/{step}/regenerate", dependencies=[admission("roadmap")])
+async def regenerate_roadmap_step(run_id: str, step: str, stage_id: Optional[str] = None):
+    """
+    Recompute one step (e.g. `step4`) and the steps after it, reusing the
+    earlier checkpoints. `step5?stage_id=stage_2` re-fills one stage only.
+    """
+    return await continue_roadmap_run(
+        run_id,
+        ("regenerate", run_id, step, stage_id),
+        lambda: roadmap_agent.regenerate_step(run_id, step, stage_id=stage_id)
+    )
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # For several workers prefer `gunicorn -c gunicorn.conf.py main:app`
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+    if workers > 1:
+        import tempfile
+        os.environ.setdefault("STATE_BACKEND", "sqlite")
+        os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="postchat-metrics-"))
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,276 @@
+"""
+Prometheus metrics for the PostChat backend.
+
+All collectors live in the default registry and are exposed by the `/metrics`
+endpoint in main.py. Helpers here are deliberately thin wrappers around
+prometheus_client so instrumentation can stay enabled in production:
+
+- `stage_timer` / `timed_stage`   latency of internal pipeline stages
+- `external_call`                latency and error rate of third-party calls
+- `TokenUsageCallback`           LLM input/output tokens per call site
+- `LLM_RATE_LIMIT_RETRIES`       retries performed by `_safe_invoke`
+
+`stage_timer` and `external_call` also open a tracing span, so every timed
+block shows up nested in the request trace.
+
+Multi-worker deployments set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does
+this); every worker then writes its samples there and `/metrics` aggregates
+all workers, whichever one serves the scrape.
+"""
+
+import functools
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from observability.tracing import span
+
+# LLM-bound work runs for seconds to minutes, so extend the default buckets upward
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+
+# ============================================================================
+# COLLECTORS
+# ============================================================================
+
+REQUEST_LATENCY = Histogram(
+    "postchat_request_duration_seconds",
+    "HTTP request latency by endpoint",
+    ["method", "endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STAGE_LATENCY = Histogram(
+    "postchat_stage_duration_seconds",
+    "Latency of internal pipeline stages (scrape, extract, roadmap steps, ...)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STAGE_ERRORS = Counter(
+    "postchat_stage_errors_total",
+    "Internal pipeline stages that raised",
+    ["stage"],
+)
+
+EXTERNAL_LATENCY = Histogram(
+    "postchat_external_call_duration_seconds",
+    "Latency of calls to external services",
+    ["service", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+EXTERNAL_CALLS = Counter(
+    "postchat_external_calls_total",
+    "Calls to external services by outcome",
+    ["service", "operation", "outcome"],
+)
+
+DEADLINE_EXCEEDED = Counter(
+    "postchat_deadline_exceeded_total",
+    "External calls abandoned because their timeout or the request's deadline ran out",
+    ["dependency"],
+)
+
+HEDGED_REQUESTS = Counter(
+    "postchat_hedged_requests_total",
+    "Hedged duplicate requests: sent (primary was slow) and won (duplicate answered first)",
+    ["dependency", "outcome"],
+)
+
+DEGRADED_RESPONSES = Counter(
+    "postchat_degraded_responses_total",
+    "Responses served without an optional part (courses, semantic search, chat context, ...)",
+    ["feature"],
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "postchat_admission_in_flight",
+    "Requests currently holding a slot in an admission pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "postchat_admission_queue_depth",
+    "Requests waiting for a slot in an admission pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_WAIT = Histogram(
+    "postchat_admission_wait_seconds",
+    "Time admitted requests spent queued for a slot",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+
+ADMISSION_REJECTED = Counter(
+    "postchat_admission_rejected_total",
+    "Requests shed by admission control (queue_full = 429, queue_timeout = 503)",
+    ["pool", "reason"],
+)
+
+LLM_TOKENS = Counter(
+    "postchat_llm_tokens_total",
+    "LLM tokens consumed per call site",
+    ["call_site", "direction"],
+)
+
+LLM_RATE_LIMIT_RETRIES = Counter(
+    "postchat_llm_rate_limit_retries_total",
+    "RESOURCE_EXHAUSTED retries performed by _safe_invoke",
+    ["call_site"],
+)
+
+LLM_CACHE_REQUESTS = Counter(
+    "postchat_llm_cache_requests_total",
+    "LLM response cache lookups per call site (hit, miss, bypass)",
+    ["call_site", "result"],
+)
+
+SEARCH_CACHE_REQUESTS = Counter(
+    "postchat_search_cache_requests_total",
+    "Search result cache lookups by search mode (keyword, semantic) and result (hit, miss)",
+    ["mode", "result"],
+)
+
+INGESTED_POSTS = Counter(
+    "postchat_ingested_posts_total",
+    "Posts handed to the ingestion pipeline, by where the raw data came from",
+    ["source"],
+)
+
+BATCH_SIZE = Histogram(
+    "postchat_batch_size",
+    "Items per micro-batch handed to a batched handler",
+    ["batcher"],
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 48, 64, 128),
+)
+
+BATCH_FLUSHES = Counter(
+    "postchat_batch_flushes_total",
+    "Micro-batch flushes by trigger (window elapsed, batch full, drain)",
+    ["batcher", "reason"],
+)
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "postchat_single_flight_calls_total",
+    "Calls through a single-flight group: leader (did the work) or coalesced (awaited a leader)",
+    ["group", "role"],
+)
+
+CRAWL_RUNS = Counter(
+    "postchat_crawl_runs_total",
+    "Scheduled source crawls by outcome (succeeded, failed, skipped = already running elsewhere)",
+    ["outcome"],
+)
+
+CRAWL_POSTS = Counter(
+    "postchat_crawl_posts_total",
+    "Posts seen by the crawler: new (ingested), refreshed (engagement only), failed",
+    ["result"],
+)
+
+MEDIA_JOBS = Counter(
+    "postchat_media_enrichment_jobs_total",
+    "Media enrichment jobs by outcome (updated, unchanged, failed, dropped)",
+    ["outcome"],
+)
+
+MEDIA_IMAGES = Counter(
+    "postchat_media_images_total",
+    "Images seen by media enrichment (annotated, deduplicated, fetch_failed)",
+    ["result"],
+)
+
+MEDIA_QUEUE_DEPTH = Gauge(
+    "postchat_media_enrichment_queue_depth",
+    "Posts waiting for media enrichment",
+    multiprocess_mode="livesum",
+)
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a block as an internal pipeline stage."""
+    start = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    except BaseException:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - start)
+
+
+def timed_stage(stage: str):
+    """Decorator form of `stage_timer` for async functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def external_call(service: str, operation: str):
+    """Time a call to an external service and count its outcome."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with span(f"{service}.{operation}", service=service):
+            yield
+        outcome = "ok"
+    finally:
+        EXTERNAL_LATENCY.labels(service, operation).observe(time.perf_counter() - start)
+        EXTERNAL_CALLS.labels(service, operation, outcome).inc()
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """LangChain callback that records token usage under a call-site label."""
+
+    def __init__(self, call_site: str):
+        self.call_site = call_site
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        input_tokens = 0
+        output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage: Optional[Dict[str, Any]] = getattr(message, "usage_metadata", None)
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0) or 0
+                    output_tokens += usage.get("output_tokens", 0) or 0
+        if input_tokens:
+            LLM_TOKENS.labels(self.call_site, "input").inc(input_tokens)
+        if output_tokens:
+            LLM_TOKENS.labels(self.call_site, "output").inc(output_tokens)
+
+
+def llm_config(call_site: str) -> Dict[str, Any]:
+    """RunnableConfig that attaches token accounting for `call_site`."""
+    return {"callbacks": [TokenUsageCallback(call_site)], "run_name": call_site}
+
+
+def render_latest() -> tuple:
+    """Return (body, content_type) for the /metrics endpoint."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
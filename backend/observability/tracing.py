@@ -0,0 +1,349 @@
+"""
+Lightweight request tracing for the PostChat backend.
+
+Spans are kept in contextvars, so the trace started for an HTTP request
+propagates through `await` chains and into every nested stage or external
+call without threading ids through function signatures. Span ids follow the
+W3C Trace Context format, so an incoming `traceparent` header is honoured and
+finished traces can be shipped to any OpenTelemetry collector.
+
+Exporters are selected with TRACE_EXPORTERS (comma separated):
+- "console"  print an indented span tree per trace
+- "file"     append spans as JSON lines to TRACE_FILE (default traces.jsonl)
+- "otlp"     POST OTLP/HTTP JSON to OTEL_EXPORTER_OTLP_ENDPOINT
+
+Usage:
+    with span("tavily.search", query=query):
+        ...
+"""
+
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "postchat-backend")
+
+# Server-Timing headers grow with every span; keep the slowest ones only
+MAX_SERVER_TIMING_ENTRIES = 20
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+# ============================================================================
+# SPANS & TRACES
+# ============================================================================
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "attributes", "events", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.events: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "events": self.events,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """All spans recorded under one trace id."""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.root_span_id: Optional[str] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def record(self, finished: Span) -> None:
+        with self._lock:
+            self.spans.append(finished)
+
+    def server_timing(self) -> str:
+        """Render finished non-root spans as a Server-Timing header value."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for s in self.spans:
+                if s.span_id == self.root_span_id:
+                    continue
+                totals[s.name] = totals.get(s.name, 0.0) + s.duration_ms
+        slowest = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:MAX_SERVER_TIMING_ENTRIES]
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in slowest)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("postchat_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("postchat_span", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def add_event(name: str, **attributes: Any) -> None:
+    """Attach an event (e.g. a retry) to the active span, if any."""
+    active = _current_span.get()
+    if active is not None:
+        active.add_event(name, **attributes)
+
+
+def parse_traceparent(header: Optional[str]) -> tuple:
+    """Return (trace_id, parent_span_id) from a W3C traceparent header."""
+    if header:
+        match = _TRACEPARENT_RE.match(header.strip().lower())
+        if match:
+            return match.group(1), match.group(2)
+    return None, None
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes: Any):
+    """
+    Open a root span for a new trace and export it when the block exits.
+
+    Yields the Trace so callers can read its id and Server-Timing summary.
+    """
+    trace_id, remote_parent = parse_traceparent(traceparent)
+    trace = Trace(trace_id)
+    trace_token = _current_trace.set(trace)
+    try:
+        with span(name, _parent_id=remote_parent, **attributes):
+            yield trace
+    finally:
+        _current_trace.reset(trace_token)
+        exporter = get_exporter()
+        if exporter is not None:
+            exporter.export(trace.spans)
+
+
+@contextmanager
+def span(name: str, _parent_id: Optional[str] = None, **attributes: Any):
+    """
+    Record a nested span under the active trace.
+
+    Outside of a request (e.g. background jobs) a fresh trace is started so
+    the work is still exported.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        with start_trace(name, **attributes):
+            yield _current_span.get()
+        return
+
+    parent = _current_span.get()
+    parent_id = parent.span_id if parent is not None else _parent_id
+    current = Span(name, trace.trace_id, parent_id, attributes)
+    if trace.root_span_id is None:
+        trace.root_span_id = current.span_id
+    span_token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(span_token)
+        trace.record(current)
+
+
+# ============================================================================
+# EXPORTERS
+# ============================================================================
+
+class ConsoleExporter:
+    """Print each finished trace as an indented tree."""
+
+    def export(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        children: Dict[Optional[str], List[Span]] = {}
+        ids = {s.span_id for s in spans}
+        for s in sorted(spans, key=lambda s: s.start_ns):
+            parent = s.parent_id if s.parent_id in ids else None
+            children.setdefault(parent, []).append(s)
+
+        lines = [f"🧵 Trace {spans[0].trace_id}"]
+
+        def walk(parent_id: Optional[str], depth: int) -> None:
+            for s in children.get(parent_id, []):
+                marker = " ❌" if s.error else ""
+                lines.append(f"{'   ' * depth}└ {s.name} {s.duration_ms:.1f}ms{marker}")
+                walk(s.span_id, depth + 1)
+
+        walk(None, 1)
+        print("\n".join(lines))
+
+
+class FileExporter:
+    """Append spans as JSON lines for offline analysis."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        payload = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(payload)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+class OTLPHttpExporter:
+    """
+    Ship spans to an OpenTelemetry collector using OTLP/HTTP JSON.
+
+    Export happens on a daemon thread so request latency is unaffected; if the
+    collector falls behind, spans are dropped rather than buffered unbounded.
+    """
+
+    def __init__(self, endpoint: str, max_queue: int = 1000, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=max_queue)
+        threading.Thread(target=self._run, name="otlp-exporter", daemon=True).start()
+
+    def export(self, spans: List[Span]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            pass
+
+    def _encode(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{
+                    "scope": {"name": "postchat"},
+                    "spans": [
+                        {
+                            "traceId": s.trace_id,
+                            "spanId": s.span_id,
+                            "parentSpanId": s.parent_id or "",
+                            "name": s.name,
+                            "kind": 1,
+                            "startTimeUnixNano": str(s.start_ns),
+                            "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                            "attributes": _otlp_attributes(s.attributes),
+                            "events": [
+                                {
+                                    "name": e["name"],
+                                    "timeUnixNano": str(e["time_ns"]),
+                                    "attributes": _otlp_attributes(e["attributes"]),
+                                }
+                                for e in s.events
+                            ],
+                            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+                        }
+                        for s in spans
+                    ],
+                }],
+            }]
+        }
+
+    def _run(self) -> None:
+        with httpx.Client(timeout=self.timeout) as client:
+            while True:
+                spans = self._queue.get()
+                try:
+                    client.post(self.url, json=self._encode(spans))
+                except Exception as e:
+                    print(f"⚠ OTLP export failed: {e}")
+
+
+class MultiExporter:
+    def __init__(self, exporters: List[Any]):
+        self.exporters = exporters
+
+    def export(self, spans: List[Span]) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                print(f"⚠ Trace export failed: {e}")
+
+
+_exporter: Optional[MultiExporter] = None
+_exporter_configured = False
+
+
+def configure_exporters(names: Optional[str] = None) -> Optional[MultiExporter]:
+    """(Re)build the exporter chain from a comma-separated list of names."""
+    global _exporter, _exporter_configured
+    names = names if names is not None else os.getenv("TRACE_EXPORTERS", "")
+    exporters: List[Any] = []
+    for name in [n.strip().lower() for n in names.split(",") if n.strip()]:
+        if name == "console":
+            exporters.append(ConsoleExporter())
+        elif name == "file":
+            exporters.append(FileExporter(os.getenv("TRACE_FILE", "traces.jsonl")))
+        elif name == "otlp":
+            endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+            exporters.append(OTLPHttpExporter(endpoint))
+        else:
+            print(f"⚠ Unknown trace exporter '{name}' ignored")
+    _exporter = MultiExporter(exporters) if exporters else None
+    _exporter_configured = True
+    return _exporter
+
+
+def get_exporter() -> Optional[MultiExporter]:
+    if not _exporter_configured:
+        configure_exporters()
+    return _exporter
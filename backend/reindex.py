@@ -0,0 +1,227 @@
+"""
+Bulk re-embedding / reindex of the `documents` table from stored posts.
+
+Rebuilds every post's chunks from `posts.summary`, `raw_text` and enriched
+`media`, embeds them with batched `embed_documents` calls under the
+embeddings rate limiter, and bulk-replaces the post's rows in `documents`:
+the new rows are inserted before the old ones are deleted, so a failed page
+leaves its posts searchable. No Apify or extraction calls are made.
+
+Posts are streamed in keyset-paginated pages (ordered by `id`); after every
+page the last id is written to a checkpoint file, so an interrupted run
+resumes where it stopped.
+
+Usage (from backend/):
+    python reindex.py --dry-run
+    python reindex.py --page-size 100 --batch-size 64
+    python reindex.py --model models/gemini-embedding-001 --dimensions 768 --restart
+
+`--model` / `--dimensions` default to EMBEDDING_MODEL / EMBEDDING_DIMENSIONS,
+which main.py also uses for query embeddings. Set those before restarting the
+server after a reindex with other values, or search stops matching.
+A new dimensionality also needs the `documents.embedding` column and
+`match_documents` changed first (see README, Reindexing); the run stops before
+writing anything if the vectors don't fit the column.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from supabase.client import create_client
+
+from services.chunking import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS, build_post_chunks, count_tokens, media_text
+from services.rate_limiter import get_rate_limiter
+from services.search_cache import bump_corpus_version
+
+POST_COLUMNS = "id,original_post_id,url,author_name,published_at,topics,summary,raw_text,media"
+INSERT_BATCH = 200
+DELETE_BATCH_POSTS = 20   # keeps the excluded-id list of one delete well within URL limits
+SCHEMA_EMBEDDING_DIMENSIONS = 3072   # documents.embedding in Supabase_Schema.sql
+
+
+def load_checkpoint(path: str, fingerprint: str) -> Dict[str, Any]:
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("fingerprint") == fingerprint:
+            return checkpoint
+        print(f"⚠ Checkpoint {path} was written with different settings; starting over")
+    return {"fingerprint": fingerprint, "last_id": None, "posts": 0, "chunks": 0, "tokens": 0, "elapsed_s": 0.0}
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp, path)  # atomic, so a crash never leaves a torn checkpoint
+
+
+def fetch_page(client: Any, last_id: Optional[str], page_size: int) -> List[Dict[str, Any]]:
+    query = client.table("posts").select(POST_COLUMNS).order("id").limit(page_size)
+    if last_id is not None:
+        query = query.gt("id", last_id)
+    return query.execute().data
+
+
+def column_dimensions(client: Any) -> int:
+    """Dimension of `documents.embedding`, read from the database when it has the helper RPC."""
+    try:
+        return int(client.rpc("documents_embedding_dimensions").execute().data)
+    except Exception as e:
+        print(f"⚠ Could not read documents.embedding dimensions ({e}); assuming {SCHEMA_EMBEDDING_DIMENSIONS}")
+        return SCHEMA_EMBEDDING_DIMENSIONS
+
+
+def embed_batched(embeddings: Any, texts: List[str], batch_size: int, dimensions: Optional[int]) -> List[List[float]]:
+    limiter = get_rate_limiter("gemini_embeddings")
+    vectors: List[List[float]] = []
+    for offset in range(0, len(texts), batch_size):
+        batch = texts[offset:offset + batch_size]
+        limiter.wait()
+        kwargs = {"output_dimensionality": dimensions} if dimensions else {}
+        vectors.extend(embeddings.embed_documents(batch, **kwargs))
+    return vectors
+
+
+def reindex(args: argparse.Namespace, client: Any, embeddings: Any) -> Dict[str, Any]:
+    fingerprint = hashlib.sha256(json.dumps({
+        "model": args.model,
+        "dimensions": args.dimensions,
+        "chunk_tokens": CHUNK_TOKENS,
+        "chunk_overlap": CHUNK_OVERLAP_TOKENS,
+        "dry_run": args.dry_run,
+    }, sort_keys=True).encode()).hexdigest()[:16]
+
+    checkpoint = {"fingerprint": fingerprint, "last_id": None, "posts": 0, "chunks": 0, "tokens": 0, "elapsed_s": 0.0}
+    if not args.restart:
+        checkpoint = load_checkpoint(args.checkpoint, fingerprint)
+    if checkpoint.get("completed"):
+        print(f"✓ Checkpoint {args.checkpoint} is already complete; pass --restart to reindex again")
+        return checkpoint
+    if checkpoint["last_id"]:
+        print(f"↩️  Resuming after id {checkpoint['last_id']} ({checkpoint['posts']} posts done)")
+
+    dimensions = None if args.dry_run else column_dimensions(client)
+    started = time.perf_counter() - checkpoint["elapsed_s"]
+    while True:
+        posts = fetch_page(client, checkpoint["last_id"], args.page_size)
+        if not posts:
+            break
+
+        # Build all chunks for the page
+        documents = []
+        for post in posts:
+            documents.extend(build_post_chunks(
+                post["original_post_id"],
+                post.get("summary"),
+                post.get("raw_text"),
+                metadata={
+                    "author": post.get("author_name"),
+                    "published_at": post.get("published_at"),
+                    "url": post.get("url"),
+                    "topics": post.get("topics") or [],
+                },
+                media_text=media_text(post.get("media")),
+            ))
+        texts = [doc.page_content for doc in documents]
+        page_tokens = sum(count_tokens(t) for t in texts)
+
+        if not args.dry_run and texts:
+            vectors = embed_batched(embeddings, texts, args.batch_size, args.dimensions)
+            if len(vectors[0]) != dimensions:
+                raise SystemExit(
+                    f"❌ The model returns {len(vectors[0])}-dimensional vectors but documents.embedding is "
+                    f"VECTOR({dimensions}); change the column and match_documents first (README, Reindexing)"
+                )
+            # Ids chosen here, so the old rows can be told apart without reading anything back
+            rows = [
+                {"id": str(uuid.uuid4()), "content": doc.page_content, "metadata": doc.metadata, "embedding": vector}
+                for doc, vector in zip(documents, vectors)
+            ]
+            new_ids: Dict[str, List[str]] = {}
+            for row in rows:
+                new_ids.setdefault(row["metadata"]["post_id"], []).append(row["id"])
+            post_ids = [post["original_post_id"] for post in posts]
+            # Insert before deleting, so a failed insert leaves the old chunks in place
+            for offset in range(0, len(rows), INSERT_BATCH):
+                client.table("documents").insert(rows[offset:offset + INSERT_BATCH]).execute()
+            for offset in range(0, len(post_ids), DELETE_BATCH_POSTS):
+                batch = post_ids[offset:offset + DELETE_BATCH_POSTS]
+                keep = [row_id for post_id in batch for row_id in new_ids.get(post_id, [])]
+                query = client.table("documents").delete().in_("metadata->>post_id", batch)
+                if keep:
+                    query = query.not_.in_("id", keep)
+                query.execute()
+            # Reaches running servers only with a shared STATE_BACKEND; otherwise their cache TTL applies
+            bump_corpus_version()
+
+        checkpoint["last_id"] = posts[-1]["id"]
+        checkpoint["posts"] += len(posts)
+        checkpoint["chunks"] += len(documents)
+        checkpoint["tokens"] += page_tokens
+        checkpoint["elapsed_s"] = time.perf_counter() - started
+        save_checkpoint(args.checkpoint, checkpoint)
+
+        elapsed = max(checkpoint["elapsed_s"], 1e-9)
+        print(
+            f"{'🧪' if args.dry_run else '✓'} {checkpoint['posts']} posts, {checkpoint['chunks']} chunks, "
+            f"{checkpoint['tokens']} tokens | {checkpoint['posts'] / elapsed:.1f} posts/s, "
+            f"{checkpoint['chunks'] / elapsed:.1f} chunks/s"
+        )
+
+    checkpoint["completed"] = True
+    save_checkpoint(args.checkpoint, checkpoint)
+    return checkpoint
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Re-embed all posts into the documents table")
+    parser.add_argument("--page-size", type=int, default=100, help="Posts fetched per keyset page")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per embed_documents call")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL") or "models/gemini-embedding-001")
+    parser.add_argument(
+        "--dimensions",
+        type=int,
+        default=int(os.getenv("EMBEDDING_DIMENSIONS") or 0) or None,
+        help="output_dimensionality (must match documents.embedding)"
+    )
+    parser.add_argument("--checkpoint", default="reindex_checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="Chunk and count only; no embedding or writes")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    # Before parsing: EMBEDDING_MODEL / EMBEDDING_DIMENSIONS provide the defaults
+    load_dotenv(os.path.join(os.path.dirname(__file__), "../.env"))
+    args = parse_args(argv)
+
+    # Same environment variables as main.py
+    supabase_url = os.getenv("SUPABASE_URL") or os.getenv("VITE_SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY") or os.getenv("VITE_SUPABASE_ANON_KEY")
+    google_api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+    if not (supabase_url and supabase_key and (google_api_key or args.dry_run)):
+        raise SystemExit("❌ SUPABASE_URL/SUPABASE_SERVICE_KEY and GOOGLE_API_KEY are required")
+
+    client = create_client(supabase_url, supabase_key)
+    embeddings = None
+    if not args.dry_run:
+        embeddings = GoogleGenerativeAIEmbeddings(
+            model=args.model,
+            google_api_key=google_api_key,
+            task_type="RETRIEVAL_DOCUMENT"
+        )
+
+    result = reindex(args, client, embeddings)
+    print(f"🏁 Reindex complete: {result['posts']} posts, {result['chunks']} chunks in {result['elapsed_s']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
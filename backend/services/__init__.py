@@ -0,0 +1 @@
+"""Shared services (caching, batching, scheduling) for PostChat backend."""
@@ -0,0 +1,162 @@
+"""
+Admission control: per-endpoint concurrency limits with bounded wait queues.
+
+Each expensive endpoint group (roadmap, ingest, chat, search) gets its own
+pool, so a burst of roadmaps cannot starve chat or search:
+
+    pool = AdmissionPool("roadmap", max_concurrent=2, max_queue=4, max_wait_s=10)
+    async with pool.admit():
+        ...  # at most 2 at once, up to 4 more waiting in FIFO order
+
+When the pool is busy and its queue is full, `admit()` raises
+AdmissionRejected right away (429). A queued request that is not admitted
+within `max_wait_s`, or before its request deadline runs out, is rejected
+with 503. Both carry a Retry-After estimate taken from recent service times.
+
+Limits are per worker process; with N workers the host admits N times as many.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from observability.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT
+from services.deadlines import remaining
+
+MAX_RETRY_AFTER_S = 60
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, pool: str, status_code: int, reason: str, retry_after: int):
+        super().__init__(f"{pool} is overloaded ({reason}), retry in {retry_after}s")
+        self.pool = pool
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, max_wait_s: float = 10.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_s: Optional[float] = None   # EWMA of time a request holds a slot
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    @asynccontextmanager
+    async def admit(self):
+        if not self.enabled:
+            yield
+            return
+        await self._acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._observe(time.monotonic() - started)
+            self._release()
+
+    async def _acquire(self) -> None:
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            self._admitted(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._reject(429, "queue_full")
+
+        wait_s = self.max_wait_s
+        left = remaining()
+        if left is not None:
+            wait_s = min(wait_s, left)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUE_DEPTH.labels(self.name).inc()
+        queued = time.monotonic()
+        try:
+            await asyncio.wait({waiter}, timeout=max(wait_s, 0))
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        finally:
+            ADMISSION_QUEUE_DEPTH.labels(self.name).dec()
+        if not (waiter.done() and not waiter.cancelled()):
+            self._abandon(waiter)
+            self._reject(503, "queue_timeout")
+        self._admitted(time.monotonic() - queued)
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as we gave up: pass it on
+            self._hand_over()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _release(self) -> None:
+        ADMISSION_IN_FLIGHT.labels(self.name).dec()
+        self._hand_over()
+
+    def _hand_over(self) -> None:
+        # Give the slot straight to the oldest live waiter, so newcomers can't jump the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def _admitted(self, waited_s: float) -> None:
+        self.admitted += 1
+        ADMISSION_IN_FLIGHT.labels(self.name).inc()
+        ADMISSION_WAIT.labels(self.name).observe(waited_s)
+
+    def _observe(self, seconds: float) -> None:
+        self._service_s = seconds if self._service_s is None else 0.8 * self._service_s + 0.2 * seconds
+
+    def retry_after(self) -> int:
+        """Seconds until the queue has likely drained: service time x queued requests per slot."""
+        if self._service_s is None:
+            return 1
+        backlog = (len(self._waiters) + 1) / self.max_concurrent
+        return max(1, min(MAX_RETRY_AFTER_S, math.ceil(self._service_s * backlog)))
+
+    def _reject(self, status_code: int, reason: str) -> None:
+        self.rejected += 1
+        ADMISSION_REJECTED.labels(self.name, reason).inc()
+        raise AdmissionRejected(self.name, status_code, reason, self.retry_after())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self._active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "retry_after_s": self.retry_after() if self.enabled else 0,
+        }
+
+
+def pool_from_env(name: str, max_concurrent: int, max_queue: int) -> AdmissionPool:
+    """Build a pool, overridable with ADMISSION_<NAME>="<concurrent>,<queue>" (concurrent 0 disables)."""
+    spec = os.getenv(f"ADMISSION_{name.upper()}")
+    if spec:
+        concurrent, _, queue = spec.partition(",")
+        max_concurrent = int(concurrent)
+        max_queue = int(queue) if queue else max_queue
+    return AdmissionPool(name, max_concurrent, max_queue, float(os.getenv("ADMISSION_MAX_WAIT_S", 10)))
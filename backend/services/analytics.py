@@ -0,0 +1,127 @@
+"""
+Read side of the analytics rollups.
+
+A trigger on `posts` (see Supabase_Schema.sql, section 6) keeps four small
+summary tables current on every insert / update / delete:
+
+- analytics_topics                 posts per topic
+- analytics_sentiment_daily        posts per (day, sentiment)
+- analytics_authors                posts and summed engagement per author
+- analytics_engagement_histogram   log-scale histogram of likes + comments + shares
+
+Each endpoint is one RPC over those tables, so its cost depends on the
+number of topics / days / histogram buckets asked for, not on the number of
+posts. Engagement percentiles are interpolated from the histogram here
+(buckets are ~19% wide, which bounds the error). The per-topic drill-down
+is the exception: it filters `posts` through the GIN index on `topics`.
+"""
+
+import math
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+SENTIMENT_BUCKETS = ("day", "week", "month")
+AUTHOR_ORDERS = ("posts", "engagement")
+DEFAULT_PERCENTILES = (50, 75, 90, 99)
+
+# Must match engagement_bucket() in the schema
+BUCKETS_PER_DOUBLING = 4
+
+
+def engagement_score(metrics: Optional[Dict[str, Any]]) -> int:
+    metrics = metrics or {}
+    return sum(int(metrics.get(key) or 0) for key in ("likes", "comments", "shares"))
+
+
+def engagement_bucket(score: int) -> int:
+    return math.floor(BUCKETS_PER_DOUBLING * math.log2(max(score, 0) + 1))
+
+
+def bucket_bounds(bucket: int) -> tuple:
+    """[low, high) engagement scores covered by a histogram bucket."""
+    return (
+        2 ** (bucket / BUCKETS_PER_DOUBLING) - 1,
+        2 ** ((bucket + 1) / BUCKETS_PER_DOUBLING) - 1,
+    )
+
+
+def percentiles_from_histogram(rows: List[Dict[str, Any]], percentiles: Sequence[float]) -> Dict[str, float]:
+    """Interpolate percentiles from `[{bucket, post_count}]`, assuming posts are spread evenly inside a bucket."""
+    rows = sorted((r for r in rows if r["post_count"] > 0), key=lambda r: r["bucket"])
+    total = sum(r["post_count"] for r in rows)
+    result: Dict[str, float] = {}
+    for p in percentiles:
+        key = f"p{p:g}"
+        if not total:
+            result[key] = 0.0
+            continue
+        rank = p / 100 * total
+        seen = 0
+        for row in rows:
+            if seen + row["post_count"] >= rank:
+                low, high = bucket_bounds(row["bucket"])
+                fraction = (rank - seen) / row["post_count"]
+                result[key] = round(low + fraction * (high - low), 1)
+                break
+            seen += row["post_count"]
+    return result
+
+
+def top_topics(supabase_client: Any, limit: int = 20) -> List[Dict[str, Any]]:
+    return supabase_client.rpc("analytics_top_topics", {"max_topics": limit}).execute().data
+
+
+def topic_breakdown(supabase_client: Any, topic: str) -> Dict[str, Any]:
+    rows = supabase_client.rpc("analytics_topic_breakdown", {"topic": topic}).execute().data
+    post_count = sum(int(r["post_count"]) for r in rows)
+    return {
+        "topic": topic,
+        "post_count": post_count,
+        "sentiment": {r["sentiment"]: int(r["post_count"]) for r in rows},
+        "avg_engagement": round(sum(float(r["total_engagement"] or 0) for r in rows) / post_count, 1) if post_count else 0.0,
+    }
+
+
+def sentiment_series(
+    supabase_client: Any,
+    bucket: str = "week",
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """`[{bucket_start, counts: {sentiment: n}, total}]`, oldest bucket first."""
+    if bucket not in SENTIMENT_BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(SENTIMENT_BUCKETS)}")
+    rows = supabase_client.rpc("analytics_sentiment_series", {
+        "bucket": bucket,
+        "since": since.isoformat() if since else None,
+        "until": until.isoformat() if until else None,
+    }).execute().data
+
+    series: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        point = series.setdefault(str(row["bucket_start"]), {"bucket_start": str(row["bucket_start"]), "counts": {}, "total": 0})
+        point["counts"][row["sentiment"]] = int(row["post_count"])
+        point["total"] += int(row["post_count"])
+    return [series[key] for key in sorted(series)]
+
+
+def top_authors(supabase_client: Any, limit: int = 10, order_by: str = "posts") -> List[Dict[str, Any]]:
+    if order_by not in AUTHOR_ORDERS:
+        raise ValueError(f"order_by must be one of {', '.join(AUTHOR_ORDERS)}")
+    rows = supabase_client.rpc("analytics_top_authors", {"max_authors": limit, "order_by": order_by}).execute().data
+    return [
+        {**row, "avg_engagement": round(int(row["total_engagement"]) / row["post_count"], 1) if row["post_count"] else 0.0}
+        for row in rows
+    ]
+
+
+def engagement_summary(supabase_client: Any, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+    rows = supabase_client.rpc("analytics_engagement_histogram_rows", {}).execute().data
+    return {
+        "post_count": sum(int(r["post_count"]) for r in rows),
+        "percentiles": percentiles_from_histogram(rows, percentiles),
+        "histogram": [
+            {"bucket": r["bucket"], "low": round(bucket_bounds(r["bucket"])[0], 1), "high": round(bucket_bounds(r["bucket"])[1], 1), "post_count": r["post_count"]}
+            for r in rows
+        ],
+    }
@@ -0,0 +1,102 @@
+"""
+Micro-batching of concurrent single-item calls.
+
+Callers `await batcher.submit(item)` as if it were a single call. Items that
+arrive within `window_s` of the first one (or until `max_size` is reached)
+are handed to the handler together, and each caller gets back only its own
+result or exception:
+
+    async def scrape_batch(urls: List[str], api_key: str) -> List[Any]:
+        ...  # one result (or Exception instance) per url, same order
+
+    batcher = MicroBatcher("ingest", scrape_batch, window_s=0.25, max_size=10)
+    post = await batcher.submit(url, key=api_key)
+
+Items are only batched with others under the same `key` (e.g. the same
+Apify account). A caller that is cancelled while waiting is dropped from the
+result hand-off; the rest of its batch is unaffected.
+
+The handler runs in a fresh context, outside any one caller's request
+deadline and trace, so a caller with a tight deadline can't fail the rest
+of its batch. Each caller instead stops waiting once its own deadline runs out.
+"""
+
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from observability.metrics import BATCH_FLUSHES, BATCH_SIZE
+from services.deadlines import DeadlineExceeded, remaining
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[List[Any], Any], Awaitable[List[Any]]],
+        window_s: float = 0.05,
+        max_size: int = 16,
+    ):
+        self.name = name
+        self.handler = handler
+        self.window_s = window_s
+        self.max_size = max_size
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._running: set = set()
+
+    async def submit(self, item: Any, key: Hashable = None) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((item, future))
+        if len(batch) >= self.max_size:
+            self._flush(key, "full")
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window_s, self._flush, key, "window")
+        left = remaining()
+        if left is None:
+            return await future
+        try:
+            return await asyncio.wait_for(future, max(left, 0))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Request deadline exceeded waiting for the {self.name} batch") from None
+
+    def _flush(self, key: Hashable, reason: str) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = [(item, future) for item, future in self._pending.pop(key, []) if not future.done()]
+        if not batch:
+            return
+        BATCH_SIZE.labels(self.name).observe(len(batch))
+        BATCH_FLUSHES.labels(self.name, reason).inc()
+        # Not the context of whichever caller or timer triggered the flush
+        task = contextvars.Context().run(asyncio.create_task, self._run(batch, key), name=f"{self.name}-batch")
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]], key: Hashable) -> None:
+        try:
+            results = await self.handler([item for item, _ in batch], key)
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name} batch handler returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # caller went away
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """Flush everything pending and wait for in-flight batches (used at shutdown)."""
+        for key in list(self._pending):
+            self._flush(key, "drain")
+        if self._running:
+            await asyncio.wait(list(self._running), timeout=timeout)
@@ -0,0 +1,179 @@
+"""
+Chunked document indexing for posts.
+
+Long posts are split into overlapping, token-bounded chunks so each
+embedding covers one idea and chat only receives the passages that matched.
+Every chunk carries `post_id` / `chunk_index` metadata linking it back to
+its parent row in `posts`; chunk 0 is the AI summary, and text recovered
+from images (OCR / captions) is chunked after the post body.
+
+Retrieval scores at chunk level (`match_documents` rows) and aggregates to
+posts with `aggregate_chunk_matches`.
+
+Tuning via environment:
+    CHUNK_TOKENS=300
+    CHUNK_OVERLAP_TOKENS=50
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", 300))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 50))
+
+
+def _token_counter() -> Callable[[str], int]:
+    """tiktoken's cl100k_base when installed (close enough to Gemini), else ~4 chars/token."""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:
+        return lambda text: max(1, len(text) // 4)
+
+
+count_tokens = _token_counter()
+
+_splitter = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_TOKENS,
+    chunk_overlap=CHUNK_OVERLAP_TOKENS,
+    length_function=count_tokens,
+    separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""],
+)
+
+
+def media_text(media: Optional[List[Dict[str, Any]]]) -> str:
+    """Join OCR text and descriptions of a post's media items."""
+    parts = []
+    for i, item in enumerate(media or []):
+        if item.get("description"):
+            parts.append(f"Image {i + 1}: {item['description']}")
+        if item.get("ocr_text"):
+            parts.append(f"Image {i + 1} text: {item['ocr_text']}")
+    return "\n".join(parts)
+
+
+def build_post_chunks(
+    post_id: str,
+    summary: Optional[str],
+    raw_text: Optional[str],
+    metadata: Optional[Dict[str, Any]] = None,
+    media_text: Optional[str] = None,
+) -> List[Document]:
+    """
+    Split a post into chunk Documents ready for the vector store.
+
+    `metadata` (author, url, topics, ...) is copied onto every chunk.
+    """
+    base = dict(metadata or {})
+    base["post_id"] = post_id
+
+    texts = []
+    if summary:
+        texts.append(f"Summary: {summary}")
+    if raw_text:
+        texts.extend(_splitter.split_text(raw_text))
+    if media_text:
+        texts.extend(_splitter.split_text(media_text))
+
+    return [
+        Document(
+            page_content=text,
+            metadata={**base, "chunk_index": i, "chunk_count": len(texts)},
+        )
+        for i, text in enumerate(texts)
+    ]
+
+
+def index_post_chunks(supabase_client: Any, vector_store: Any, post_id: str, documents: List[Document]) -> int:
+    """
+    Replace all chunks of `post_id` in the documents table.
+
+    Old chunks are deleted first so re-ingesting a post (or changing the
+    chunking parameters) never leaves stale passages behind.
+    """
+    return index_posts_chunks(supabase_client, vector_store, {post_id: documents})
+
+
+def index_posts_chunks(supabase_client: Any, vector_store: Any, documents_by_post: Dict[str, List[Document]]) -> int:
+    """
+    Bulk variant: one embed pass for all chunks, then one delete + insert.
+
+    Embedding happens before the delete, so a rate limit or embedding error
+    leaves the posts' old chunks searchable.
+    """
+    if not documents_by_post:
+        return 0
+    documents = [doc for docs in documents_by_post.values() for doc in docs]
+    vectors = vector_store.embeddings.embed_documents([doc.page_content for doc in documents]) if documents else []
+    if supabase_client is not None:
+        post_ids = list(documents_by_post)
+        query = supabase_client.table("documents").delete()
+        if len(post_ids) == 1:
+            query = query.eq("metadata->>post_id", post_ids[0])
+        else:
+            query = query.in_("metadata->>post_id", post_ids)
+        query.execute()
+    if documents:
+        vector_store.add_vectors(vectors, documents)
+    return len(documents)
+
+
+def aggregate_chunk_matches(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Group `match_documents` rows by parent post.
+
+    Returns posts ordered by their best chunk similarity:
+    [{"post_id", "score", "metadata", "chunks": [row, ...]}], chunks best first.
+    Rows without a post_id are ignored.
+    """
+    posts: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        metadata = row.get("metadata") or {}
+        post_id = metadata.get("post_id")
+        if not post_id:
+            continue
+        similarity = float(row.get("similarity") or 0.0)
+        entry = posts.get(post_id)
+        if entry is None:
+            entry = posts[post_id] = {"post_id": post_id, "score": similarity, "metadata": metadata, "chunks": []}
+        entry["score"] = max(entry["score"], similarity)
+        entry["chunks"].append(row)
+
+    ranked = sorted(posts.values(), key=lambda p: p["score"], reverse=True)
+    for entry in ranked:
+        entry["chunks"].sort(key=lambda r: float(r.get("similarity") or 0.0), reverse=True)
+    return ranked
+
+
+def select_context_chunks(
+    rows: List[Dict[str, Any]],
+    max_chunks: int = 5,
+    max_per_post: int = 2,
+    max_tokens: int = 1500,
+) -> List[Dict[str, Any]]:
+    """
+    Pick the best-matching chunks for an LLM prompt.
+
+    Caps chunks per post so one long post cannot crowd out the others, and
+    stops once the token budget is spent.
+    """
+    selected = []
+    per_post: Dict[str, int] = {}
+    used_tokens = 0
+    for row in sorted(rows, key=lambda r: float(r.get("similarity") or 0.0), reverse=True):
+        post_id = (row.get("metadata") or {}).get("post_id", "")
+        if per_post.get(post_id, 0) >= max_per_post:
+            continue
+        tokens = count_tokens(row.get("content") or "")
+        if selected and used_tokens + tokens > max_tokens:
+            continue
+        selected.append(row)
+        per_post[post_id] = per_post.get(post_id, 0) + 1
+        used_tokens += tokens
+        if len(selected) >= max_chunks:
+            break
+    return selected
@@ -0,0 +1,270 @@
+"""
+Scheduled incremental crawling of followed Facebook pages / groups.
+
+Sources live in the `crawl_sources` table. A scheduler loop wakes every
+`tick_s` (with jitter) and runs the sources whose `next_run_at` is due:
+
+1. Runs the Apify scraper for the source with `onlyPostsNewerThan` set from
+   the source's watermark (the newest `published_at` seen), widened to the
+   engagement refresh window so recent posts are re-read too
+2. Posts whose `original_post_id` is not in `posts` go through the normal
+   extraction / upsert / embed pipeline, a few at a time per source
+3. Posts already stored only get their engagement metrics refreshed, in one
+   batched `refresh_engagement` RPC; no extraction or re-embedding
+4. On success the watermark advances and the next run is scheduled one
+   interval out; on failure the run backs off exponentially. Both delays
+   are jittered so sources don't synchronize.
+
+At most one run per source is in flight across all worker processes (a
+lease in the shared state backend), and at most `max_sources` sources are
+crawled concurrently per process.
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from observability.metrics import CRAWL_POSTS, CRAWL_RUNS, external_call, stage_timer
+from services.deadlines import blocking, timeout_for
+from services.search_cache import bump_corpus_version
+from services.shared_state import get_shared_state
+
+CRAWL_ACTOR = "apify/facebook-posts-scraper"
+DUE_SOURCES_PER_TICK = 20
+
+
+def parse_time(value: Any) -> Optional[datetime]:
+    """Parse Apify / Postgres timestamps (ISO strings or epoch seconds) to aware UTC datetimes."""
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value, tz=timezone.utc)
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def engagement_from_raw(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Engagement metrics straight from an Apify item, in the `engagement_metrics` shape."""
+    reactions = item.get("reactions")
+    return {
+        "likes": int(item.get("likes") or item.get("likesCount") or 0),
+        "comments": int(item.get("comments") or item.get("commentsCount") or 0),
+        "shares": int(item.get("shares") or item.get("sharesCount") or 0),
+        "reactions": reactions if isinstance(reactions, dict) else {},
+    }
+
+
+def jittered(seconds: float, jitter: float) -> float:
+    return seconds * random.uniform(1 - jitter, 1 + jitter)
+
+
+class SourceCrawler:
+    """Scheduler loop plus the per-source incremental crawl."""
+
+    def __init__(
+        self,
+        supabase_client: Any,
+        apify_client_factory: Callable[[], Any],
+        ingest: Callable[[Dict[str, Any]], Awaitable[Any]],
+        tick_s: float = 60.0,
+        max_sources: int = 2,
+        ingest_concurrency: int = 2,
+        refresh_window_s: float = 3 * 24 * 3600,
+        retry_base_s: float = 60.0,
+        max_backoff_s: float = 6 * 3600,
+        jitter: float = 0.1,
+        lease_ttl_s: float = 1800.0,
+        state: Any = None,
+    ):
+        self.supabase_client = supabase_client
+        self.apify_client_factory = apify_client_factory
+        self.ingest = ingest
+        self.tick_s = tick_s
+        self.ingest_concurrency = ingest_concurrency
+        self.refresh_window_s = refresh_window_s
+        self.retry_base_s = retry_base_s
+        self.max_backoff_s = max_backoff_s
+        self.jitter = jitter
+        self.lease_ttl_s = lease_ttl_s
+        self.state = state or get_shared_state()
+        self._slots = asyncio.Semaphore(max_sources)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(), name="source-crawler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_due()
+            except Exception as e:
+                print(f"⚠ Crawl scheduler error: {e}")
+            await asyncio.sleep(jittered(self.tick_s, self.jitter))
+
+    async def run_due(self) -> List[Dict[str, Any]]:
+        """Crawl every enabled source whose next_run_at has passed."""
+        now = datetime.now(timezone.utc).isoformat()
+        with external_call("supabase", "select_due_sources"):
+            response = await asyncio.to_thread(
+                lambda: self.supabase_client.table("crawl_sources").select("*")
+                .eq("enabled", True).lte("next_run_at", now)
+                .order("next_run_at").limit(DUE_SOURCES_PER_TICK).execute()
+            )
+        results = await asyncio.gather(*(self.run_source(source) for source in response.data))
+        return [r for r in results if r is not None]
+
+    async def run_source(self, source: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Crawl one source under its lease; returns the run stats, or None if another run holds it."""
+        lease = f"crawl_lease:{source['id']}"
+        if not self.state.set_if_absent(lease, {"started_at": datetime.now(timezone.utc).isoformat()}, ttl_s=self.lease_ttl_s):
+            CRAWL_RUNS.labels("skipped").inc()
+            return None
+        try:
+            async with self._slots:
+                try:
+                    with stage_timer("crawl.source"):
+                        stats = await self.crawl_source(source)
+                except Exception as e:
+                    CRAWL_RUNS.labels("failed").inc()
+                    print(f"⚠ Crawl failed for {source['url']}: {e}")
+                    await self._record_failure(source, e)
+                    return {"source_id": source["id"], "success": False, "error": str(e)}
+                CRAWL_RUNS.labels("succeeded").inc()
+                await self._record_success(source, stats)
+                return {"source_id": source["id"], "success": True, **stats}
+        finally:
+            self.state.delete(lease)
+
+    # --- crawl ---
+
+    async def crawl_source(self, source: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        watermark = parse_time(source.get("watermark"))
+        newer_than = None
+        if watermark is not None:
+            newer_than = min(watermark, now - timedelta(seconds=self.refresh_window_s))
+
+        items = await blocking("apify", self._scrape, source["url"], newer_than, source.get("results_limit") or 50)
+        items = [item for item in items if item.get("postId")]
+        ids = list({str(item["postId"]) for item in items})
+
+        existing = set()
+        if ids:
+            with external_call("supabase", "select_known_posts"):
+                response = await asyncio.to_thread(
+                    lambda: self.supabase_client.table("posts").select("original_post_id")
+                    .in_("original_post_id", ids).execute()
+                )
+            existing = {row["original_post_id"] for row in response.data}
+
+        known = [item for item in items if str(item["postId"]) in existing]
+        fresh = [item for item in items if str(item["postId"]) not in existing]
+
+        refreshed = await self._refresh_engagement(known)
+        failed = await self._ingest_new(fresh)
+
+        # Advance past everything seen, but stay below a post that failed to ingest so it is retried
+        times = [t for t in (parse_time(item.get("time")) for item in items) if t is not None]
+        new_watermark = max(times + ([watermark] if watermark else []), default=None)
+        failed_times = [t for t in (parse_time(item.get("time")) for item in failed) if t is not None]
+        if failed_times and new_watermark is not None:
+            new_watermark = min(new_watermark, min(failed_times) - timedelta(seconds=1))
+
+        CRAWL_POSTS.labels("new").inc(len(fresh) - len(failed))
+        CRAWL_POSTS.labels("failed").inc(len(failed))
+        CRAWL_POSTS.labels("refreshed").inc(refreshed)
+        print(
+            f"✓ Crawled {source['url']}: {len(items)} scraped, {len(fresh) - len(failed)} new, "
+            f"{refreshed} refreshed, {len(failed)} failed"
+        )
+        return {
+            "scraped": len(items),
+            "new": len(fresh) - len(failed),
+            "refreshed": refreshed,
+            "failed": len(failed),
+            "watermark": new_watermark.isoformat() if new_watermark else None,
+        }
+
+    def _scrape(self, url: str, newer_than: Optional[datetime], results_limit: int) -> List[Dict[str, Any]]:
+        run_input: Dict[str, Any] = {"startUrls": [{"url": url}], "resultsLimit": results_limit}
+        if newer_than is not None:
+            run_input["onlyPostsNewerThan"] = newer_than.strftime("%Y-%m-%dT%H:%M:%S")
+        client = self.apify_client_factory()
+        with stage_timer("crawl.scrape"), external_call("apify", "facebook_posts_scraper"):
+            # Aborted server-side at the Apify cap, so a hung actor can't hold the crawl lease for its whole TTL
+            run = client.actor(CRAWL_ACTOR).call(run_input=run_input, timeout_secs=int(timeout_for("apify")))
+            return list(client.dataset(run["defaultDatasetId"]).iterate_items())
+
+    async def _refresh_engagement(self, items: List[Dict[str, Any]]) -> int:
+        if not items:
+            return 0
+        updates = [
+            {"original_post_id": str(item["postId"]), "engagement_metrics": engagement_from_raw(item)}
+            for item in items
+        ]
+        with stage_timer("crawl.refresh_engagement"), external_call("supabase", "refresh_engagement"):
+            response = await asyncio.to_thread(
+                lambda: self.supabase_client.rpc("refresh_engagement", {"updates": updates}).execute()
+            )
+        bump_corpus_version()
+        return int(response.data or 0)
+
+    async def _ingest_new(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run new posts through the ingestion pipeline; returns the items that failed."""
+        slots = asyncio.Semaphore(self.ingest_concurrency)
+        failed: List[Dict[str, Any]] = []
+
+        async def ingest_one(item: Dict[str, Any]) -> None:
+            async with slots:
+                try:
+                    await self.ingest(item)
+                except Exception as e:
+                    print(f"⚠ Ingest failed for crawled post {item.get('postId')}: {e}")
+                    failed.append(item)
+
+        await asyncio.gather(*(ingest_one(item) for item in items))
+        return failed
+
+    # --- scheduling ---
+
+    async def _record_success(self, source: Dict[str, Any], stats: Dict[str, Any]) -> None:
+        now = datetime.now(timezone.utc)
+        next_run = now + timedelta(seconds=jittered(source.get("interval_s") or 3600, self.jitter))
+        await self._update_source(source["id"], {
+            "watermark": stats["watermark"] or source.get("watermark"),
+            "last_run_at": now.isoformat(),
+            "last_success_at": now.isoformat(),
+            "consecutive_failures": 0,
+            "last_error": None,
+            "last_stats": stats,
+            "next_run_at": next_run.isoformat(),
+        })
+
+    async def _record_failure(self, source: Dict[str, Any], error: Exception) -> None:
+        now = datetime.now(timezone.utc)
+        failures = int(source.get("consecutive_failures") or 0) + 1
+        backoff = min(self.max_backoff_s, self.retry_base_s * 2 ** (failures - 1))
+        await self._update_source(source["id"], {
+            "last_run_at": now.isoformat(),
+            "consecutive_failures": failures,
+            "last_error": str(error)[:1000],
+            "next_run_at": (now + timedelta(seconds=jittered(backoff, self.jitter))).isoformat(),
+        })
+
+    async def _update_source(self, source_id: str, values: Dict[str, Any]) -> None:
+        try:
+            with external_call("supabase", "update_source"):
+                await asyncio.to_thread(
+                    lambda: self.supabase_client.table("crawl_sources").update(values).eq("id", source_id).execute()
+                )
+        except Exception as e:
+            print(f"⚠ Could not update crawl source {source_id}: {e}")
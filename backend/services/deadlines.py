@@ -0,0 +1,243 @@
+"""
+Deadlines, per-call timeouts and hedged requests for external dependencies.
+
+A request gets an overall latency budget (see the deadline middleware in
+main.py). The absolute deadline lives in a context variable, so it follows
+the request into tasks and worker threads. Every external call then runs
+under `timeout_for(dependency, share)`, which is the smaller of:
+- the dependency's own cap (`<DEPENDENCY>_TIMEOUT_S`, e.g. TAVILY_TIMEOUT_S)
+- `share` of the request budget still left
+
+A call that runs out raises DeadlineExceeded. When the budget is already
+spent, the call is not started at all.
+
+    with deadline(30):
+        vector = await blocking("embeddings", embeddings.embed_query, text, hedge=True)
+        answer = await bounded("gemini", lambda: llm.ainvoke(messages))
+
+Read-only calls with a long latency tail can be hedged (HEDGE_REQUESTS=1).
+If the first attempt has not answered by the dependency's recent p95
+latency, a duplicate is sent and whichever answers first wins.
+
+Optional parts of a response that were dropped are recorded with
+`note_degraded(...)`, and endpoints report them with `degraded()`.
+
+Blocking SDK calls run in worker threads, which cannot be interrupted: on
+timeout the caller moves on, and the thread finishes in the background.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+
+from observability.metrics import DEADLINE_EXCEEDED, DEGRADED_RESPONSES, HEDGED_REQUESTS
+
+# Per-dependency caps (seconds), overridable with <NAME>_TIMEOUT_S
+DEFAULT_TIMEOUTS: Dict[str, float] = {
+    "apify": 300.0,
+    "gemini": 90.0,
+    "embeddings": 15.0,
+    "supabase_rpc": 10.0,
+    "tavily": 20.0,
+}
+
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "0").lower() in ("1", "true", "yes")
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", 0.95))
+HEDGE_MIN_DELAY_S = float(os.getenv("HEDGE_MIN_DELAY_S", 0.05))
+HEDGE_DEFAULT_DELAY_S = 1.0     # until enough samples are observed
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+_deadline: ContextVar[Optional[float]] = ContextVar("postchat_deadline", default=None)
+_degraded: ContextVar[Optional[List[str]]] = ContextVar("postchat_degraded", default=None)
+_latencies: Dict[str, Deque[float]] = {}
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def call_timeout(dependency: str) -> float:
+    return float(os.getenv(f"{dependency.upper()}_TIMEOUT_S", DEFAULT_TIMEOUTS.get(dependency, 30.0)))
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Bound everything inside to `seconds` from now; never extends an enclosing deadline."""
+    if seconds is None:
+        yield
+        return
+    new = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(new if current is None else min(current, new))
+    degraded_token = _degraded.set([]) if _degraded.get() is None else None
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+        if degraded_token is not None:
+            _degraded.reset(degraded_token)
+
+
+@contextmanager
+def detached():
+    """Drop the current deadline, for shared work (e.g. a batch) that serves several requests."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def degraded_scope():
+    """Collect the degraded notes of the work inside in a list of its own (yielded), e.g. shared work."""
+    notes: List[str] = []
+    token = _degraded.set(notes)
+    try:
+        yield notes
+    finally:
+        _degraded.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current deadline, or None without one."""
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+def timeout_for(dependency: str, share: float = 1.0) -> float:
+    """Timeout for one call: the dependency's cap, or `share` of the remaining budget if smaller."""
+    cap = call_timeout(dependency)
+    left = remaining()
+    if left is None:
+        return cap
+    if left <= 0:
+        DEADLINE_EXCEEDED.labels(dependency).inc()
+        raise DeadlineExceeded(f"Request deadline exceeded before calling {dependency}")
+    return min(cap, left * share)
+
+
+def note_degraded(feature: str) -> None:
+    """Record that an optional part of the response was dropped."""
+    DEGRADED_RESPONSES.labels(feature).inc()
+    notes = _degraded.get()
+    if notes is not None and feature not in notes:
+        notes.append(feature)
+
+
+def degraded() -> List[str]:
+    return list(_degraded.get() or [])
+
+
+def merge_degraded(features: Iterable[str]) -> None:
+    """Add notes recorded by shared work to the current request (already counted there)."""
+    notes = _degraded.get()
+    if notes is None:
+        return
+    for feature in features:
+        if feature not in notes:
+            notes.append(feature)
+
+
+# ============================================================================
+# CALLS
+# ============================================================================
+
+async def bounded(dependency: str, make: Callable[[], Awaitable[Any]], share: float = 1.0) -> Any:
+    """Await `make()` under the dependency's timeout; the awaitable is cancelled on expiry."""
+    timeout = timeout_for(dependency, share)
+    try:
+        return await asyncio.wait_for(make(), timeout)
+    except asyncio.TimeoutError:
+        DEADLINE_EXCEEDED.labels(dependency).inc()
+        raise DeadlineExceeded(f"{dependency} call timed out after {timeout:.1f}s") from None
+
+
+async def blocking(
+    dependency: str,
+    fn: Callable[..., Any],
+    *args: Any,
+    share: float = 1.0,
+    hedge: bool = False,
+    executor: Optional[Executor] = None,
+) -> Any:
+    """
+    Run a blocking SDK call in a worker thread under a timeout; `hedge` only for read-only calls.
+    Pass a dedicated `executor` when threads of the default pool may be waiting on this call.
+    """
+    def make() -> Awaitable[Any]:
+        if executor is None:
+            return asyncio.to_thread(fn, *args)
+        return asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    
+    if hedge and HEDGE_REQUESTS:
+        return await hedged(dependency, make, share)
+    started = time.monotonic()
+    result = await bounded(dependency, make, share)
+    _observe(dependency, time.monotonic() - started)
+    return result
+
+
+def _observe(dependency: str, seconds: float) -> None:
+    _latencies.setdefault(dependency, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+def hedge_delay(dependency: str) -> float:
+    """How long to wait for the first attempt: the recent HEDGE_QUANTILE latency of the dependency."""
+    samples = _latencies.get(dependency)
+    if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY_S
+    ordered = sorted(samples)
+    return max(HEDGE_MIN_DELAY_S, ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_QUANTILE))])
+
+
+def _consume(task: asyncio.Future) -> None:
+    # Losing attempts may still fail later; don't let that surface as "exception never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+async def hedged(dependency: str, make: Callable[[], Awaitable[Any]], share: float = 1.0) -> Any:
+    """
+    Start `make()`; if it hasn't answered after `hedge_delay`, start a duplicate
+    and return whichever succeeds first. A fast failure is not hedged.
+    """
+    timeout = timeout_for(dependency, share)
+    started = time.monotonic()
+    end = started + timeout
+    primary = asyncio.ensure_future(make())
+    primary.add_done_callback(_consume)
+    pending = {primary}
+    error: Optional[BaseException] = None
+    try:
+        done, _ = await asyncio.wait(pending, timeout=min(hedge_delay(dependency), timeout))
+        if not done:
+            HEDGED_REQUESTS.labels(dependency, "sent").inc()
+            duplicate = asyncio.ensure_future(make())
+            duplicate.add_done_callback(_consume)
+            pending.add(duplicate)
+        while pending:
+            left = end - time.monotonic()
+            if left <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=left, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        HEDGED_REQUESTS.labels(dependency, "won").inc()
+                    _observe(dependency, time.monotonic() - started)
+                    return task.result()
+                error = task.exception()
+        if error is not None and not pending:
+            raise error
+        DEADLINE_EXCEEDED.labels(dependency).inc()
+        raise DeadlineExceeded(f"{dependency} call timed out after {timeout:.1f}s")
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,87 @@
+"""
+Batched embeddings shared by retrieval and ingestion.
+
+`BatchedEmbeddings` wraps a LangChain embeddings model. Texts that arrive
+from concurrent callers within `window_s` go to the model as one
+`embed_documents` call. These callers can be search queries, chat
+retrieval, the stage queries of a roadmap, or the chunks of an ingestion
+batch. Each caller gets back its own vectors, so the number of round trips
+(and the share of the embedding rate limit they use) grows with the number
+of batches, not the number of texts:
+
+    embeddings = BatchedEmbeddings(GoogleGenerativeAIEmbeddings(...), window_s=0.01)
+    embeddings.bind(asyncio.get_running_loop())    # once, at startup
+    vector = await embeddings.aembed_query("rust for backend developers")
+
+Sync calls, like `index_posts_chunks` embedding chunks in a worker
+thread, are handed to the same batcher on the event loop. Sync calls made
+on the loop thread itself, or before `bind`, go straight to the model.
+
+Queries and documents share a batch. That only gives the same vectors
+when the model embeds both the same way. main.py configures one
+`task_type` for both.
+
+Each batch runs outside any single request's deadline, under the
+embeddings timeout cap; callers bound their own wait with
+`services.deadlines.bounded`. Batches call the model on their own threads,
+because the sync callers waiting for them may hold every thread of the
+default pool.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from observability.metrics import external_call
+from services.batching import MicroBatcher
+from services.deadlines import blocking, detached
+
+
+class BatchedEmbeddings(Embeddings):
+    def __init__(self, base: Embeddings, window_s: float = 0.01, max_size: int = 100):
+        self.base = base
+        self.batcher = MicroBatcher("embeddings", self._embed_batch, window_s=window_s, max_size=max_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Own threads: sync callers blocked in the default pool must never starve their own batch
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="embed-batch")
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Event loop that sync callers in worker threads hand their texts to."""
+        self._loop = loop
+
+    async def _embed_batch(self, texts: List[str], key: Any) -> List[List[float]]:
+        # Identical texts (e.g. the same search from several users) are embedded once
+        unique = list(dict.fromkeys(texts))
+        with detached(), external_call("gemini", "embed_documents"):
+            vectors = await blocking(
+                "embeddings", self.base.embed_documents, unique, hedge=True, executor=self._executor
+            )
+        by_text = dict(zip(unique, vectors))
+        return [by_text[text] for text in texts]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        return list(await asyncio.gather(*(self.batcher.submit(text) for text in texts)))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        loop = self._loop
+        if loop is None or not loop.is_running() or _on_event_loop():
+            return self.base.embed_documents(texts)
+        return asyncio.run_coroutine_threadsafe(self.aembed_documents(texts), loop).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
@@ -0,0 +1,112 @@
+"""
+Paginated, projected reads of the `posts` table.
+
+The feed is ordered by (published_at DESC NULLS LAST, id DESC) and paged
+with an opaque keyset cursor, so every page costs one index range scan no
+matter how deep the user scrolls. Callers choose a projection:
+
+- "list"    lean card view: summary, text preview, cover image, metrics
+- "full"    every column, for the detail view / search results
+
+Filters on topics (GIN `@>`), category and sentiment are applied in SQL.
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+PROJECTIONS: Dict[str, str] = {
+    "list": ",".join([
+        "id", "original_post_id", "url", "published_at",
+        "author_name", "author_profile_pic",
+        "summary", "raw_text_preview", "cover_image",
+        "sentiment", "topics", "category", "engagement_metrics",
+    ]),
+    "full": "*",
+}
+
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    payload = json.dumps({"p": row.get("published_at"), "i": row.get("id")}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[str], str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return payload.get("p"), str(payload["i"])
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+
+
+def _quote(value: str) -> str:
+    """Double-quote a value for a PostgREST logic tree (timestamps contain ':' and '+')."""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def apply_filters(
+    query: Any,
+    topics: Optional[List[str]] = None,
+    category: Optional[str] = None,
+    sentiment: Optional[str] = None,
+) -> Any:
+    if topics:
+        query = query.contains("topics", topics)
+    if category:
+        query = query.eq("category", category)
+    if sentiment:
+        query = query.eq("sentiment", sentiment)
+    return query
+
+
+def fetch_feed_page(
+    client: Any,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    view: str = "list",
+    topics: Optional[List[str]] = None,
+    category: Optional[str] = None,
+    sentiment: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Return {"data": [...], "next_cursor": str | None} for one feed page.
+
+    Fetches limit + 1 rows to know whether another page exists without a
+    separate COUNT query.
+    """
+    if view not in PROJECTIONS:
+        raise ValueError(f"Unknown view '{view}' (expected one of {', '.join(PROJECTIONS)})")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    query = client.table("posts").select(PROJECTIONS[view])
+    query = apply_filters(query, topics, category, sentiment)
+
+    if cursor:
+        published_at, last_id = decode_cursor(cursor)
+        if published_at is None:
+            # Already inside the NULL published_at tail
+            query = query.is_("published_at", "null").lt("id", last_id)
+        else:
+            query = query.or_(
+                f"published_at.lt.{_quote(published_at)},"
+                f"and(published_at.eq.{_quote(published_at)},id.lt.{_quote(last_id)}),"
+                f"published_at.is.null"
+            )
+
+    rows = (
+        query.order("published_at", desc=True, nullsfirst=False)
+        .order("id", desc=True)
+        .limit(limit + 1)
+        .execute()
+        .data
+    )
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {"data": rows[:limit], "next_cursor": next_cursor}
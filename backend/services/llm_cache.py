@@ -0,0 +1,224 @@
+"""
+Persistent memoization of structured LLM calls.
+
+Many of our LLM calls are exact repeats (the same goal text in roadmap step 1,
+the same raw item on re-ingest, identical step-5 matcher payloads). This
+module stores the parsed structured output of such calls in SQLite, keyed by
+a hash of model, temperature, output schema and the rendered prompt.
+
+Opt-in via environment:
+    LLM_CACHE_ENABLED=1
+    LLM_CACHE_PATH=.llm_cache.sqlite3
+    LLM_CACHE_TTL_S=604800          (7 days)
+    LLM_CACHE_MAX_ENTRIES=10000     (least recently used entries are evicted)
+    LLM_CACHE_MAX_TEMPERATURE=0.3   (hotter call sites are never cached)
+
+Usage:
+    chain = structured_chain(prompt, llm, Step1Output, "roadmap.step1")
+    result = await chain.ainvoke({"user_text": goal})
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+from observability.metrics import LLM_CACHE_REQUESTS
+
+# Evict in batches instead of on every write
+EVICTION_CHECK_EVERY = 50
+
+
+class LLMResponseCache:
+    """SQLite-backed cache of parsed structured outputs with TTL and LRU bound."""
+
+    def __init__(
+        self,
+        path: str,
+        ttl_s: float = 7 * 24 * 3600,
+        max_entries: int = 10000,
+        max_temperature: float = 0.3,
+    ):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_temperature = max_temperature
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                call_site TEXT NOT NULL,
+                schema TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+
+    # --- keys & policy ---
+
+    def accepts(self, llm: Any) -> bool:
+        """Only (near-)deterministic models are worth memoizing."""
+        temperature = getattr(llm, "temperature", None)
+        return temperature is not None and temperature <= self.max_temperature
+
+    @staticmethod
+    def make_key(model: str, temperature: float, schema: Type[BaseModel], rendered_prompt: str) -> str:
+        payload = json.dumps(
+            {
+                "model": model,
+                "temperature": temperature,
+                "schema": schema.__name__,
+                "schema_json": schema.model_json_schema(),
+                "prompt": rendered_prompt,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- storage ---
+
+    def get(self, key: str, schema: Type[BaseModel]) -> Optional[BaseModel]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        try:
+            return schema.model_validate_json(row[0])
+        except Exception:
+            # Schema changed under a stale entry; treat as a miss
+            return None
+
+    def set(self, key: str, call_site: str, value: BaseModel) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache (key, call_site, schema, value, created_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, call_site, type(value).__name__, value.model_dump_json(), now, now + self.ttl_s, now),
+            )
+            self._writes += 1
+            if self._writes % EVICTION_CHECK_EVERY == 0:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+        self._conn.execute(
+            """
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
+
+    # --- stats ---
+
+    def record(self, call_site: str, result: str) -> None:
+        LLM_CACHE_REQUESTS.labels(call_site, result).inc()
+        with self._lock:
+            site = self._stats.setdefault(call_site, {"hit": 0, "miss": 0, "bypass": 0})
+            site[result] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rates per call site since process start, plus current size."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            sites = {}
+            for call_site, counts in self._stats.items():
+                lookups = counts["hit"] + counts["miss"]
+                sites[call_site] = dict(counts, hit_rate=round(counts["hit"] / lookups, 4) if lookups else 0.0)
+        return {"entries": entries, "max_entries": self.max_entries, "ttl_s": self.ttl_s, "call_sites": sites}
+
+
+class CachedStructuredChain:
+    """
+    Drop-in for `prompt | llm.with_structured_output(schema)` that consults
+    the cache before calling the model.
+    """
+
+    def __init__(self, prompt: Any, llm: Any, schema: Type[BaseModel], call_site: str, cache: LLMResponseCache):
+        self.prompt = prompt
+        self.llm = llm
+        self.schema = schema
+        self.call_site = call_site
+        self.cache = cache
+        self._structured = llm.with_structured_output(schema)
+
+    async def ainvoke(self, input_data: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> BaseModel:
+        prompt_value = await self.prompt.ainvoke(input_data)
+        if not self.cache.accepts(self.llm):
+            self.cache.record(self.call_site, "bypass")
+            return await self._structured.ainvoke(prompt_value, config=config)
+
+        key = self.cache.make_key(
+            str(getattr(self.llm, "model", "")),
+            float(self.llm.temperature),
+            self.schema,
+            prompt_value.to_string(),
+        )
+        cached = self.cache.get(key, self.schema)
+        if cached is not None:
+            self.cache.record(self.call_site, "hit")
+            return cached
+
+        self.cache.record(self.call_site, "miss")
+        result = await self._structured.ainvoke(prompt_value, config=config)
+        if isinstance(result, BaseModel):
+            self.cache.set(key, self.call_site, result)
+        return result
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_configured = False
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Return the process-wide cache, or None unless LLM_CACHE_ENABLED is set."""
+    global _cache, _cache_configured
+    if not _cache_configured:
+        _cache_configured = True
+        if os.getenv("LLM_CACHE_ENABLED", "").lower() in ("1", "true", "yes"):
+            try:
+                _cache = LLMResponseCache(
+                    path=os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3"),
+                    ttl_s=float(os.getenv("LLM_CACHE_TTL_S", 7 * 24 * 3600)),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000)),
+                    max_temperature=float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", 0.3)),
+                )
+                print(f"✓ LLM response cache enabled ({_cache.path})")
+            except Exception as e:
+                print(f"⚠ Warning: LLM response cache not initialized: {e}")
+    return _cache
+
+
+def structured_chain(prompt: Any, llm: Any, schema: Type[BaseModel], call_site: str):
+    """Build a structured-output chain, memoized when the cache is enabled."""
+    cache = get_llm_cache()
+    if cache is None:
+        return prompt | llm.with_structured_output(schema)
+    return CachedStructuredChain(prompt, llm, schema, call_site, cache)
@@ -0,0 +1,388 @@
+"""
+Background OCR / captioning of post images.
+
+`get_post_info` only enqueues a post id here; a small pool of asyncio
+workers then, off the request path:
+1. Loads the post's `media` from Supabase
+2. Downloads photos (Facebook CDN only, size-capped) with a bounded-concurrency fetcher
+3. Dedupes images by SHA-256 of their bytes, so reposted images are
+   processed once (results persist in the `media_assets` table)
+4. Runs OCR / captioning through a pluggable backend
+5. Writes `ocr_text` / `description` back to `posts.media` and re-embeds
+   only that post's chunks
+
+Job status ("queued", "running", "updated", "unchanged", "failed") is kept in
+the shared state backend, so any worker process can report it and a post
+queued by one worker is not queued again by another.
+
+Backends (MEDIA_ENRICHMENT_BACKEND):
+- "gemini"     batched multimodal call, several images per request (default)
+- "tesseract"  local OCR, requires the optional `pytesseract` + `Pillow` packages
+- "none"       disable enrichment
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel, Field
+
+from observability.metrics import MEDIA_IMAGES, MEDIA_JOBS, MEDIA_QUEUE_DEPTH, external_call, llm_config, stage_timer
+from services.chunking import build_post_chunks, index_post_chunks, media_text
+from services.search_cache import bump_corpus_version
+from services.shared_state import get_shared_state
+
+MAX_IMAGE_BYTES = 8 * 1024 * 1024
+MEDIA_HOST_SUFFIX = ".fbcdn.net"   # Facebook's CDN, incl. the scontent* image hosts
+MAX_REDIRECTS = 3
+KNOWN_HASHES_LIMIT = 5000
+ACTIVE_JOB_TTL_S = 3600        # a queued/running status older than this is considered lost
+FINISHED_JOB_TTL_S = 24 * 3600
+
+
+def is_media_url_allowed(url: Optional[str]) -> bool:
+    """Only https URLs on Facebook's CDN are ever fetched by the server."""
+    try:
+        parts = urlsplit(url or "")
+        host = (parts.hostname or "").lower()
+    except ValueError:
+        return False
+    return parts.scheme == "https" and host.endswith(MEDIA_HOST_SUFFIX)
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class MediaAnnotation(BaseModel):
+    """OCR / caption result for one image."""
+    index: int = Field(description="Position of the image in the request (0-based)")
+    ocr_text: Optional[str] = Field(None, description="All legible text in the image, verbatim")
+    description: Optional[str] = Field(None, description="One-sentence description of the image content")
+
+
+class MediaAnnotations(BaseModel):
+    annotations: List[MediaAnnotation]
+
+
+class GeminiVisionBackend:
+    """Annotate up to `batch_size` images per multimodal Gemini call."""
+
+    def __init__(self, llm: Any, batch_size: int = 4):
+        self.llm = llm
+        self.batch_size = batch_size
+
+    async def annotate(self, images: List[Tuple[bytes, str]]) -> List[MediaAnnotation]:
+        results: List[MediaAnnotation] = []
+        for offset in range(0, len(images), self.batch_size):
+            batch = images[offset:offset + self.batch_size]
+            content: List[Dict[str, Any]] = [{
+                "type": "text",
+                "text": (
+                    f"You will see {len(batch)} images from a Facebook post, in order. "
+                    "For each image return its index (0-based), the verbatim text visible in it "
+                    "(ocr_text, null if none) and a one-sentence description."
+                ),
+            }]
+            for data, mime in batch:
+                encoded = base64.b64encode(data).decode("ascii")
+                content.append({"type": "image_url", "image_url": {"url": f"data:{mime};base64,{encoded}"}})
+
+            structured = self.llm.with_structured_output(MediaAnnotations)
+            with external_call("gemini", "media_annotate"):
+                response = await structured.ainvoke([HumanMessage(content=content)], config=llm_config("media_annotate"))
+
+            by_index = {a.index: a for a in response.annotations}
+            for i in range(len(batch)):
+                found = by_index.get(i) or MediaAnnotation(index=i)
+                results.append(MediaAnnotation(index=offset + i, ocr_text=found.ocr_text, description=found.description))
+        return results
+
+
+class TesseractBackend:
+    """Local OCR only (no captions); runs in a thread to keep the loop free."""
+
+    def __init__(self):
+        import pytesseract  # noqa: F401  (fail fast if the optional deps are missing)
+        from PIL import Image  # noqa: F401
+
+    @staticmethod
+    def _ocr(data: bytes) -> str:
+        import pytesseract
+        from PIL import Image
+        return pytesseract.image_to_string(Image.open(io.BytesIO(data))).strip()
+
+    async def annotate(self, images: List[Tuple[bytes, str]]) -> List[MediaAnnotation]:
+        texts = await asyncio.gather(*(asyncio.to_thread(self._ocr, data) for data, _ in images))
+        return [MediaAnnotation(index=i, ocr_text=text or None) for i, text in enumerate(texts)]
+
+
+def create_backend(name: str, llm_factory: Any = None) -> Optional[Any]:
+    name = (name or "").lower()
+    if name in ("", "none", "off"):
+        return None
+    if name == "tesseract":
+        return TesseractBackend()
+    if name == "gemini":
+        if llm_factory is None:
+            raise ValueError("gemini media backend needs an LLM")
+        return GeminiVisionBackend(llm_factory(), batch_size=int(os.getenv("MEDIA_BATCH_SIZE", 4)))
+    raise ValueError(f"Unknown media enrichment backend: {name}")
+
+
+# ============================================================================
+# WORKER POOL
+# ============================================================================
+
+class MediaEnrichmentWorker:
+    """Bounded queue of post ids processed by a fixed number of asyncio workers."""
+
+    def __init__(
+        self,
+        supabase_client: Any,
+        vector_store: Any,
+        backend: Any,
+        workers: int = 2,
+        fetch_concurrency: int = 4,
+        queue_size: int = 1000,
+        state: Any = None,
+    ):
+        self.supabase_client = supabase_client
+        self.vector_store = vector_store
+        self.backend = backend
+        self.workers = workers
+        self._fetch_slots = asyncio.Semaphore(fetch_concurrency)
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self._pending: set = set()
+        self._known: "OrderedDict[str, MediaAnnotation]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+        self._http: Optional[httpx.AsyncClient] = None
+        self.state = state or get_shared_state()
+
+    def start(self) -> None:
+        # Redirects are followed by hand, so every hop is checked against the CDN allowlist
+        self._http = httpx.AsyncClient(timeout=20.0, follow_redirects=False)
+        self._tasks = [asyncio.create_task(self._run(), name=f"media-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._http is not None:
+            await self._http.aclose()
+
+    def job_status(self, post_id: str) -> Optional[Dict[str, Any]]:
+        return self.state.get(f"media_job:{post_id}")
+
+    def _set_status(self, post_id: str, status: str) -> None:
+        ttl_s = ACTIVE_JOB_TTL_S if status in ("queued", "running") else FINISHED_JOB_TTL_S
+        self.state.set(f"media_job:{post_id}", {"status": status, "updated_at": time.time()}, ttl_s=ttl_s)
+
+    def enqueue(self, post_id: str) -> bool:
+        """Schedule a post for enrichment; never blocks the caller."""
+        if post_id in self._pending:
+            return True
+        current = self.job_status(post_id)
+        if current and current["status"] in ("queued", "running"):
+            return True  # owned by another worker process
+        try:
+            self._queue.put_nowait(post_id)
+        except asyncio.QueueFull:
+            print(f"⚠ Media enrichment queue full, skipping {post_id}")
+            MEDIA_JOBS.labels("dropped").inc()
+            return False
+        self._pending.add(post_id)
+        self._set_status(post_id, "queued")
+        MEDIA_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            post_id = await self._queue.get()
+            MEDIA_QUEUE_DEPTH.set(self._queue.qsize())
+            status = "failed"
+            try:
+                self._set_status(post_id, "running")
+                with stage_timer("media.enrich_post"):
+                    updated = await self.enrich_post(post_id)
+                status = "updated" if updated else "unchanged"
+            except Exception as e:
+                print(f"⚠ Media enrichment failed for {post_id}: {e}")
+            finally:
+                MEDIA_JOBS.labels(status).inc()
+                self._set_status(post_id, status)
+                self._pending.discard(post_id)
+                self._queue.task_done()
+
+    # --- pipeline ---
+
+    async def enrich_post(self, post_id: str) -> bool:
+        """Annotate a post's images; returns True if the post was updated."""
+        with external_call("supabase", "select_post_media"):
+            response = await asyncio.to_thread(
+                lambda: self.supabase_client.table("posts")
+                .select("original_post_id,url,author_name,published_at,topics,summary,raw_text,media")
+                .eq("original_post_id", post_id).limit(1).execute()
+            )
+        if not response.data:
+            return False
+        post = response.data[0]
+        media: List[Dict[str, Any]] = list(post.get("media") or [])
+
+        todo = [
+            i for i, item in enumerate(media)
+            if item.get("type") == "photo" and item.get("url")
+            and not (item.get("ocr_text") or item.get("description"))
+        ]
+        if not todo:
+            return False
+
+        downloads = await asyncio.gather(*(self._download(media[i]["url"]) for i in todo))
+
+        # Dedupe by content hash: known images (in memory or in media_assets) skip the backend
+        annotations: Dict[int, MediaAnnotation] = {}
+        fresh: Dict[str, Tuple[bytes, str]] = {}
+        hashes: Dict[int, str] = {}
+        for i, download in zip(todo, downloads):
+            if download is None:
+                MEDIA_IMAGES.labels("fetch_failed").inc()
+                continue
+            digest = hashlib.sha256(download[0]).hexdigest()
+            hashes[i] = digest
+            if digest not in fresh:
+                fresh[digest] = download
+
+        known = await self._lookup_hashes(list(fresh.keys()))
+        to_annotate = [(digest, data) for digest, data in fresh.items() if digest not in known]
+        MEDIA_IMAGES.labels("deduplicated").inc(len(hashes) - len(to_annotate))
+
+        if to_annotate:
+            with stage_timer("media.annotate"):
+                results = await self.backend.annotate([data for _, data in to_annotate])
+            for (digest, _), result in zip(to_annotate, results):
+                known[digest] = result
+            MEDIA_IMAGES.labels("annotated").inc(len(to_annotate))
+            await self._store_hashes({digest: known[digest] for digest, _ in to_annotate})
+
+        for i, digest in hashes.items():
+            if digest in known:
+                annotations[i] = known[digest]
+        if not annotations:
+            return False
+
+        for i, annotation in annotations.items():
+            media[i] = {
+                **media[i],
+                "content_hash": hashes[i],
+                "ocr_text": annotation.ocr_text,
+                "description": annotation.description,
+            }
+
+        with external_call("supabase", "update_post_media"):
+            await asyncio.to_thread(
+                lambda: self.supabase_client.table("posts").update({"media": media})
+                .eq("original_post_id", post_id).execute()
+            )
+
+        # Re-embed just this post so image text becomes searchable
+        if self.vector_store is not None:
+            docs = build_post_chunks(
+                post_id,
+                post.get("summary"),
+                post.get("raw_text"),
+                metadata={
+                    "author": post.get("author_name"),
+                    "published_at": post.get("published_at"),
+                    "url": post.get("url"),
+                    "topics": post.get("topics") or [],
+                },
+                media_text=media_text(media),
+            )
+            with stage_timer("media.reembed"), external_call("supabase", "add_documents"):
+                await asyncio.to_thread(index_post_chunks, self.supabase_client, self.vector_store, post_id, docs)
+        bump_corpus_version()
+
+        print(f"✓ Enriched {len(annotations)} image(s) for post {post_id}")
+        return True
+
+    async def _download(self, url: str) -> Optional[Tuple[bytes, str]]:
+        async with self._fetch_slots:
+            try:
+                with external_call("media_cdn", "download"):
+                    return await self._fetch_image(url)
+            except Exception as e:
+                print(f"⚠ Image download failed for {url[:80]}: {e}")
+                return None
+
+    async def _fetch_image(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """Stream one image, giving up as soon as it is over MAX_IMAGE_BYTES."""
+        for _ in range(MAX_REDIRECTS + 1):
+            if not is_media_url_allowed(url):
+                print(f"⚠ Skipping image outside the Facebook CDN: {url[:80]}")
+                return None
+            async with self._http.stream("GET", url) as response:
+                if response.is_redirect:
+                    url = str(response.url.join(response.headers["location"]))
+                    continue
+                response.raise_for_status()
+                mime = response.headers.get("content-type", "image/jpeg").split(";")[0]
+                length = response.headers.get("content-length", "")
+                if not mime.startswith("image/") or (length.isdigit() and int(length) > MAX_IMAGE_BYTES):
+                    return None
+                chunks: List[bytes] = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > MAX_IMAGE_BYTES:
+                        return None
+                    chunks.append(chunk)
+                return b"".join(chunks), mime
+        print(f"⚠ Too many redirects for {url[:80]}")
+        return None
+
+    async def _lookup_hashes(self, digests: List[str]) -> Dict[str, MediaAnnotation]:
+        found = {d: self._known[d] for d in digests if d in self._known}
+        missing = [d for d in digests if d not in found]
+        if missing:
+            try:
+                response = await asyncio.to_thread(
+                    lambda: self.supabase_client.table("media_assets")
+                    .select("content_hash,ocr_text,description").in_("content_hash", missing).execute()
+                )
+                for row in response.data:
+                    found[row["content_hash"]] = MediaAnnotation(
+                        index=0, ocr_text=row.get("ocr_text"), description=row.get("description")
+                    )
+            except Exception as e:
+                print(f"⚠ media_assets lookup failed: {e}")
+        for digest, annotation in found.items():
+            self._remember(digest, annotation)
+        return found
+
+    async def _store_hashes(self, annotations: Dict[str, MediaAnnotation]) -> None:
+        for digest, annotation in annotations.items():
+            self._remember(digest, annotation)
+        rows = [
+            {"content_hash": digest, "ocr_text": a.ocr_text, "description": a.description}
+            for digest, a in annotations.items()
+        ]
+        try:
+            await asyncio.to_thread(
+                lambda: self.supabase_client.table("media_assets").upsert(rows, on_conflict="content_hash").execute()
+            )
+        except Exception as e:
+            print(f"⚠ media_assets save failed: {e}")
+
+    def _remember(self, digest: str, annotation: MediaAnnotation) -> None:
+        self._known[digest] = annotation
+        self._known.move_to_end(digest)
+        while len(self._known) > KNOWN_HASHES_LIMIT:
+            self._known.popitem(last=False)
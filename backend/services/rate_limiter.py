@@ -0,0 +1,98 @@
+"""
+Token-bucket rate limiting for external APIs.
+
+Gemini's quotas are per minute, so callers that fan out (bulk re-embedding,
+batch ingestion) acquire a token before each request instead of relying on
+RESOURCE_EXHAUSTED retries.
+
+Usage:
+    limiter = get_rate_limiter("gemini_embeddings")
+    limiter.wait()          # blocking code
+    await limiter.acquire() # async code
+
+With a shared STATE_BACKEND (sqlite / redis) the bucket lives in shared
+state, so the quota holds across all worker processes.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from services.shared_state import get_shared_state
+
+
+class RateLimiter:
+    """Classic token bucket: `rate` tokens per second, bursting up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: float = 1.0) -> "RateLimiter":
+        return cls(rate=requests_per_minute / 60.0, capacity=max(1.0, burst))
+
+    def _reserve(self, tokens: float) -> float:
+        """Take `tokens` (possibly going negative) and return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def wait(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available; returns seconds waited."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class SharedRateLimiter(RateLimiter):
+    """Token bucket stored in the shared state backend instead of process memory."""
+
+    def __init__(self, name: str, rate: float, capacity: float, state: Any):
+        super().__init__(rate, capacity)
+        self.name = name
+        self.state = state
+
+    def _reserve(self, tokens: float) -> float:
+        return self.state.take_tokens(self.name, self.rate, self.capacity, tokens)
+
+
+# Requests per minute per external API, overridable via env (e.g. GEMINI_EMBEDDINGS_RPM=300)
+DEFAULT_RPM = {
+    "gemini_embeddings": 100,
+    "gemini_chat": 15,
+}
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    """Process-wide limiter for `name`, sized from `<NAME>_RPM` or DEFAULT_RPM."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            rpm = float(os.getenv(f"{name.upper()}_RPM", DEFAULT_RPM.get(name, 60)))
+            limiter = RateLimiter.per_minute(rpm, burst=max(1.0, rpm / 10))
+            state = get_shared_state()
+            if state.shared:
+                limiter = SharedRateLimiter(name, limiter.rate, limiter.capacity, state)
+            _limiters[name] = limiter
+        return limiter
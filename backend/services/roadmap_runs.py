@@ -0,0 +1,138 @@
+"""
+Checkpoints for roadmap pipeline runs.
+
+Every `create_roadmap` call is a run in the `roadmap_runs` table. After each
+step its output is written under the run id together with its status and
+timings:
+
+    steps = {
+        "step1": {"status": "completed", "started_at": ..., "finished_at": ...,
+                  "duration_s": 2.1, "output": {...Step1Output...}},
+        "step5": {"status": "failed", "error": "RESOURCE_EXHAUSTED ...", ...},
+    }
+
+A failed (or interrupted) run resumes from its first step without a
+completed checkpoint, and any step can be regenerated, which discards the
+checkpoints of the steps that depend on it. Only one process at a time may
+execute a given run (a lease in the shared state backend).
+
+Without a Supabase client, runs are kept in process memory.
+"""
+
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from observability.metrics import external_call
+from services.shared_state import get_shared_state
+
+STEP_NAMES: List[str] = ["step1", "step2", "step3", "step4", "step5", "step6"]
+RUN_LEASE_TTL_S = 1800
+
+
+class RunNotFound(KeyError):
+    pass
+
+
+class RunInProgress(RuntimeError):
+    pass
+
+
+class RunFailed(RuntimeError):
+    """A step raised; the run keeps its completed checkpoints and can be resumed by id."""
+
+    def __init__(self, run_id: str, step: Optional[str], error: Exception):
+        super().__init__(str(error))
+        self.run_id = run_id
+        self.step = step
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class RoadmapRunStore:
+    """
+    Load / save run rows; one write per step transition.
+
+    Every method blocks (Supabase or the shared state backend); async code
+    calls them through `asyncio.to_thread`.
+    """
+
+    def __init__(self, supabase_client: Any = None, state: Any = None):
+        self.supabase_client = supabase_client
+        self.state = state or get_shared_state()
+        self._memory: Dict[str, Dict[str, Any]] = {}
+
+    def create(self, goal: str) -> Dict[str, Any]:
+        run = {
+            "id": str(uuid.uuid4()),
+            "goal": goal,
+            "status": "pending",
+            "steps": {},
+            "error": None,
+            "learning_path_id": None,
+            "created_at": utc_now(),
+            "updated_at": utc_now(),
+        }
+        if self.supabase_client is None:
+            self._memory[run["id"]] = run
+            return dict(run)
+        with external_call("supabase", "insert_roadmap_run"):
+            response = self.supabase_client.table("roadmap_runs").insert(run).execute()
+        return response.data[0] if response.data else run
+
+    def get(self, run_id: str) -> Dict[str, Any]:
+        if self.supabase_client is None:
+            if run_id not in self._memory:
+                raise RunNotFound(run_id)
+            return dict(self._memory[run_id], steps=dict(self._memory[run_id]["steps"]))
+        with external_call("supabase", "select_roadmap_run"):
+            response = self.supabase_client.table("roadmap_runs").select("*").eq("id", run_id).limit(1).execute()
+        if not response.data:
+            raise RunNotFound(run_id)
+        run = response.data[0]
+        run["steps"] = run.get("steps") or {}
+        return run
+
+    def save(self, run: Dict[str, Any], **changes: Any) -> None:
+        run.update(changes, updated_at=utc_now())
+        values = {key: run[key] for key in ("status", "steps", "error", "learning_path_id", "updated_at")}
+        if self.supabase_client is None:
+            self._memory[run["id"]] = dict(run, steps=dict(run["steps"]))
+            return
+        try:
+            with external_call("supabase", "update_roadmap_run"):
+                self.supabase_client.table("roadmap_runs").update(values).eq("id", run["id"]).execute()
+        except Exception as e:
+            # Losing a checkpoint only costs a recompute on resume; never fail the pipeline for it
+            print(f"   ⚠ Failed to checkpoint roadmap run {run['id']}: {e}")
+
+    # --- leases ---
+
+    def acquire(self, run_id: str) -> None:
+        if not self.state.set_if_absent(f"roadmap_run_lease:{run_id}", {"started_at": utc_now()}, ttl_s=RUN_LEASE_TTL_S):
+            raise RunInProgress(f"Roadmap run {run_id} is already executing")
+
+    def release(self, run_id: str) -> None:
+        self.state.delete(f"roadmap_run_lease:{run_id}")
+
+
+def step_view(run: Dict[str, Any], include_outputs: bool = False) -> Dict[str, Any]:
+    """Run state for the API: per-step status and timings, outputs only on request."""
+    steps = []
+    for name in STEP_NAMES:
+        step = dict(run["steps"].get(name) or {"status": "pending"})
+        if not include_outputs:
+            step.pop("output", None)
+        steps.append({"step": name, **step})
+    return {
+        "id": run["id"],
+        "goal": run["goal"],
+        "status": run["status"],
+        "error": run.get("error"),
+        "created_at": run.get("created_at"),
+        "updated_at": run.get("updated_at"),
+        "total_duration_s": round(sum(s.get("duration_s") or 0 for s in steps), 3),
+        "steps": steps,
+    }
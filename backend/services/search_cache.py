@@ -0,0 +1,115 @@
+"""
+In-process cache of /search_posts_v2 results.
+
+Entries are keyed by (corpus version, normalized query, mode, limit,
+filters, view) in a bounded LRU with a TTL. The corpus version is a counter
+in the shared state backend, bumped by every write that can change search
+results (post upserts, chunk re-indexing, engagement refreshes). A bump
+makes every older entry unreachable at once, across all worker processes;
+the stale entries then age out of the LRU.
+
+Configuration:
+    SEARCH_CACHE_MAX_ENTRIES=512    (0 disables the cache)
+    SEARCH_CACHE_TTL_S=300
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from observability.metrics import SEARCH_CACHE_REQUESTS
+from services.shared_state import get_shared_state
+from services.single_flight import normalize_text
+
+CORPUS_VERSION_KEY = "corpus_version"
+
+
+def corpus_version() -> int:
+    """Current corpus version (0 until the first bump); a plain read, never a write."""
+    return int(get_shared_state().get(CORPUS_VERSION_KEY) or 0)
+
+
+async def corpus_version_async() -> int:
+    """`corpus_version()` for the event loop: a shared backend (SQLite, Redis) is read in a worker thread."""
+    if not get_shared_state().shared:
+        return corpus_version()
+    return await asyncio.to_thread(corpus_version)
+
+
+def bump_corpus_version() -> int:
+    """Call after any write to `posts` or `documents` that can change search results."""
+    return get_shared_state().incr(CORPUS_VERSION_KEY)
+
+
+class SearchResultCache:
+    """Bounded LRU + TTL of search responses, invalidated by the corpus version."""
+
+    def __init__(self, max_entries: int = 512, ttl_s: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[int, Hashable], Tuple[float, Any]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(
+        query: str,
+        advanced_mode: bool,
+        limit: int,
+        topics: Any,
+        category: Optional[str],
+        sentiment: Optional[str],
+        view: str,
+    ) -> Hashable:
+        return (
+            normalize_text(query),
+            "semantic" if advanced_mode else "keyword",
+            limit,
+            tuple(sorted(normalize_text(t) for t in topics or [])),
+            normalize_text(category) or None,
+            normalize_text(sentiment) or None,
+            view,
+        )
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        mode = key[1]
+        with self._lock:
+            entry = self._entries.get((version, key))
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[(version, key)]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end((version, key))
+        SEARCH_CACHE_REQUESTS.labels(mode, "miss" if entry is None else "hit").inc()
+        return None if entry is None else entry[1]
+
+    def set(self, key: Hashable, version: int, value: Any) -> None:
+        """Store under the version read *before* the search ran, so a write during it is never masked."""
+        with self._lock:
+            self._entries[(version, key)] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "ttl_s": self.ttl_s}
+
+
+_cache: Optional[SearchResultCache] = None
+
+
+def get_search_cache() -> SearchResultCache:
+    global _cache
+    if _cache is None:
+        _cache = SearchResultCache(
+            max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 512)),
+            ttl_s=float(os.getenv("SEARCH_CACHE_TTL_S", 300)),
+        )
+    return _cache
@@ -0,0 +1,164 @@
+"""
+Fast JSON responses and response compression.
+
+- `FastJSONResponse` renders with orjson instead of the stdlib encoder and is
+  the app's default response class.
+- `json_response()` returns a FastJSONResponse directly, skipping FastAPI's
+  recursive `jsonable_encoder` pass; use it for large payloads (feeds,
+  search results, roadmaps). Pydantic models inside the payload are dumped
+  with `model_dump(mode="json")`.
+- `CompressionMiddleware` gzip- or brotli-encodes JSON/text responses above a
+  size threshold, picking the best encoding the client accepts. Brotli needs
+  the optional `brotli` package; without it only gzip is offered.
+"""
+
+import gzip
+from typing import Any, Optional, Tuple
+
+import orjson
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)  # same fallback as json.dumps(..., default=str)
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, status_code: int = 200) -> FastJSONResponse:
+    """Serialize `content` straight to bytes, bypassing jsonable_encoder."""
+    return FastJSONResponse(content, status_code=status_code)
+
+
+# ============================================================================
+# COMPRESSION
+# ============================================================================
+
+def _accepted_encodings(header: str) -> Tuple[set, set]:
+    """(accepted, explicitly refused) content-codings of an Accept-Encoding header."""
+    accepted, refused = set(), set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        params = params.replace(" ", "")
+        if not token:
+            continue
+        if params.startswith("q=") and not _quality(params[2:].split(";")[0]) > 0:
+            refused.add(token)  # q=0 or a malformed q: not acceptable
+        else:
+            accepted.add(token)
+    return accepted, refused
+
+
+def _quality(value: str) -> float:
+    try:
+        return float(value or 0)
+    except ValueError:
+        return 0.0
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted, refused = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    # "*" covers codings not listed otherwise, never one refused with q=0
+    if "gzip" in accepted or ("*" in accepted and "gzip" not in refused):
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level)
+
+
+class CompressionMiddleware:
+    """
+    Compress complete responses of at least `minimum_size` bytes.
+
+    Bodies are buffered until the last chunk, which suits this API's bounded
+    JSON responses; event streams and already-encoded responses pass through.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        chunks = []
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or content_type.startswith("text/event-stream")
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start["headers"])
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+            headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
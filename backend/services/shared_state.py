@@ -0,0 +1,247 @@
+"""
+Cross-process state for multi-worker deployments.
+
+Under gunicorn / `uvicorn --workers N` every worker is a separate process, so
+module-level dicts, token buckets and job tables silently diverge. Anything
+that must agree across workers goes through the backend returned by
+`get_shared_state()`:
+
+- key/value with TTL      caches, job status (`get` / `set` / `delete`)
+- leases                  `set_if_absent` (e.g. one crawl per source at a time)
+- counters                `incr`
+- token buckets           `take_tokens` (used by services.rate_limiter)
+
+Backends (STATE_BACKEND):
+- "memory"   process-local, the default for a single worker
+- "sqlite"   one WAL-mode file shared by all workers on a host (STATE_PATH)
+- "redis"    any Redis-compatible server (STATE_REDIS_URL), requires the
+             optional `redis` package; use it when workers span hosts
+
+Values must be JSON-serializable.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class MemoryStateBackend:
+    """Process-local state; only correct with a single worker."""
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._values.get(key)
+            if item is None:
+                return None
+            if item[1] is not None and item[1] < time.time():
+                del self._values[key]
+                return None
+            return item[0]
+
+    def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl_s if ttl_s else None)
+
+    def set_if_absent(self, key: str, value: Any, ttl_s: Optional[float] = None) -> bool:
+        with self._lock:
+            item = self._values.get(key)
+            if item is not None and (item[1] is None or item[1] >= time.time()):
+                return False
+            self._values[key] = (value, time.time() + ttl_s if ttl_s else None)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._values.get(key, (0, None))[0]) + amount
+            self._values[key] = (value, None)
+            return value
+
+    def take_tokens(self, bucket: str, rate: float, capacity: float, tokens: float = 1.0) -> float:
+        with self._lock:
+            now = time.time()
+            available, updated = self._buckets.get(bucket, (capacity, now))
+            available = min(capacity, available + (now - updated) * rate) - tokens
+            self._buckets[bucket] = (available, now)
+        return 0.0 if available >= 0 else -available / rate
+
+
+class SQLiteStateBackend:
+    """State in a WAL-mode SQLite file; safe for concurrent worker processes on one host."""
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] < time.time():
+                self._conn.execute("DELETE FROM kv WHERE key = ? AND expires_at = ?", (key, row[1]))
+                return None
+        # Counters written by incr are stored as plain integers
+        return row[0] if isinstance(row[0], int) else json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl_s if ttl_s else None),
+            )
+
+    def set_if_absent(self, key: str, value: Any, ttl_s: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            # Overwrites only an expired entry; rowcount is 0 when a live one exists
+            cursor = self._conn.execute(
+                """
+                INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+                WHERE kv.expires_at IS NOT NULL AND kv.expires_at < ?
+                """,
+                (key, json.dumps(value), now + ttl_s if ttl_s else None, now),
+            )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                INSERT INTO kv (key, value, expires_at) VALUES (?, ?, NULL)
+                ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + excluded.value
+                RETURNING value
+                """,
+                (key, amount),
+            ).fetchone()
+        return int(row[0])
+
+    def take_tokens(self, bucket: str, rate: float, capacity: float, tokens: float = 1.0) -> float:
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (bucket,)).fetchone()
+                available, updated = row if row else (capacity, now)
+                available = min(capacity, available + (now - updated) * rate) - tokens
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    (bucket, available, now),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return 0.0 if available >= 0 else -available / rate
+
+
+# Token bucket evaluated atomically on the server, using the server clock
+_TAKE_TOKENS_LUA = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate, capacity, take = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated'))
+if tokens == nil then tokens = capacity; updated = now end
+tokens = math.min(capacity, tokens + (now - updated) * rate) - take
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+if tokens >= 0 then return '0' end
+return tostring(-tokens / rate)
+"""
+
+
+class RedisStateBackend:
+    """State in a Redis-compatible server; works across hosts."""
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "postchat:"):
+        import redis  # optional dependency
+
+        self.url = url
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._take_tokens = self._client.register_script(_TAKE_TOKENS_LUA)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        self._client.set(self.prefix + key, json.dumps(value), px=int(ttl_s * 1000) if ttl_s else None)
+
+    def set_if_absent(self, key: str, value: Any, ttl_s: Optional[float] = None) -> bool:
+        return bool(self._client.set(self.prefix + key, json.dumps(value), nx=True, px=int(ttl_s * 1000) if ttl_s else None))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self.prefix + key)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        return int(self._client.incrby(self.prefix + key, amount))
+
+    def take_tokens(self, bucket: str, rate: float, capacity: float, tokens: float = 1.0) -> float:
+        idle_ttl = int(math.ceil(capacity / rate)) + 60
+        delay = self._take_tokens(keys=[f"{self.prefix}bucket:{bucket}"], args=[rate, capacity, tokens, idle_ttl])
+        return float(delay)
+
+
+def create_state_backend(name: str) -> Any:
+    name = (name or "memory").lower()
+    if name == "memory":
+        return MemoryStateBackend()
+    if name == "sqlite":
+        return SQLiteStateBackend(os.getenv("STATE_PATH", ".postchat_state.sqlite3"))
+    if name == "redis":
+        return RedisStateBackend(os.getenv("STATE_REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown state backend: {name}")
+
+
+_state: Optional[Any] = None
+_state_pid: Optional[int] = None
+_state_lock = threading.Lock()
+
+
+def get_shared_state() -> Any:
+    """Process-wide state backend from STATE_BACKEND; re-created after fork."""
+    global _state, _state_pid
+    with _state_lock:
+        if _state is None or _state_pid != os.getpid():
+            try:
+                _state = create_state_backend(os.getenv("STATE_BACKEND", "memory"))
+            except Exception as e:
+                print(f"⚠ Warning: shared state backend unavailable, using process memory: {e}")
+                _state = MemoryStateBackend()
+            _state_pid = os.getpid()
+        return _state
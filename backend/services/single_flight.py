@@ -0,0 +1,80 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+The first caller for a key (the leader) starts the work as its own task;
+callers that arrive with the same key while it is still running await that
+same task instead of repeating it:
+
+    roadmap_flight = SingleFlight("roadmap")
+    roadmap = await roadmap_flight.do(normalize_text(goal), lambda: agent.create_roadmap(goal))
+
+- Every caller gets the leader's result, or the same exception re-raised.
+- The shared task is shielded: a caller that disconnects / is cancelled stops
+  waiting, but the work carries on for the others (and its side effects,
+  e.g. a saved post or roadmap, still land).
+- The key is released as soon as the task finishes, so nothing is cached
+  past the flight itself; a later identical request runs again.
+- The shared task runs detached from the leader's request deadline, with its
+  own list of degraded notes. Each caller stops waiting once its own deadline
+  (or `share` of what is left of it) runs out, and gets the flight's degraded
+  notes merged into its own.
+
+Coalescing is per process; across workers the same request may still run
+once per worker.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+from observability.metrics import SINGLE_FLIGHT_CALLS
+from services.deadlines import DeadlineExceeded, degraded_scope, detached, merge_degraded, remaining
+
+
+def normalize_text(text: str) -> str:
+    """Key form for free text (goals, queries): case-folded, whitespace collapsed."""
+    return " ".join((text or "").split()).casefold()
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], share: float = 1.0) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            SINGLE_FLIGHT_CALLS.labels(self.name, "leader").inc()
+            task = asyncio.create_task(self._run(fn), name=f"{self.name}-flight")
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._release(key, t))
+        else:
+            SINGLE_FLIGHT_CALLS.labels(self.name, "coalesced").inc()
+        left = remaining()
+        try:
+            if left is None:
+                result, notes = await asyncio.shield(task)
+            else:
+                result, notes = await asyncio.wait_for(asyncio.shield(task), max(left * share, 0))
+        except asyncio.TimeoutError:
+            if task.done():
+                raise  # the flight itself timed out
+            raise DeadlineExceeded(f"Request deadline exceeded waiting for the {self.name} flight") from None
+        merge_degraded(notes)
+        return result
+
+    @staticmethod
+    async def _run(fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, List[str]]:
+        # Not bound by the leader's deadline: callers that join later may have more time
+        with detached(), degraded_scope() as notes:
+            result = await fn()
+        return result, notes
+
+    def _release(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved in case every caller was cancelled before it landed
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+
+from services import media_enrichment
+from services.media_enrichment import MediaEnrichmentWorker, is_media_url_allowed
+
+CDN = "https://scontent-lax3-1.xx.fbcdn.net"
+
+
+def download(handler, url):
+    async def run():
+        worker = MediaEnrichmentWorker(supabase_client=None, vector_store=None, backend=None, state=object())
+        worker._http = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=False)
+        async with worker._http:
+            return await worker._download(url)
+    return asyncio.run(run())
+
+
+def test_only_https_facebook_cdn_urls_are_allowed():
+    assert is_media_url_allowed(f"{CDN}/v/a.jpg")
+    assert not is_media_url_allowed("http://scontent.xx.fbcdn.net/a.jpg")
+    assert not is_media_url_allowed("https://fbcdn.net.example.com/a.jpg")
+    assert not is_media_url_allowed("https://169.254.169.254/latest/meta-data")
+    assert not is_media_url_allowed(None)
+
+
+def test_downloads_image():
+    handler = lambda request: httpx.Response(200, headers={"content-type": "image/png"}, content=b"png")
+    assert download(handler, f"{CDN}/a.png") == (b"png", "image/png")
+
+
+def test_oversized_image_is_dropped(monkeypatch):
+    monkeypatch.setattr(media_enrichment, "MAX_IMAGE_BYTES", 10)
+    declared = lambda request: httpx.Response(200, headers={"content-type": "image/png"}, content=b"x" * 11)
+    assert download(declared, f"{CDN}/a.png") is None
+
+    def undeclared(request):
+        return httpx.Response(200, headers={"content-type": "image/png"}, content=iter([b"x" * 6, b"x" * 6]))
+    assert download(undeclared, f"{CDN}/a.png") is None
+
+
+def test_redirects_stay_on_the_cdn():
+    requested = []
+
+    def handler(request):
+        requested.append(str(request.url))
+        if request.url.path == "/a.png":
+            return httpx.Response(302, headers={"location": "/b.png"})
+        if request.url.path == "/b.png":
+            return httpx.Response(302, headers={"location": "http://127.0.0.1/admin"})
+        return httpx.Response(200, headers={"content-type": "image/png"}, content=b"png")
+
+    assert download(handler, f"{CDN}/a.png") is None
+    assert requested == [f"{CDN}/a.png", f"{CDN}/b.png"]
@@ -0,0 +1,22 @@
+from services.serialization import choose_encoding
+
+
+def test_prefers_gzip_when_accepted():
+    assert choose_encoding("gzip, deflate") == "gzip"
+
+
+def test_q_zero_is_not_acceptable():
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("gzip; q=0.0, identity") is None
+
+
+def test_malformed_quality_is_not_acceptable():
+    assert choose_encoding("gzip;q=abc") is None
+    assert choose_encoding("gzip;q=nan, *;q=") is None
+    assert choose_encoding("br;q=x, gzip;q=0.5") == "gzip"
+
+
+def test_wildcard_does_not_enable_a_refused_encoding():
+    assert choose_encoding("gzip;q=0, *") is None
+    assert choose_encoding("*;q=0.5, gzip;q=0") is None
+    assert choose_encoding("identity, *") == "gzip"
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from services.deadlines import DeadlineExceeded, deadline, degraded, note_degraded, remaining
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_run():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)))
+        assert flight.in_flight() == 0
+        return results
+
+    assert asyncio.run(run()) == ["result"] * 3
+    assert len(calls) == 1
+
+
+def test_error_reaches_every_caller():
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        flight = SingleFlight("test")
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) and str(r) == "boom" for r in results)
+
+
+def test_cancelling_one_waiter_leaves_the_others():
+    async def work():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        flight = SingleFlight("test")
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "result"
+
+
+def test_each_caller_waits_under_its_own_deadline():
+    async def work():
+        assert remaining() is None  # not the leader's deadline
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def call(flight, budget):
+        with deadline(budget):
+            return await flight.do("key", work)
+
+    async def run():
+        flight = SingleFlight("test")
+        return await asyncio.gather(call(flight, 0.02), call(flight, 5), return_exceptions=True)
+
+    tight, loose = asyncio.run(run())
+    assert isinstance(tight, DeadlineExceeded)
+    assert loose == "result"
+
+
+def test_degraded_notes_reach_every_caller():
+    async def work():
+        await asyncio.sleep(0.01)
+        note_degraded("semantic_search")
+        return "result"
+
+    async def call(flight):
+        with deadline(5):
+            await flight.do("key", work)
+            return degraded()
+
+    async def run():
+        flight = SingleFlight("test")
+        return await asyncio.gather(call(flight), call(flight))
+
+    assert asyncio.run(run()) == [["semantic_search"], ["semantic_search"]]
@@ -709,10 +709,75 @@ function createFloatingWidget() {
 
     apiKeyInput.onchange = () => chrome.storage.local.set({ apifyKey: apiKeyInput.value.trim() });
 
+    // In-page capture: read the post straight from the DOM so the backend can skip the Apify run.
+    // Facebook's markup changes often, so every field is best-effort; the backend falls back to
+    // Apify when the post id, author or content is missing.
+    function parseCount(text) {
+        const match = (text || '').replace(/,/g, '').match(/([\d.]+)\s*([KkMm])?/);
+        if (!match) return null;
+        const multiplier = { k: 1e3, m: 1e6 }[(match[2] || '').toLowerCase()] || 1;
+        return Math.round(parseFloat(match[1]) * multiplier);
+    }
+
+    function findPostElement(url) {
+        const articles = Array.from(document.querySelectorAll('div[role="article"]'));
+        let path = '';
+        try { path = new URL(url).pathname.replace(/\/$/, ''); } catch (e) { /* not a URL */ }
+        // Prefer the article linking to this post; on permalink pages, the first top-level article
+        const linked = path && articles.find(a => a.querySelector(`a[href*="${path}"]`));
+        return linked || articles.find(a => !a.parentElement.closest('div[role="article"]')) || null;
+    }
+
+    function capturePostFromPage(url) {
+        const article = findPostElement(url);
+        if (!article) return null;
+
+        const textEl = article.querySelector('[data-ad-preview="message"], [data-ad-comet-preview="message"]');
+        const authorLink = article.querySelector('h2 a[role="link"], h3 a[role="link"], h4 a[role="link"]');
+        const avatar = article.querySelector('svg image');
+        const timeEl = article.querySelector('abbr[data-utime]');
+
+        const seen = new Set();
+        const media = Array.from(article.querySelectorAll('img'))
+            .filter(img => img.naturalWidth >= 200 && /scontent|fbcdn/.test(img.src))
+            .filter(img => !seen.has(img.src) && seen.add(img.src))
+            .map(img => ({ type: 'photo', url: img.src }));
+
+        // Outbound links are wrapped in l.facebook.com/l.php?u=<target>
+        const links = Array.from(article.querySelectorAll('a[href*="l.facebook.com/l.php"]'))
+            .map(a => { try { return new URL(a.href).searchParams.get('u'); } catch (e) { return null; } })
+            .filter(Boolean);
+
+        const spans = Array.from(article.querySelectorAll('span'));
+        const countFor = (pattern) => {
+            const span = spans.find(el => pattern.test(el.textContent.trim()));
+            return span ? parseCount(span.textContent) : null;
+        };
+        const reactionsLabel = spans.find(el => /^All reactions:?$/i.test(el.textContent.trim()));
+
+        return {
+            url,
+            text: textEl ? textEl.innerText.trim() : null,
+            author_name: authorLink ? authorLink.innerText.trim() : null,
+            author_profile_pic: avatar ? avatar.getAttribute('xlink:href') || avatar.getAttribute('href') : null,
+            published_at: timeEl ? new Date(Number(timeEl.dataset.utime) * 1000).toISOString() : null,
+            likes: reactionsLabel && reactionsLabel.nextElementSibling ? parseCount(reactionsLabel.nextElementSibling.textContent) : null,
+            comments: countFor(/^[\d.,]+[KkMm]?\s+comments?$/i),
+            shares: countFor(/^[\d.,]+[KkMm]?\s+shares?$/i),
+            media,
+            links: [...new Set(links)],
+        };
+    }
+
     fetchBtn.onclick = async () => {
         const url = urlInput.value.trim();
         const key = apiKeyInput.value.trim();
-        if (!url || !key) return showStatus('Missing URL or Key', 'error');
+        if (!url) return showStatus('Missing URL', 'error');
+
+        // Use what is already on screen when possible; Apify only when nothing could be read
+        const capture = capturePostFromPage(url);
+        const useCapture = capture && (capture.text || capture.media.length);
+        if (!useCapture && !key) return showStatus('Post not found on this page; an Apify Key is needed', 'error');
 
         fetchBtn.disabled = true;
         showStatus('Fetching...', 'loading', true);
@@ -721,11 +786,13 @@ function createFloatingWidget() {
 
         try {
             const baseURL = window.BACKEND_URL || 'http://localhost:8000';
-            console.log(`Calling backend at ${baseURL}/get_post_info`);
-            const res = await fetch(`${baseURL}/get_post_info`, {
+            const endpoint = useCapture ? 'ingest_captured_post' : 'get_post_info';
+            const payload = useCapture ? { ...capture, apify_key: key || null } : { url, apify_key: key };
+            console.log(`Calling backend at ${baseURL}/${endpoint}`, { ...payload, apify_key: key ? "EXISTS" : "MISSING" });
+            const res = await fetch(`${baseURL}/${endpoint}`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ url, apify_key: key })
+                body: JSON.stringify(payload)
             });
             const data = await res.json();
             console.log("Backend response received:", data);
@@ -737,7 +804,7 @@ function createFloatingWidget() {
                     console.log("Mapping and saving post to Supabase:", postToSave);
                     const savedData = await savePostToSupabase(postToSave);
                     console.log("Supabase save success:", savedData);
-                    showStatus('Post Saved Successfully!', 'success');
+                    showStatus(data.source === 'extension' ? 'Post Saved Successfully! (captured from page)' : 'Post Saved Successfully!', 'success');
                 } catch (saveErr) {
                     showStatus('Fetched OK, but Save Failed', 'error');
                     console.error("Supabase Save Error Details:", saveErr);
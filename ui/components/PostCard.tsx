@@ -2,6 +2,7 @@ import React, { useState } from 'react';
 import { ThumbsUp, MessageCircle, Share2, MoreHorizontal, Globe, Sparkles, Image as ImageIcon, FileText, ChevronDown, ChevronUp } from 'lucide-react';
 import { FacebookPost, MediaItem } from '../types';
 import { analyzePostSentiment } from '../services/geminiService';
+import { fetchPost } from '../services/backendService';
 
 interface PostCardProps {
   post: FacebookPost;
@@ -14,12 +15,27 @@ export const PostCard: React.FC<PostCardProps> = ({ post, onDelete }) => {
   const [deleting, setDeleting] = useState(false);
   const [isExpanded, setIsExpanded] = useState(false);
   const [showOcr, setShowOcr] = useState<Record<number, boolean>>({});
+  const [fullContent, setFullContent] = useState<string | null>(null);
+  const [loadingFull, setLoadingFull] = useState(false);
 
   const MAX_CHAR_LIMIT = 280;
-  const shouldTruncate = post.content.length > MAX_CHAR_LIMIT;
+  const content = fullContent ?? post.content;
+  // Feed cards only carry a preview; the full text is fetched the first time the card is expanded
+  const needsFullText = !!post.isPreview && !!post.postId && fullContent === null;
+  const shouldTruncate = content.length > MAX_CHAR_LIMIT || needsFullText;
 
-  const toggleExpand = (e: React.MouseEvent) => {
+  const toggleExpand = async (e: React.MouseEvent) => {
     e.preventDefault();
+    if (!isExpanded && needsFullText) {
+      setLoadingFull(true);
+      const result = await fetchPost(post.postId!);
+      setLoadingFull(false);
+      if (!result.success) {
+        console.error("Failed to load full post", result.error);
+        return;
+      }
+      setFullContent(result.data?.raw_text || post.content);
+    }
     setIsExpanded(!isExpanded);
   };
 
@@ -141,15 +157,16 @@ export const PostCard: React.FC<PostCardProps> = ({ post, onDelete }) => {
       <div className="p-6">
         <div className="text-[var(--text)] text-[15px] leading-7 whitespace-pre-line opacity-85 font-normal">
           {shouldTruncate && !isExpanded
-            ? `${post.content.substring(0, MAX_CHAR_LIMIT)}...`
-            : post.content}
+            ? `${content.substring(0, MAX_CHAR_LIMIT)}...`
+            : content}
 
           {shouldTruncate && (
             <button
               onClick={toggleExpand}
+              disabled={loadingFull}
               className="ml-2 text-[var(--accent)] hover:text-[var(--accent2)] text-xs font-bold uppercase tracking-wider hover:underline"
             >
-              {isExpanded ? 'Show less' : 'Read more'}
+              {loadingFull ? 'Loading...' : isExpanded ? 'Show less' : 'Read more'}
             </button>
           )}
         </div>
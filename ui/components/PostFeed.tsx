@@ -3,7 +3,31 @@ import { FacebookPost } from '../types';
 import { PostCard } from './PostCard';
 import { RefreshCw, Database, Search, Sparkles, Filter, X, Zap, Layers } from 'lucide-react';
 import { supabase } from '../services/supabaseClient';
-import { searchPosts, SearchResult } from '../services/backendService';
+import { fetchPostFeed, searchPosts, SearchResult } from '../services/backendService';
+
+const FEED_PAGE_SIZE = 20;
+const RAW_TEXT_PREVIEW_CHARS = 280; // posts.raw_text_preview = left(raw_text, 280)
+
+// Maps a `posts` row (list or full projection) to the card model
+const mapPost = (p: any): FacebookPost => ({
+  id: p.id,
+  authorName: p.author_name || p.authorname || 'Anonymous',
+  authorAvatar: p.author_profile_pic || p.authoravatar || `https://api.dicebear.com/7.x/avataaars/svg?seed=${p.author_name || p.id}`,
+  content: p.raw_text || p.raw_text_preview || p.text || '',
+  isPreview: !p.raw_text && !!p.raw_text_preview && p.raw_text_preview.length >= RAW_TEXT_PREVIEW_CHARS,
+  summary: p.summary,
+  sentiment: p.sentiment,
+  topics: p.topics,
+  category: p.category,
+  timestamp: p.published_at || p.time || p.created_at || new Date().toISOString(),
+  likes: p.engagement_metrics?.likes || p.likes || 0,
+  comments: p.engagement_metrics?.comments || p.comments || 0,
+  shares: p.engagement_metrics?.shares || p.shares || 0,
+  reactions: p.engagement_metrics?.reactions || p.reactions,
+  media: p.media || (p.cover_image ? [{ type: 'photo', url: p.cover_image }] : p.imageUrl ? [{ type: 'photo', url: p.imageUrl }] : []),
+  url: p.url,
+  postId: p.original_post_id,
+});
 
 interface PostFeedProps {
   theme?: 'dark' | 'light';
@@ -16,39 +40,19 @@ export const PostFeed: React.FC<PostFeedProps> = ({ theme }) => {
   const [advancedMode, setAdvancedMode] = useState(false);
   const [isSearching, setIsSearching] = useState(false);
   const [searchResults, setSearchResults] = useState<SearchResult[] | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // --- Logic Functions (Giữ nguyên) ---
+  // First page of the backend feed (lean list projection, keyset-paginated)
   const loadPosts = async () => {
     setLoading(true);
     try {
-      const { data, error } = await supabase
-        .from('posts')
-        .select('*')
-        .order('created_at', { ascending: false });
-
-      if (error) throw error;
-
-      if (data) {
-        const mappedPosts: FacebookPost[] = data.map(p => ({
-          id: p.id,
-          authorName: p.authorname || 'Anonymous',
-          authorAvatar: p.authoravatar || `https://api.dicebear.com/7.x/avataaars/svg?seed=${p.authorname || p.id}`,
-          content: p.raw_text || p.text || '',
-          summary: p.summary,
-          sentiment: p.sentiment,
-          topics: p.topics,
-          category: p.category,
-          timestamp: p.published_at || p.time || p.created_at || new Date().toISOString(),
-          likes: p.engagement_metrics?.likes || p.likes || 0,
-          comments: p.engagement_metrics?.comments || p.comments || 0,
-          shares: p.engagement_metrics?.shares || p.shares || 0,
-          reactions: p.engagement_metrics?.reactions || p.reactions,
-          media: p.media || (p.imageUrl ? [{ type: 'photo', url: p.imageUrl }] : []),
-          url: p.url,
-        }));
-
-        setPosts(mappedPosts);
-      }
+      const page = await fetchPostFeed({ limit: FEED_PAGE_SIZE });
+      if (!page.success) throw new Error(page.error);
+
+      setPosts((page.data || []).map(mapPost));
+      setNextCursor(page.next_cursor || null);
       setSearchResults(null);
     } catch (error) {
       console.error("Failed to fetch posts", error);
@@ -57,6 +61,22 @@ export const PostFeed: React.FC<PostFeedProps> = ({ theme }) => {
     }
   };
 
+  const loadMorePosts = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPostFeed({ limit: FEED_PAGE_SIZE, cursor: nextCursor });
+      if (!page.success) throw new Error(page.error);
+
+      setPosts(prev => [...prev, ...(page.data || []).map(mapPost)]);
+      setNextCursor(page.next_cursor || null);
+    } catch (error) {
+      console.error("Failed to fetch more posts", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSearch = async (e?: React.FormEvent) => {
     e?.preventDefault();
     if (!searchQuery.trim()) {
@@ -517,6 +537,11 @@ export const PostFeed: React.FC<PostFeedProps> = ({ theme }) => {
                 <PostCard post={post as FacebookPost} onDelete={handleDelete} />
               </div>
             ))}
+            {!searchResults && nextCursor && (
+              <button onClick={loadMorePosts} disabled={loadingMore} className="rm-refresh-btn w-full">
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            )}
           </div>
         ) : (
           <div className="rm-state-box">
@@ -26,6 +26,67 @@ export interface ChatResponse {
     error?: string;
 }
 
+export interface FeedPage {
+    success: boolean;
+    data?: any[];
+    next_cursor?: string | null;
+    error?: string;
+}
+
+export interface FeedOptions {
+    cursor?: string | null;
+    limit?: number;
+    view?: 'list' | 'full';
+    topics?: string[];
+    category?: string;
+    sentiment?: string;
+}
+
+export const fetchPostFeed = async (options: FeedOptions = {}): Promise<FeedPage> => {
+    try {
+        const params = new URLSearchParams();
+        params.set('limit', String(options.limit ?? 20));
+        params.set('view', options.view ?? 'list');
+        if (options.cursor) params.set('cursor', options.cursor);
+        if (options.category) params.set('category', options.category);
+        if (options.sentiment) params.set('sentiment', options.sentiment);
+        (options.topics || []).forEach(topic => params.append('topic', topic));
+
+        const response = await fetch(`${BACKEND_URL}/posts?${params.toString()}`);
+        return await response.json();
+    } catch (error) {
+        console.error('Error fetching post feed:', error);
+        return {
+            success: false,
+            error: error instanceof Error ? error.message : 'Unknown error occurred'
+        };
+    }
+};
+
+export interface PostDetail {
+    success: boolean;
+    data?: any;
+    error?: string;
+}
+
+// Full row of one post (the feed's list view only carries a text preview)
+export const fetchPost = async (postId: string): Promise<PostDetail> => {
+    try {
+        const response = await fetch(`${BACKEND_URL}/posts/${encodeURIComponent(postId)}`);
+        const data = await response.json();
+        if (!response.ok) {
+            return { success: false, error: data.detail || `Request failed (${response.status})` };
+        }
+        return data;
+    } catch (error) {
+        console.error('Error fetching post:', error);
+        return {
+            success: false,
+            error: error instanceof Error ? error.message : 'Unknown error occurred'
+        };
+    }
+};
+
 export const searchPosts = async (query: string, advancedMode: boolean = false, k: number = 4): Promise<SearchResponse> => {
     try {
         // Use the new v2 endpoint which searches the 'posts' table directly
@@ -37,7 +98,8 @@ export const searchPosts = async (query: string, advancedMode: boolean = false,
             body: JSON.stringify({
                 query,
                 limit: k * 2, // Fetch a bit more
-                advanced_mode: advancedMode
+                advanced_mode: advancedMode,
+                view: 'list'
             }),
         });
 
@@ -48,7 +110,7 @@ export const searchPosts = async (query: string, advancedMode: boolean = false,
             return {
                 success: true,
                 results: data.data.map((post: any) => ({
-                    content: post.raw_text || post.summary || '',
+                    content: post.raw_text || post.raw_text_preview || post.summary || '',
                     metadata: {
                         post_id: post.original_post_id || post.id,
                         author: post.author_name,
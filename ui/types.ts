@@ -41,6 +41,8 @@ export interface FacebookPost {
   category?: string;
   timestamp: string;
   url?: string;
+  postId?: string; // original_post_id, for GET /posts/{post_id}
+  isPreview?: boolean; // content is the feed's truncated raw_text_preview
 
   likes: number;
   comments: number;